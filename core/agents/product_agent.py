@@ -1,20 +1,42 @@
 import logging
 import re
+from functools import lru_cache
 import pandas as pd  # Importar pandas
 
 from core.utils.db_utils import get_table_df
+from core.data_source_manager import (
+    get_data_manager,
+    pinned_snapshot,
+    coerce_filter_value,
+    column_kind,
+    TEXT_INDEX_COLUMNS,
+)
 
 
 import json
 from core.agents.caculinha_bi_agent import initialize_agent_for_session
 
 
+@lru_cache(maxsize=8)
+def _date_columns(columns: tuple) -> tuple:
+    """Pares (coluna, data) das colunas cujo nome é uma data (ex.: '2023-05-01 00:00:00')."""
+    parsed = []
+    for col in columns:
+        try:
+            parsed.append((col, pd.to_datetime(col)))
+        except (ValueError, TypeError):
+            continue  # Não é uma coluna de data
+    return tuple(parsed)
+
+
 class ProductAgent:
     """
     Agente para consulta e análise de produtos, usando apenas Parquet.
     """
 
     PRODUCT_TABLES = ["ADMAT", "Admat_OPCOM"]
+    # search_products busca no dataset do DataSourceManager (Filial Madureira)
+    SEARCH_DATA_FILE = "Filial_Madureira.parquet"
 
     def __init__(self):
         self.logger = logging.getLogger("ProductAgent")
@@ -44,8 +66,21 @@ class ProductAgent:
 
     def search_products(self, query, limit=10):
         self.logger.info(f'Iniciando busca de produtos para a query: "{query}"')
+        # Snapshot e índice de texto da mesma versão do dataset durante toda a busca
+        with pinned_snapshot():
+            return self._search_products(query, limit)
+
+    def _search_products(self, query, limit):
+        # Fonte única: snapshot do DataSourceManager (rótulos = posições no dataset)
+        data_manager = get_data_manager()
+        df = data_manager.get_snapshot()
+        if df is None or df.empty:
+            return {
+                "success": False,
+                "message": f"Arquivo de dados {self.SEARCH_DATA_FILE} não encontrado.",
+            }
 
-        prompt_for_llm = self._build_prompt_for_filter_extraction(query)
+        prompt_for_llm = self._build_prompt_for_filter_extraction(query, df)
 
         llm_response_raw = self.llm_agent.process_query(prompt_for_llm)
 
@@ -74,27 +109,21 @@ class ProductAgent:
         else:
             extracted_filters = llm_response_obj
 
-        target_file = extracted_filters.get("target_file", "ADMAT.parquet")
         filters = extracted_filters.get("filters", [])
 
-        self.logger.info(f"Filtros extraídos: {filters} para o arquivo {target_file}")
-
-        df = get_table_df(target_file.replace(".parquet", ""))
-        if df is None:
-            return {
-                "success": False,
-                "message": f"Arquivo de dados {target_file} não encontrado.",
-            }
+        self.logger.info(f"Filtros extraídos: {filters} para o arquivo {self.SEARCH_DATA_FILE}")
 
         results = df
+        applied = 0
         if filters:
             for f in filters:
                 col, op, val = f.get("column"), f.get("operator"), f.get("value")
                 if col in results.columns:
+                    applied += 1
                     try:
                         if op != "contains":
-                            results[col] = pd.to_numeric(results[col], errors="coerce")
-                            val = pd.to_numeric(val)
+                            # As colunas já vêm tipadas do carregamento: converte só o valor
+                            val = coerce_filter_value(col, val, results[col].dtype)
 
                         if op == ">":
                             results = results[results[col] > val]
@@ -105,11 +134,19 @@ class ProductAgent:
                         elif op == "!=":
                             results = results[results[col] != val]
                         elif op == "contains":
-                            results = results[
-                                results[col]
-                                .astype(str)
-                                .str.contains(str(val), case=False, na=False)
-                            ]
+                            if col in TEXT_INDEX_COLUMNS:
+                                # Índice de trigramas: sem acentos e sem varrer a coluna.
+                                # Os rótulos do snapshot são as posições no dataset.
+                                matches = data_manager.text_search(
+                                    col, str(val), limit=None, columns=[col]
+                                )
+                                results = results[results.index.isin(matches.index)]
+                            else:
+                                results = results[
+                                    results[col]
+                                    .astype(str)
+                                    .str.contains(str(val), case=False, na=False)
+                                ]
                     except (ValueError, TypeError) as e:
                         self.logger.error(
                             f"Erro ao aplicar filtro na coluna '{col}': {e}"
@@ -122,6 +159,14 @@ class ProductAgent:
                 else:
                     self.logger.warning(f"Coluna '{col}' não encontrada.")
 
+            if not applied:
+                # Nenhum filtro bate com as colunas: não devolver o catálogo inteiro
+                return {
+                    "success": False,
+                    "message": "Não consegui entender os critérios para a busca.",
+                    "data": [],
+                }
+
         if results.empty:
             return {
                 "success": False,
@@ -134,7 +179,7 @@ class ProductAgent:
             (
                 item.get("column_descriptions", {})
                 for item in self.catalog
-                if item.get("file_name") == target_file
+                if item.get("file_name") == self.SEARCH_DATA_FILE
             ),
             {},
         )
@@ -146,21 +191,24 @@ class ProductAgent:
             "column_descriptions": column_descriptions,
         }
 
-    def _build_prompt_for_filter_extraction(self, query):
-        """Constrói o prompt para o LLM extrair filtros da query do usuário."""
+    def _build_prompt_for_filter_extraction(self, query, df):
+        """Constrói o prompt para o LLM extrair filtros da query do usuário (colunas do `df`)."""
+        columns = "\n".join(
+            f"- {col} ({column_kind(col, dtype) or 'texto'})" for col, dtype in df.dtypes.items()
+        )
         prompt_template = """
         Você é um especialista em análise de dados. Sua tarefa é converter a pergunta de um usuário em filtros JSON para uma busca em um DataFrame pandas.
-        Use o catálogo de dados abaixo como sua única fonte de verdade sobre a estrutura dos dados.
+        Use as colunas abaixo (dados da Filial Madureira) como sua única fonte de verdade sobre a estrutura dos dados.
+
+        [COLUNAS DISPONÍVEIS]
+        {columns}
 
-        [CATÁLOGO DE DADOS]
-        {catalog}
-        
         [PERGUNTA DO USUÁRIO]
         "{query}"
 
         [INSTRUÇÕES]
-        1. Analise a pergunta do usuário e o catálogo de dados para identificar o arquivo e as colunas mais relevantes.
-        2. Para perguntas sobre vendas, priorize o arquivo `ADMAT.parquet` e use a coluna `VENDA_30D` para representar a quantidade de vendas.
+        1. Analise a pergunta do usuário e identifique as colunas mais relevantes, usando os nomes EXATOS acima.
+        2. Para perguntas sobre vendas, use a coluna `VENDAS_TOTAL_ANO` (quantidade) ou `VENDA R$` (valor); para preço, `VENDA UNIT R$`.
         3. Converta a pergunta em uma lista de filtros JSON. Cada filtro deve ser um objeto com "column", "operator" e "value".
         4. Operadores suportados: `==` (igual a), `!=` (diferente de), `>` (maior que), `<` (menor que), `contains` (para strings).
         5. Para buscas em colunas de texto (string), sempre use o operador `contains`.
@@ -168,19 +216,18 @@ class ProductAgent:
         7. **Sua resposta deve conter APENAS o código JSON, sem nenhum texto, explicação ou formatação adicional.**
 
         [EXEMPLO 1]
-        Pergunta: "quais os produtos da categoria brinquedos com preço maior que 50?"
+        Pergunta: "quais os produtos do grupo esmaltes com preço maior que 50?"
         Resposta JSON:
         ```json
         {{
-            "target_file": "ADMAT.parquet",
             "filters": [
                 {{
-                    "column": "CATEGORIA",
+                    "column": "GRUPO",
                     "operator": "contains",
-                    "value": "brinquedos"
+                    "value": "esmaltes"
                 }},
                 {{
-                    "column": "PREÇO 38%",
+                    "column": "VENDA UNIT R$",
                     "operator": ">",
                     "value": 50
                 }}
@@ -189,11 +236,10 @@ class ProductAgent:
         ```
 
         [EXEMPLO 2]
-        Pergunta: "liste os itens do fabricante ACME que não sejam do grupo Papelaria"
+        Pergunta: "liste os itens do fabricante ACME que não sejam do grupo Cabelos"
         Resposta JSON:
         ```json
         {{
-            "target_file": "ADMAT.parquet",
             "filters": [
                 {{
                     "column": "FABRICANTE",
@@ -203,7 +249,7 @@ class ProductAgent:
                 {{
                     "column": "GRUPO",
                     "operator": "!=",
-                    "value": "Papelaria"
+                    "value": "CABELOS"
                 }}
             ]
         }}
@@ -211,9 +257,7 @@ class ProductAgent:
 
         [RESPOSTA JSON]
         """
-        return prompt_template.format(
-            catalog=json.dumps(self.catalog, indent=2, ensure_ascii=False), query=query
-        )
+        return prompt_template.format(columns=columns, query=query)
 
     def _simulate_llm_filter_extraction(self, query):
         """Função de simulação para demonstrar a extração de filtros. Substituir por uma chamada real ao LLM."""
@@ -306,8 +350,26 @@ class ProductAgent:
         return {"success": True, "analysis": analysis}
 
     def get_sales_history(self, product_code):
+        """
+        Histórico de vendas de um produto pelo CÓDIGO.
+
+        Com a matriz de vendas do DataSourceManager, cada entrada traz o mês
+        em 'month' (ex.: 'JAN'; as colunas mensais não têm ano) e a
+        quantidade. No caminho ADMAT, 'date' continua no formato 'YYYY-MM'.
+        """
         self.logger.info(f"Buscando histórico de vendas para o produto: {product_code}")
 
+        # Fonte única: linhas do CÓDIGO na matriz produtos x meses do DataSourceManager
+        serie = get_data_manager().get_product_sales(product_code, column="CÓDIGO")
+        if serie is not None:
+            return {
+                "success": True,
+                "sales_history": [
+                    {"month": mes, "quantity": int(quantidade)}
+                    for mes, quantidade in serie.items()
+                ],
+            }
+
         df_admat = get_table_df("ADMAT")
         if df_admat is None or df_admat.empty:
             self.logger.warning(
@@ -333,21 +395,15 @@ class ProductAgent:
         # Ex: '2023-05-01 00:00:00', '2023-06-01 00:00:00', etc.
         # E 'VENDA 30D' ou 'VEND. QTD 30D'
 
-        # Tentativa de coletar dados de vendas mensais
-        for col in df_admat.columns:
-            try:
-                # Tenta converter o nome da coluna para data
-                date_obj = pd.to_datetime(col)
-                # Verifica se é uma coluna de mês/ano e se o valor não é nulo
-                if not pd.isna(product_row[col]):
-                    sales_data.append(
-                        {
-                            "date": date_obj.strftime("%Y-%m"),
-                            "quantity": product_row[col],
-                        }
-                    )
-            except ValueError:
-                continue  # Não é uma coluna de data
+        # Colunas de mês/ano (nomes interpretados uma vez por conjunto de colunas)
+        for col, date_obj in _date_columns(tuple(df_admat.columns)):
+            if not pd.isna(product_row[col]):
+                sales_data.append(
+                    {
+                        "date": date_obj.strftime("%Y-%m"),
+                        "quantity": product_row[col],
+                    }
+                )
 
         # Adicionar VENDA 30D se existir e não for nulo
         if "VENDA 30D" in product_row and not pd.isna(product_row["VENDA 30D"]):
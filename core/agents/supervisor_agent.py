@@ -1,6 +1,6 @@
 # core/agents/supervisor_agent.py
 import logging
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Optional
 
 
 class SupervisorAgent:
@@ -94,12 +94,15 @@ class SupervisorAgent:
 
         return False
 
-    def route_query(self, query: str) -> Dict[str, Any]:
+    def route_query(
+        self, query: str, on_token: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
         """
         Roteia a consulta para o ToolAgent.
 
         Args:
             query: Consulta do usuário
+            on_token: Callback opcional para o texto do LLM em streaming
 
         Returns:
             Resposta do ToolAgent
@@ -113,4 +116,6 @@ class SupervisorAgent:
             self.logger.info(f"Roteando consulta padrão para ToolAgent: '{query}'")
 
         # Ambos os tipos vão para ToolAgent que decidirá qual ferramenta usar
+        if on_token is not None:
+            return self.tool_agent.process_query(query, on_token=on_token)
         return self.tool_agent.process_query(query)
\ No newline at end of file
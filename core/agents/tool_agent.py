@@ -1,9 +1,16 @@
 # core/agents/tool_agent.py
+import contextvars
+import functools
 import logging
+import os
 import sys
-from typing import Any, Dict, List  # Import List for chat_history type hint
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional  # Import List for chat_history type hint
 
 from langchain.agents import AgentExecutor, create_tool_calling_agent
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import (
     BaseMessage,
@@ -11,17 +18,106 @@ from langchain_core.messages import (
 from langchain_core.runnables import RunnableConfig
 from langchain_core.agents import AgentAction, AgentFinish # Importar AgentAction e AgentFinish
 
+from core.data_source_manager import pinned_snapshot
 from core.llm_base import BaseLLMAdapter
 from core.llm_gemini_adapter import GeminiLLMAdapter
 from core.llm_langchain_adapter import CustomLangChainLLM
 from core.utils.response_parser import parse_agent_response
 from core.utils.chart_saver import save_chart
+from core.utils.schema_index import get_schema_index, load_snippets
 
 from core.tools.unified_data_tools import unified_tools
 from core.tools.date_time_tools import date_time_tools
 from core.tools.chart_tools import chart_tools
 
 
+class TokenStreamHandler(BaseCallbackHandler):
+    """Repassa cada trecho de texto gerado pelo LLM (streaming) para a interface."""
+
+    def __init__(self, on_token: Callable[[str], None]):
+        self.on_token = on_token
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self.on_token(token)
+
+
+# Chamadas de ferramenta de um mesmo turno executadas em paralelo
+MAX_FERRAMENTAS_PARALELAS = int(os.getenv("AGENT_MAX_PARALLEL_TOOLS", "4"))
+_ferramentas_pool: Optional[ThreadPoolExecutor] = None
+_ferramentas_lock = threading.Lock()
+
+
+def _get_ferramentas_pool() -> ThreadPoolExecutor:
+    global _ferramentas_pool
+    if _ferramentas_pool is None:
+        with _ferramentas_lock:
+            if _ferramentas_pool is None:
+                _ferramentas_pool = ThreadPoolExecutor(
+                    max_workers=MAX_FERRAMENTAS_PARALELAS, thread_name_prefix="ferramenta"
+                )
+    return _ferramentas_pool
+
+
+# Prompt do sistema montado por consulta: núcleo fixo + trechos mais parecidos
+PROMPT_NUCLEO_PATH = Path(__file__).resolve().parents[1] / "prompts" / "agent_core_prompt.txt"
+PROMPT_TOP_COLUNAS = int(os.getenv("AGENT_PROMPT_TOP_COLUMNS", "5"))
+PROMPT_TOP_FERRAMENTAS = int(os.getenv("AGENT_PROMPT_TOP_TOOLS", "3"))
+PROMPT_MIN_SIMILARIDADE = 0.05
+
+
+@functools.lru_cache(maxsize=1)
+def _prompt_nucleo() -> str:
+    return PROMPT_NUCLEO_PATH.read_text(encoding="utf-8").strip()
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """
+    AgentExecutor que executa em paralelo as chamadas de ferramenta pedidas
+    pelo modelo em um mesmo turno (o padrão as executa uma a uma).
+
+    Os resultados voltam na ordem das chamadas e seguem juntos para o modelo
+    no próximo passo. As ferramentas do turno leem a mesma versão do dataset
+    (pinned_snapshot) e recebem as ContextVars (ex.: filial_scope).
+    """
+
+    def _iter_next_step(
+        self,
+        name_to_tool_map,
+        color_mapping,
+        inputs,
+        intermediate_steps,
+        run_manager=None,
+    ):
+        with pinned_snapshot():
+            steps = list(
+                super()._iter_next_step(
+                    name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+                )
+            )
+            # Todas as ações já foram disparadas; aguarda na ordem original
+            steps = [step.result() if isinstance(step, Future) else step for step in steps]
+        yield from steps
+
+    def _perform_agent_action(
+        self,
+        name_to_tool_map,
+        color_mapping,
+        agent_action,
+        run_manager=None,
+    ) -> Future:
+        # Chamado pelo _iter_next_step da base para cada ação do turno: dispara
+        # a ferramenta no pool e devolve o Future (resolvido em _iter_next_step)
+        perform = functools.partial(
+            super()._perform_agent_action,
+            name_to_tool_map,
+            color_mapping,
+            agent_action,
+            run_manager,
+        )
+        return _get_ferramentas_pool().submit(contextvars.copy_context().run, perform)
+
+
 class ToolAgent:
     def __init__(self, llm_adapter: BaseLLMAdapter):
         self.logger = logging.getLogger(__name__)
@@ -37,135 +133,8 @@ class ToolAgent:
         """Cria e retorna um AgentExecutor com agente de ferramentas."""
         prompt = ChatPromptTemplate.from_messages(
             [
-                (
-                    "system",
-                    "Você é um Agente de Negócios versátil e amigável, capaz de responder a perguntas sobre dados e gerar gráficos. "
-                    "Sua principal função é usar as ferramentas disponíveis para responder de forma NATURAL e HUMANIZADA às perguntas do usuário.\n\n"
-
-                    "## REGRAS DE COMUNICAÇÃO (MUITO IMPORTANTE!):\n"
-                    "1. SEMPRE responda de forma NATURAL e CONVERSACIONAL, como um consultor de negócios falaria\n"
-                    "2. NUNCA mencione nomes técnicos de colunas (como 'LUCRO R$', 'ITEM', 'VENDA R$') na resposta final\n"
-                    "3. Use linguagem de negócios: 'lucro', 'vendas', 'produto', 'item', etc.\n"
-                    "4. Seja direto e objetivo, mas amigável\n"
-                    "5. Use formatação em Markdown para destacar valores importantes (negrito para números)\n\n"
-
-                    "EXEMPLOS DE RESPOSTAS HUMANIZADAS:\n"
-                    "❌ ERRADO: 'O valor da coluna LUCRO R$ para o item com ITEM='9' é '18.49'.'\n"
-                    "✅ CORRETO: 'O lucro do item 9 é **R$ 18,49**.'\n\n"
-
-                    "❌ ERRADO: 'O valor da coluna SALDO para ITEM='5' é 150'\n"
-                    "✅ CORRETO: 'O item 5 tem **150 unidades** em estoque.'\n\n"
-
-                    "❌ ERRADO: 'DIAS_COBERTURA do produto 9 é 45'\n"
-                    "✅ CORRETO: 'O produto 9 tem uma cobertura de estoque de **45 dias**.'\n\n"
-
-                    "REGRA FUNDAMENTAL: SEMPRE que o usuário perguntar sobre dados de produtos/items, você DEVE usar a ferramenta `consultar_dados`. "
-                    "NUNCA responda que não pode determinar algo sem antes tentar usar a ferramenta apropriada.\n\n"
-
-                    "REGRA DE DASHBOARDS: Quando o usuário pedir 'dashboard', 'visão geral', 'resumo executivo', ou 'análise completa', "
-                    "use AUTOMATICAMENTE o `gerar_dashboard_executivo()` pois ele fornece 6 gráficos otimizados para decisão gerencial.\n\n"
-
-                    "## COLUNAS DISPONÍVEIS NO DATASET:\n"
-                    "Use os nomes EXATOS das colunas abaixo ao chamar as ferramentas (mas NÃO os mencione na resposta final!):\n\n"
-
-                    "### Identificação:\n"
-                    "- ITEM (número do item/produto)\n"
-                    "- CODIGO (código do produto)\n"
-                    "- DESCRIÇÃO (descrição do produto)\n"
-                    "- FABRICANTE (fabricante do produto)\n"
-                    "- GRUPO (grupo/categoria do produto)\n\n"
-
-                    "### Valores Financeiros:\n"
-                    "- VENDA R$ (valor total de vendas em reais)\n"
-                    "- DESC. R$ (desconto em reais)\n"
-                    "- CUSTO R$ (custo total em reais)\n"
-                    "- LUCRO R$ (lucro total em reais)\n"
-                    "- CUSTO UNIT R$ (custo unitário em reais)\n"
-                    "- VENDA UNIT R$ (venda unitária em reais)\n\n"
-
-                    "### Percentuais e Margens:\n"
-                    "- LUCRO TOTAL % (percentual de lucro total)\n"
-                    "- LUCRO UNIT % (percentual de lucro unitário)\n"
-                    "- CLASSIFICACAO_MARGEM (classificação da margem de lucro)\n\n"
-
-                    "### Quantidades:\n"
-                    "- QTD (quantidade vendida)\n"
-                    "- SALDO (saldo em estoque)\n"
-                    "- QTD ULTIMA COMPRA (quantidade da última compra)\n\n"
-
-                    "### Vendas Mensais:\n"
-                    "- VENDA QTD JAN (vendas em janeiro)\n"
-                    "- VENDA QTD FEV (vendas em fevereiro)\n"
-                    "- VENDA QTD MAR (vendas em março)\n"
-                    "- VENDA QTD ABR (vendas em abril)\n"
-                    "- VENDA QTD MAI (vendas em maio)\n"
-                    "- VENDA QTD JUN (vendas em junho)\n"
-                    "- VENDA QTD JUL (vendas em julho)\n"
-                    "- VENDA QTD AGO (vendas em agosto)\n"
-                    "- VENDA QTD SET (vendas em setembro)\n"
-                    "- VENDA QTD OUT (vendas em outubro)\n"
-                    "- VENDA QTD NOV (vendas em novembro)\n"
-                    "- VENDA QTD DEZ (vendas em dezembro)\n\n"
-
-                    "### Análises e Métricas:\n"
-                    "- VENDAS_TOTAL_ANO (total de vendas no ano)\n"
-                    "- VENDAS_MEDIA_MENSAL (média de vendas mensal)\n"
-                    "- DIAS_COBERTURA (dias de cobertura de estoque)\n"
-                    "- STATUS_ESTOQUE (status do estoque)\n\n"
-
-                    "### Valores de Estoque:\n"
-                    "- VLR ESTOQUE VENDA (valor do estoque a preço de venda)\n"
-                    "- VLR ESTOQUE CUSTO (valor do estoque a preço de custo)\n\n"
-
-                    "### Datas:\n"
-                    "- DT CADASTRO (data de cadastro do produto)\n"
-                    "- DT ULTIMA COMPRA (data da última compra)\n\n"
-
-                    "## REGRAS DE USO DAS FERRAMENTAS:\n\n"
-
-                    "1. Para consultar dados específicos de um produto/item:\n"
-                    "   - Use: `consultar_dados(coluna='ITEM', valor='X', coluna_retorno='NOME_COLUNA')`\n"
-                    "   - Exemplo 1: 'Qual o lucro do produto 9?' → `consultar_dados(coluna='ITEM', valor='9', coluna_retorno='LUCRO R$')` → Responda: 'O lucro do item 9 é **R$ X,XX**.'\n"
-                    "   - Exemplo 2: 'Qual o fabricante do item 5?' → `consultar_dados(coluna='ITEM', valor='5', coluna_retorno='FABRICANTE')` → Responda: 'O fabricante do item 5 é **[nome]**.'\n"
-                    "   - Exemplo 3: 'Quantos dias de cobertura tem o item 5?' → `consultar_dados(coluna='ITEM', valor='5', coluna_retorno='DIAS_COBERTURA')` → Responda: 'O item 5 tem uma cobertura de **X dias**.'\n\n"
-
-                    "2. Para obter TODOS os dados de um produto:\n"
-                    "   - Use: `consultar_dados(coluna='ITEM', valor='X')` SEM especificar coluna_retorno\n"
-                    "   - Exemplo: 'Me fale sobre o produto 9' → `consultar_dados(coluna='ITEM', valor='9')`\n\n"
-
-                    "3. Para listar colunas disponíveis:\n"
-                    "   - Use: `listar_colunas_disponiveis()` quando o usuário perguntar sobre estrutura dos dados\n\n"
-
-                    "4. Para gráficos de produto específico:\n"
-                    "   - Use: `gerar_grafico_vendas_mensais_produto(codigo_produto=X)`\n"
-                    "   - Exemplo: 'Gráfico de vendas do produto 9' → `gerar_grafico_vendas_mensais_produto(codigo_produto=9)`\n\n"
-
-                    "5. Para gráficos de vendas por grupo/categoria:\n"
-                    "   - Use: `gerar_grafico_vendas_por_grupo(nome_grupo='NOME_DO_GRUPO')`\n"
-                    "   - Exemplo 1: 'Gráfico de vendas do grupo de esmaltes' → `gerar_grafico_vendas_por_grupo(nome_grupo='esmaltes')`\n\n"
-
-                    "6. Para rankings:\n"
-                    "   - Use: `gerar_ranking_produtos_mais_vendidos(top_n=N)`\n\n"
-
-                    "7. Para dashboards completos:\n"
-                    "   - Dashboard Executivo (RECOMENDADO para visão geral): `gerar_dashboard_executivo()`\n\n"
-
-                    "8. Para listar gráficos disponíveis:\n"
-                    "   - Use: `listar_graficos_disponiveis()` quando o usuário perguntar 'quais gráficos você pode gerar?'\n\n"
-
-                    "## TERMOS COMUNS E MAPEAMENTO:\n"
-                    "- 'lucro' ou 'rentabilidade' → LUCRO R$\n"
-                    "- 'margem' ou 'lucro percentual' → LUCRO TOTAL % ou LUCRO UNIT %\n"
-                    "- 'vendas' ou 'faturamento' → VENDA R$\n"
-                    "- 'produto', 'item' → ITEM\n"
-                    "- 'código' → CODIGO\n"
-                    "- 'estoque' ou 'saldo' → SALDO\n"
-                    "- 'cobertura', 'dias de cobertura' → DIAS_COBERTURA\n"
-                    "- 'status do estoque' → STATUS_ESTOQUE\n\n"
-
-                    "LEMBRE-SE: Sua resposta final deve ser NATURAL, AMIGÁVEL e SEM TERMOS TÉCNICOS. "
-                    "Transforme os dados brutos em uma resposta que um gerente de negócios gostaria de ouvir!"
-                ),
+                # Núcleo + trechos relevantes, montado por consulta em process_query
+                ("system", "{prompt_sistema}"),
                 MessagesPlaceholder(variable_name="chat_history"),
                 ("human", "{input}"),
                 MessagesPlaceholder(variable_name="agent_scratchpad"),
@@ -176,17 +145,58 @@ class ToolAgent:
             llm=self.langchain_llm, tools=self.tools, prompt=prompt
         )
 
-        return AgentExecutor(
+        return ParallelAgentExecutor(
             agent=agent,
             tools=self.tools,
             verbose=True,
             return_intermediate_steps=True, # Adicionado para obter os passos intermediários
         )
 
+    def _montar_prompt_sistema(self, query: str) -> str:
+        """
+        Prompt do sistema da consulta: o núcleo (regras de comunicação e de uso
+        das ferramentas) mais as colunas e regras de ferramenta mais parecidas
+        com a pergunta, vindas do índice de contexto. Se o índice falhar, usa
+        o catálogo completo de trechos.
+        """
+        try:
+            index = get_schema_index()
+            colunas = index.search(
+                query, PROMPT_TOP_COLUNAS, tipo="coluna", min_score=PROMPT_MIN_SIMILARIDADE
+            )
+            ferramentas = index.search(
+                query, PROMPT_TOP_FERRAMENTAS, tipo="ferramenta", min_score=PROMPT_MIN_SIMILARIDADE
+            )
+            colunas = [trecho for _, trecho in colunas]
+            ferramentas = [trecho for _, trecho in ferramentas]
+        except Exception as e:
+            self.logger.warning(f"✗ Índice de contexto indisponível, usando todos os trechos: {e}")
+            trechos = load_snippets()
+            colunas = [t for t in trechos if t.get("tipo") == "coluna"]
+            ferramentas = [t for t in trechos if t.get("tipo") == "ferramenta"]
+
+        partes = [_prompt_nucleo()]
+        if colunas:
+            partes.append("## COLUNAS RELEVANTES:\n" + "\n".join(t["texto"] for t in colunas))
+        if ferramentas:
+            partes.append(
+                "## COMO USAR AS FERRAMENTAS:\n" + "\n".join(f"- {t['texto']}" for t in ferramentas)
+            )
+        return "\n\n".join(partes)
+
     def process_query(
-        self, query: str, chat_history: List[BaseMessage] = None
+        self,
+        query: str,
+        chat_history: List[BaseMessage] = None,
+        on_token: Optional[Callable[[str], None]] = None,
     ) -> Dict[str, Any]:
-        """Processa a query do usuário usando o agente LangChain."""
+        """
+        Processa a query do usuário usando o agente LangChain.
+
+        Args:
+            on_token: Chamado com cada trecho de texto do LLM assim que chega
+                (streaming); o retorno continua sendo a resposta completa.
+        """
         self.logger.info(f"Processando query com o Agente de Ferramentas: {query}")
         try:
             # Ensure chat_history is not None for invoke
@@ -194,13 +204,18 @@ class ToolAgent:
                 chat_history = []
 
             config = RunnableConfig(recursion_limit=10)
+            if on_token is not None:
+                config["callbacks"] = [TokenStreamHandler(on_token)]
 
             self.logger.debug(
                 f"Invocando agente com query: {query} "
                 f"e chat_history: {chat_history}"
             )
+            prompt_sistema = self._montar_prompt_sistema(query)
+            self.logger.debug(f"Prompt do sistema com {len(prompt_sistema)} caracteres")
             response = self.agent_executor.invoke(
-                {"input": query, "chat_history": chat_history}, config=config
+                {"input": query, "chat_history": chat_history, "prompt_sistema": prompt_sistema},
+                config=config,
             )
             self.logger.debug(f"Resposta bruta do agente: {response}")
 
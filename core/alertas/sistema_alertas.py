@@ -15,12 +15,20 @@ Data: 2024
 
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Colunas usadas pelas verificações (projeção ao ler o dataset em lotes)
+COLUNAS_ALERTAS = [
+    'ITEM', 'DESCRIÇÃO', 'GRUPO', 'SALDO', 'LUCRO TOTAL %', 'LUCRO R$',
+    'VENDA UNIT R$', 'CUSTO UNIT R$', 'VLR ESTOQUE VENDA', 'DIAS_COBERTURA',
+    'VENDA QTD JUL', 'VENDA QTD AGO', 'VENDA QTD SET',
+    'VENDA QTD OUT', 'VENDA QTD NOV', 'VENDA QTD DEZ',
+]
+
 
 class SistemaAlertas:
     """
@@ -52,6 +60,52 @@ class SistemaAlertas:
         self.alertas: List[Dict[str, Any]] = []
         self.timestamp = datetime.now()
 
+    @classmethod
+    def a_partir_de_lotes(cls, lotes: Iterable[pd.DataFrame]) -> 'SistemaAlertas':
+        """
+        Monta o sistema a partir de lotes do dataset, sem carregá-lo inteiro
+
+        De cada lote ficam só as linhas que disparam alguma verificação com os
+        limiares padrão (os de executar_todas_verificacoes), então a memória
+        usada é proporcional aos produtos em alerta. Limiares mais amplos que
+        os padrão exigem o DataFrame completo (construtor normal).
+
+        Exemplo:
+            manager = get_data_manager()
+            lotes = manager.iter_batches(columns=COLUNAS_ALERTAS)
+            alertas = SistemaAlertas.a_partir_de_lotes(lotes).executar_todas_verificacoes()
+
+        Args:
+            lotes: DataFrames com as colunas de COLUNAS_ALERTAS (ex.: DataSourceManager.iter_batches)
+        """
+        candidatos = []
+        vazio = pd.DataFrame()
+        for lote in lotes:
+            vazio = lote.iloc[0:0]
+            mascara = cls._linhas_candidatas(lote)
+            if mascara.any():
+                candidatos.append(lote[mascara])
+
+        df = pd.concat(candidatos, ignore_index=True) if candidatos else vazio
+        logger.info(f"Alertas: {len(df)} produtos candidatos lidos em lotes")
+        return cls(df)
+
+    @staticmethod
+    def _linhas_candidatas(df: pd.DataFrame) -> pd.Series:
+        """Linhas que podem disparar alguma verificação com os limiares padrão"""
+        mascara = pd.Series(False, index=df.index)
+        if 'SALDO' in df.columns:
+            mascara |= df['SALDO'] <= 0
+        if 'LUCRO TOTAL %' in df.columns:
+            # Margem baixa (< 15%) inclui a margem negativa
+            mascara |= df['LUCRO TOTAL %'] < 15.0
+        if 'DIAS_COBERTURA' in df.columns:
+            mascara |= (df['DIAS_COBERTURA'] > 90) & (df['DIAS_COBERTURA'] != np.inf)
+        meses = [f'VENDA QTD {mes}' for mes in ['DEZ', 'NOV', 'OUT'] if f'VENDA QTD {mes}' in df.columns]
+        if meses:
+            mascara |= df[meses].sum(axis=1) == 0
+        return mascara.fillna(False).astype(bool)
+
     def verificar_ruptura_estoque(
         self,
         threshold: int = 0,
@@ -8,13 +8,17 @@ Este módulo implementa as rotas de API para o processamento de
 mensagens do chat.
 """
 
+import json
 import logging
 import os
+import threading
 from datetime import datetime
+from queue import Queue
 
 import pandas as pd
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context
 
+from core.data_source_manager import filial_scope
 from core.query_processor import QueryProcessor
 
 logger = logging.getLogger(__name__)
@@ -28,33 +32,66 @@ class ChatService:
     Encapsula a lógica de negócio para o processamento de chat.
     """
 
-    def process_message(self, user_message: str):
+    def process_message(self, user_message: str, filiais=()):
         """
         Processa a mensagem do usuário, lida com a lógica de fallback e
         formata a resposta.
+
+        Args:
+            filiais: Filiais da consulta; as ferramentas do agente leem só
+                os dados delas (vazio = fonte padrão).
+        """
+        return self._format_response(self._run_query(user_message, filiais=filiais))
+
+    def stream_message(self, user_message: str, filiais=()):
         """
-        logger.info("Processando mensagem: %s", user_message)
+        Processa a mensagem em uma thread e gera eventos SSE: 'token' com cada
+        trecho de texto do LLM assim que chega e 'done' com a resposta final
+        formatada (a mesma de process_message).
+        """
+        events = Queue()
+
+        def worker():
+            response = self._run_query(
+                user_message,
+                on_token=lambda token: events.put(("token", {"content": token})),
+                filiais=filiais,
+            )
+            events.put(("done", response))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+        while True:
+            event, data = events.get()
+            if event == "done":
+                data = self._format_response(data)
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+            if event == "done":
+                break
+
+    def _run_query(self, user_message: str, on_token=None, filiais=()) -> dict:
+        """Executa a consulta no QueryProcessor (sem depender do contexto da requisição)."""
+        logger.info("Processando mensagem: %s (filiais: %s)", user_message, list(filiais) or "padrão")
         try:
             processor = QueryProcessor()
             logger.info("Processador de consulta inicializado.")
-            response = processor.process_query(user_message)
+            with filial_scope(*filiais):
+                response = processor.process_query(user_message, on_token=on_token)
             logger.info("Consulta processada. Tipo da resposta: %s", type(response))
             if not isinstance(response, dict):
                 response = {"type": "text", "content": str(response)}
-            return self._format_response(response)
+            return response
         except Exception as e:
             logger.error("Erro ao processar consulta: %s", e, exc_info=True)
-            return self._format_response(
-                {
-                    "type": "error",
-                    "error": "Erro interno do servidor",
-                    "details": (
-                        str(e)
-                        if os.getenv("FLASK_ENV") == "development"
-                        else "Contate o administrador"
-                    ),
-                }
-            )
+            return {
+                "type": "error",
+                "error": "Erro interno do servidor",
+                "details": (
+                    str(e)
+                    if os.getenv("FLASK_ENV") == "development"
+                    else "Contate o administrador"
+                ),
+            }
 
     def _format_response(self, response: dict) -> dict:
         """Formata a resposta final, adicionando metadados e limpando os dados."""
@@ -74,6 +111,16 @@ class ChatService:
         return convert_nat_to_none(response)
 
 
+def _filiais_da_requisicao(data: dict) -> tuple:
+    """Filiais pedidas no corpo da requisição ('filial': nome ou lista de nomes)."""
+    filiais = data.get("filial") or ()
+    if isinstance(filiais, str):
+        filiais = [filiais]
+    if not isinstance(filiais, (list, tuple)):
+        raise ValueError("'filial' deve ser o nome de uma filial ou uma lista de nomes.")
+    return tuple(str(filial).strip() for filial in filiais if str(filial).strip())
+
+
 @chat_routes.route("/chat", methods=["POST"])
 def process_chat():
     """Processa as mensagens do chat e retorna a resposta do assistente"""
@@ -90,7 +137,7 @@ def process_chat():
             raise ValueError("Mensagem vazia. Por favor, digite uma consulta.")
 
         chat_service = ChatService()
-        response = chat_service.process_message(user_message)
+        response = chat_service.process_message(user_message, _filiais_da_requisicao(data))
         return jsonify(response), 200
 
     except ValueError as ve:
@@ -128,6 +175,40 @@ def process_chat():
         )
 
 
+@chat_routes.route("/chat/stream", methods=["POST"])
+def stream_chat():
+    """
+    Igual a /api/chat, mas responde em Server-Sent Events (text/event-stream):
+    o texto do assistente chega à medida que é gerado, e o evento 'done' traz
+    a resposta completa (texto, gráfico ou erro).
+    """
+    data = request.get_json(silent=True) or {}
+    user_message = str(data.get("query", data.get("message", ""))).strip()
+    if not user_message:
+        return (
+            jsonify(
+                {
+                    "type": "error",
+                    "error": "Mensagem vazia. Por favor, digite uma consulta.",
+                    "timestamp": datetime.now().isoformat(),
+                }
+            ),
+            400,
+        )
+
+    try:
+        filiais = _filiais_da_requisicao(data)
+    except ValueError as ve:
+        return jsonify({"type": "error", "error": str(ve), "timestamp": datetime.now().isoformat()}), 400
+
+    logger.info("Requisição de streaming recebida em /api/chat/stream: %s", request.remote_addr)
+    return Response(
+        stream_with_context(ChatService().stream_message(user_message, filiais)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @chat_routes.route("/chat/upload", methods=["POST"])
 def upload_chat_file():
     """
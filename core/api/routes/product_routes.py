@@ -1,8 +1,12 @@
+import json
 import logging
+import tempfile
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
 
 from core.agents.product_agent import ProductAgent
+from core.data_source_manager import get_data_manager
+from core.utils.data_export import OPENPYXL_AVAILABLE, iter_csv_chunks, write_excel
 
 """
 Rotas da API para consulta de produtos
@@ -163,7 +167,10 @@ def get_product_details(product_id):
 @product_routes.route("/sales-history/<product_id>", methods=["GET"])
 def get_sales_history(product_id):
     """
-    Endpoint para histórico de vendas de um produto
+    Endpoint para histórico de vendas de um produto (product_id = CÓDIGO)
+
+    Entradas de 'sales_history' com 'month' ('JAN'..'DEZ') vêm da matriz de
+    vendas da Filial; as com 'date' ('YYYY-MM') vêm do ADMAT.
     """
     try:
         # Tenta obter o histórico real primeiro
@@ -225,6 +232,104 @@ def analyze_product(product_id):
         return jsonify({"success": False, "message": "Erro interno do servidor"}), 500
 
 
+# Máximo de chaves aceitas por requisição em /batch
+MAX_BATCH_KEYS = 500
+
+
+@product_routes.route("/batch", methods=["POST"])
+def get_products_batch():
+    """
+    Endpoint para consultar vários produtos em uma única busca
+
+    Corpo JSON: {"keys": [9, 12, 57], "columns": ["ITEM", "DESCRIÇÃO"], "key_column": "ITEM"}
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        keys = payload.get("keys") or []
+        columns = payload.get("columns") or None
+        key_column = payload.get("key_column", "ITEM")
+
+        if not isinstance(keys, list) or not keys:
+            return jsonify({"success": False, "message": "Informe a lista 'keys'"}), 400
+        if len(keys) > MAX_BATCH_KEYS:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "message": f"Máximo de {MAX_BATCH_KEYS} chaves por requisição",
+                    }
+                ),
+                400,
+            )
+
+        manager = get_data_manager()
+        df = manager.get_many(keys, columns=columns, column=key_column)
+        not_found = manager.missing_keys(keys, column=key_column)
+
+        # to_json trata NaN/categorias/datas; jsonify não serializa NaN como JSON válido
+        products = json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False))
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "products": products,
+                    "total_found": len(products),
+                    "not_found": not_found,
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        logger.error(f"Erro na consulta de produtos em lote: {e}")
+        return jsonify({"success": False, "message": "Erro interno do servidor"}), 500
+
+
+@product_routes.route("/export", methods=["POST"])
+def export_products():
+    """
+    Endpoint para exportar produtos em CSV (streaming) ou Excel, lendo em lotes
+
+    Corpo JSON: {"format": "csv" | "xlsx", "columns": [...], "filters": [...]}
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        export_format = str(payload.get("format", "csv")).lower()
+        columns = payload.get("columns") or None
+        filters = payload.get("filters") or None
+        batches = get_data_manager().iter_batches(columns=columns, filters=filters)
+
+        if export_format == "csv":
+            return Response(
+                stream_with_context(iter_csv_chunks(batches)),
+                mimetype="text/csv",
+                headers={"Content-Disposition": "attachment; filename=produtos.csv"},
+            )
+
+        if export_format == "xlsx":
+            if not OPENPYXL_AVAILABLE:
+                return (
+                    jsonify({"success": False, "message": "Exportação Excel indisponível"}),
+                    501,
+                )
+            # Planilha gravada em disco (modo write-only), não em memória
+            spool = tempfile.TemporaryFile(suffix=".xlsx")
+            write_excel(batches, spool, sheet_name="Produtos")
+            spool.seek(0)
+            return send_file(
+                spool,
+                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                as_attachment=True,
+                download_name="produtos.xlsx",
+            )
+
+        return jsonify({"success": False, "message": "Formato deve ser 'csv' ou 'xlsx'"}), 400
+
+    except Exception as e:
+        logger.error(f"Erro na exportação de produtos: {e}")
+        return jsonify({"success": False, "message": "Erro interno do servidor"}), 500
+
+
 @product_routes.route("/columns-info", methods=["GET"])
 def get_columns_info():
     """
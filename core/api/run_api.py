@@ -15,13 +15,14 @@ sys.path.append(
 
 from core.api import create_app
 from core.config.config import Config
-from core.utils.env_setup import setup_environment
+from core.utils.env_setup import enable_copy_on_write, setup_environment
 
 # Inicializa SocketIO sem app (será associado depois)
 socketio = SocketIO(cors_allowed_origins="*", async_mode="threading")
 
 if __name__ == "__main__":
     setup_environment()
+    enable_copy_on_write()
     app = create_app()
 
     # Configuração do rate limiting
@@ -1,22 +1,42 @@
 # core/cache.py
-import time
-from typing import Dict, Any
+import copy
+import itertools
+from typing import Any, Hashable, Set
+
+from core.utils.cache_registry import DATA_TAG, get_cache_registry
+
+_instance_ids = itertools.count()
 
 
 class Cache:
     """
-    A simple in-memory cache with a time-to-live (TTL) for each entry.
+    In-memory cache with a time-to-live (TTL) for each entry.
+
+    Entries live in the process-wide cache registry (core.utils.cache_registry),
+    so they count against the global memory budget, are evicted LRU-first and
+    are invalidated when the dataset is reloaded.
+
+    Each instance only sees its own entries: keys are prefixed with an
+    instance id, so instances sharing a namespace (e.g. one QueryProcessor
+    per Streamlit session) never serve each other's answers, and clear()
+    only removes this instance's entries.
     """
 
-    def __init__(self, ttl: int = 3600):
+    def __init__(self, ttl: int = 3600, namespace: str = "consultas"):
         """
         Initializes the cache.
 
         Args:
             ttl: The time-to-live for each cache entry, in seconds.
+            namespace: Registry namespace holding the entries.
         """
-        self.cache: Dict[str, Dict[str, Any]] = {}
         self.ttl = ttl
+        self._namespace = get_cache_registry().namespace(namespace, ttl=ttl, tags=(DATA_TAG,))
+        self._instance_id = next(_instance_ids)
+        self._keys: Set[Hashable] = set()
+
+    def _full_key(self, key: str) -> Hashable:
+        return (self._instance_id, key)
 
     def get(self, key: str) -> Any:
         """
@@ -26,15 +46,11 @@ class Cache:
             key: The key of the entry to get.
 
         Returns:
-            The value of the entry, or None if the entry is not found or has expired.
+            A shallow copy of the entry's value (callers may add fields to it),
+            or None if the entry is not found or has expired.
         """
-        if key in self.cache:
-            entry = self.cache[key]
-            if time.time() - entry["timestamp"] < self.ttl:
-                return entry["value"]
-            else:
-                del self.cache[key]
-        return None
+        value = self._namespace.get(self._full_key(key))
+        return copy.copy(value) if value is not None else None
 
     def set(self, key: str, value: Any) -> None:
         """
@@ -42,9 +58,14 @@ class Cache:
 
         Args:
             key: The key of the entry to set.
-            value: The value of the entry to set.
+            value: The value of the entry to set (stored as a shallow copy, so
+                later changes to the caller's object do not leak into the cache).
         """
-        self.cache[key] = {
-            "value": value,
-            "timestamp": time.time(),
-        }
+        self._namespace.put(self._full_key(key), copy.copy(value))
+        self._keys.add(key)
+
+    def clear(self) -> None:
+        """Removes every entry of this instance (other instances are not affected)."""
+        for key in self._keys:
+            self._namespace.invalidate(self._full_key(key))
+        self._keys.clear()
@@ -4,9 +4,33 @@ Fonte única de dados: data/parquet/Filial_Madureira.parquet
 """
 
 import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterator, Optional, List, Tuple, Union
+
+from core.utils.aggregate_cube import AggregateCube
+from core.utils.async_executor import get_async_executor
+from core.utils.cache_registry import DATA_TAG, estimate_size, get_cache_registry, shared_copy
+from core.utils.concurrency import ReadWriteLock, SingleFlight
+from core.utils.duckdb_engine import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_ROWS,
+    DEFAULT_TABLE_NAME,
+    DuckDBQueryEngine,
+    QueryParams,
+)
+from core.utils.sales_matrix import SalesMatrix
+from core.utils.text_index import TrigramIndex
 
 logger = logging.getLogger(__name__)
 
@@ -15,23 +39,758 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 MAIN_DATA_FILE = PROJECT_ROOT / "data" / "parquet" / "Filial_Madureira.parquet"
 CLEAN_DATA_FILE = PROJECT_ROOT / "data" / "parquet" / "Filial_Madureira_LIMPO.parquet"
 
+# Dataset particionado por filial/ano (layout Hive: filial=<nome>/ano=<aaaa>/*.parquet)
+PARTITIONED_DATA_DIR = PROJECT_ROOT / "data" / "parquet" / "filiais"
+PARTITION_COLUMN = "filial"
+PARTITION_SCHEMA = pa.schema([(PARTITION_COLUMN, pa.string()), ("ano", pa.int32())])
+DEFAULT_SOURCE_NAME = "filial_madureira"
+
+# Namespace do registro de cache onde o estado carregado de cada arquivo
+# reserva o seu tamanho (conta no orçamento, mas nunca é despejado)
+DATASET_CACHE_NAMESPACE = "dataset"
+# Namespace com os resultados de consultas filtradas (get_filtered_data/search/get_data)
+RESULT_CACHE_NAMESPACE = "resultados"
+
+# Carregamentos frios em andamento, por arquivo: threads (e instâncias) que pedem o
+# mesmo dataset ao mesmo tempo esperam uma única leitura
+_dataset_loads = SingleFlight()
+
+# Estado publicado de cada arquivo (fontes do mesmo arquivo compartilham a
+# mesma versão); o reload troca a entrada com uma única atribuição
+_published_states: Dict[str, "_DatasetState"] = {}
+
+# Colunas-chave com índice hash para busca exata O(1) e apelidos aceitos
+KEY_COLUMNS = ["ITEM", "CÓDIGO"]
+KEY_COLUMN_ALIASES = {"CODIGO": "CÓDIGO"}
+
+# Colunas de texto livre com índice de trigramas (busca sem acentos, ranqueada)
+TEXT_INDEX_COLUMNS = ["DESCRIÇÃO", "FABRICANTE"]
+
+# Plano de tipos compactos aplicado no carregamento (uma passada):
+# categorias para texto de baixa cardinalidade, strings Arrow para texto livre,
+# inteiros de 32 bits para contagens e float32 para métricas derivadas. Valores
+# monetários e percentuais ficam em float64 (comparações exatas, "LUCRO R$ == 11.67",
+# e exibição sem ruído de arredondamento).
+MONTHLY_SALES_COLUMNS = [
+    f"VENDA QTD {mes}"
+    for mes in ["JAN", "FEV", "MAR", "ABR", "MAI", "JUN", "JUL", "AGO", "SET", "OUT", "NOV", "DEZ"]
+]
+COMPACT_DTYPES: Dict[str, str] = {
+    "GRUPO": "category",
+    "FABRICANTE": "category",
+    "STATUS_ESTOQUE": "category",
+    "CLASSIFICACAO_MARGEM": "category",
+    "ITEM": "string[pyarrow]",
+    "CÓDIGO": "string[pyarrow]",
+    "DESCRIÇÃO": "string[pyarrow]",
+    "QTD": "int32",
+    "SALDO": "int32",
+    "QTD ULTIMA COMPRA": "int32",
+    "VENDAS_TOTAL_ANO": "int32",
+    **{col: "int32" for col in MONTHLY_SALES_COLUMNS},
+    "VENDAS_MEDIA_MENSAL": "float32",
+    "DIAS_COBERTURA": "float32",
+}
+
+# Catálogo de tipos lógicos das colunas, garantido uma única vez no carregamento
+# (enforce_column_catalog). Ferramentas e filtros confiam nesses tipos: valores
+# de filtro são convertidos para o tipo da coluna (coerce_filter_value) em vez
+# de converter a coluna inteira a cada chamada.
+COLUMN_KINDS = ("texto", "categoria", "inteiro", "decimal", "data")
+COLUMN_CATALOG: Dict[str, str] = {
+    "ITEM": "texto",
+    "CÓDIGO": "texto",
+    "DESCRIÇÃO": "texto",
+    "FABRICANTE": "categoria",
+    "GRUPO": "categoria",
+    "STATUS_ESTOQUE": "categoria",
+    "CLASSIFICACAO_MARGEM": "categoria",
+    "QTD": "inteiro",
+    "SALDO": "inteiro",
+    "QTD ULTIMA COMPRA": "inteiro",
+    "VENDAS_TOTAL_ANO": "inteiro",
+    **{col: "inteiro" for col in MONTHLY_SALES_COLUMNS},
+    "VENDA R$": "decimal",
+    "DESC. R$": "decimal",
+    "CUSTO R$": "decimal",
+    "LUCRO R$": "decimal",
+    "LUCRO TOTAL %": "decimal",
+    "CUSTO UNIT R$": "decimal",
+    "VENDA UNIT R$": "decimal",
+    "LUCRO UNIT %": "decimal",
+    "VLR ESTOQUE VENDA": "decimal",
+    "VLR ESTOQUE CUSTO": "decimal",
+    "VENDAS_MEDIA_MENSAL": "decimal",
+    "DIAS_COBERTURA": "decimal",
+    "DT CADASTRO": "data",
+    "DT ULTIMA COMPRA": "data",
+}
+
+# Cubo de agregados montado no carregamento (dimensões x medidas x meses)
+CUBE_DIMENSIONS = ["GRUPO", "FABRICANTE"]
+CUBE_MEASURES = [
+    "QTD",
+    "SALDO",
+    "VENDA R$",
+    "CUSTO R$",
+    "LUCRO R$",
+    "VENDA UNIT R$",
+    "LUCRO TOTAL %",
+    "VLR ESTOQUE VENDA",
+    "VLR ESTOQUE CUSTO",
+]
+CUBE_MARGIN = ("LUCRO R$", "VENDA R$")
+
+# Filtros estruturados: dict {coluna: valor} (igualdade), lista de tuplas
+# (coluna, operador, valor) ou lista de dicts {"column", "operator", "value"}.
+FilterSpec = Union[Dict[str, Any], List[Union[Tuple[str, str, Any], Dict[str, Any]]]]
+
+_FILTER_OPERATORS = {
+    "==": lambda field, value: field == value,
+    "=": lambda field, value: field == value,
+    "!=": lambda field, value: field != value,
+    ">": lambda field, value: field > value,
+    ">=": lambda field, value: field >= value,
+    "<": lambda field, value: field < value,
+    "<=": lambda field, value: field <= value,
+    "in": lambda field, value: field.isin(value),
+    "not in": lambda field, value: ~field.isin(value),
+    "contains": lambda field, value: pc.match_substring(
+        field.cast(pa.string()), str(value), ignore_case=True
+    ),
+}
+
+
+def column_kind(column: str, dtype: Any = None) -> Optional[str]:
+    """
+    Tipo lógico da coluna: o do catálogo ou, fora dele, inferido do dtype.
+
+    Returns:
+        Um dos COLUMN_KINDS, ou None se não houver como saber.
+    """
+    kind = COLUMN_CATALOG.get(column)
+    if kind is not None or dtype is None:
+        return kind
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "categoria"
+    if pd.api.types.is_bool_dtype(dtype):
+        return None
+    if pd.api.types.is_integer_dtype(dtype):
+        return "inteiro"
+    if pd.api.types.is_float_dtype(dtype):
+        return "decimal"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "data"
+    if pd.api.types.is_string_dtype(dtype):
+        return "texto"
+    return None
+
+
+def _to_text(series: pd.Series) -> pd.Series:
+    """Converte para texto preservando nulos (códigos numéricos sem o '.0')."""
+    if pd.api.types.is_float_dtype(series.dtype):
+        integral = series.dropna()
+        if (integral == np.floor(integral)).all():
+            series = series.astype("Int64")
+    return series.astype(str).where(series.notna(), pd.NA)
+
+
+def enforce_column_catalog(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Garante os tipos lógicos do COLUMN_CATALOG (uma passada, no carregamento).
+
+    Só converte colunas fora do tipo esperado (ex.: números gravados como
+    texto); valores inválidos viram nulos. Colunas inteiras com nulos ficam em
+    float64. Idempotente: com o dataset já tipado, apenas confere os dtypes.
+    """
+    for col, kind in COLUMN_CATALOG.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        dtype = series.dtype
+        if kind in ("texto", "categoria"):
+            numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+            if dtype == object or numeric:
+                df[col] = _to_text(series)
+        elif kind in ("inteiro", "decimal"):
+            if not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+                converted = pd.to_numeric(series, errors="coerce")
+                if kind == "inteiro" and not converted.isna().any():
+                    converted = converted.astype("int64")
+                df[col] = converted
+        elif kind == "data":
+            if not pd.api.types.is_datetime64_any_dtype(dtype):
+                df[col] = pd.to_datetime(series, errors="coerce")
+    return df
+
+
+def coerce_filter_value(column: str, value: Any, dtype: Any = None) -> Any:
+    """
+    Converte o valor de um filtro para o tipo lógico da coluna (ver column_kind),
+    sem tocar nos dados: o custo é O(1) por valor, não O(linhas).
+
+    Listas/tuplas/conjuntos são convertidos item a item. Colunas sem tipo
+    conhecido devolvem o valor como veio.
+
+    Raises:
+        ValueError/TypeError: Valor incompatível com o tipo da coluna.
+    """
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [coerce_filter_value(column, v, dtype) for v in value]
+    if value is None:
+        return None
+    kind = column_kind(column, dtype)
+    if kind in ("texto", "categoria"):
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value).strip() if isinstance(value, str) else str(value)
+    if kind == "inteiro":
+        number = float(value) if isinstance(value, str) else value
+        if isinstance(number, bool) or not isinstance(number, (int, float, np.number)):
+            raise TypeError(f"Valor '{value}' não é numérico para a coluna '{column}'")
+        return int(number) if float(number).is_integer() else float(number)
+    if kind == "decimal":
+        if isinstance(value, bool):
+            raise TypeError(f"Valor '{value}' não é numérico para a coluna '{column}'")
+        return float(value)
+    if kind == "data":
+        timestamp = pd.Timestamp(value)
+        if pd.isna(timestamp):
+            raise ValueError(f"Data inválida para a coluna '{column}': '{value}'")
+        return timestamp
+    return value
+
+
+def _has_dtype(series: pd.Series, dtype: str) -> bool:
+    return series.dtype == pd.api.types.pandas_dtype(dtype)
+
+
+def _can_apply_dtype(series: pd.Series, dtype: str) -> bool:
+    """Indica se a conversão do plano é segura para a coluna (sem perda de valores)."""
+    if _has_dtype(series, dtype):
+        return False
+    if dtype in ("category", "string[pyarrow]"):
+        return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+    if dtype.startswith("int"):
+        if not pd.api.types.is_integer_dtype(series.dtype):
+            return False
+        info = np.iinfo(dtype)
+        return series.empty or (series.min() >= info.min and series.max() <= info.max)
+    if dtype.startswith("float"):
+        return pd.api.types.is_float_dtype(series.dtype)
+    return False
+
+
+def apply_dtype_plan(df: pd.DataFrame, plan: Dict[str, str] = COMPACT_DTYPES) -> pd.DataFrame:
+    """
+    Converte as colunas para os tipos compactos do plano (ver COMPACT_DTYPES).
+
+    Colunas ausentes ou com tipo incompatível (ex.: números gravados como
+    texto no arquivo original) são mantidas como estão.
+    """
+    conversions = {
+        col: dtype
+        for col, dtype in plan.items()
+        if col in df.columns and _can_apply_dtype(df[col], dtype)
+    }
+    if conversions:
+        df = df.astype(conversions)
+    return df
+
+
+def memory_usage_bytes(df: pd.DataFrame) -> int:
+    """Memória ocupada pelo DataFrame (bytes, contando o conteúdo das strings)."""
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def arrow_cache_path(source_path: Path) -> Path:
+    """
+    Caminho do cache Arrow IPC correspondente a um arquivo Parquet.
+
+    Para um diretório (partição de uma filial) o cache fica dentro dele com
+    prefixo '_', que o pyarrow ignora ao descobrir os arquivos do dataset.
+    """
+    source_path = Path(source_path)
+    if source_path.is_dir():
+        return source_path / "_cache.arrow"
+    return source_path.with_suffix(".arrow")
+
+
+def _source_signature(source_path: Path) -> Dict[bytes, bytes]:
+    """Assinatura (versão do arquivo/diretório de origem) gravada no cache Arrow."""
+    return {b"source_version": str(file_version(source_path)).encode()}
+
+
+def build_arrow_cache(source_path: Path, target_path: Optional[Path] = None) -> Path:
+    """
+    Gera o cache Arrow IPC (não comprimido) do dataset já com os tipos corrigidos
+    e compactos (categorias viram colunas dicionário no arquivo).
+
+    O arquivo é escrito em um temporário e movido atomicamente para o destino,
+    então processos que estejam lendo o cache antigo não são afetados.
+
+    Args:
+        source_path: Arquivo Parquet de origem.
+        target_path: Destino do cache (padrão: mesmo nome com extensão .arrow).
+
+    Returns:
+        Caminho do cache gerado.
+    """
+    source_path = Path(source_path)
+    target_path = Path(target_path) if target_path else arrow_cache_path(source_path)
+
+    signature = _source_signature(source_path)
+    df = enforce_column_catalog(pd.read_parquet(source_path).reset_index(drop=True))
+    # Memória antes do plano de tipos, para o get_info reportar a economia
+    signature[b"uncompacted_memory_bytes"] = str(memory_usage_bytes(df)).encode()
+    df = apply_dtype_plan(df)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **signature})
+
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target_path.with_name(f"{target_path.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, target_path)
+
+    logger.info(f"✓ Cache Arrow gerado: {target_path} ({table.num_rows} linhas)")
+    return target_path
+
+
+def open_arrow_cache(source_path: Path) -> Optional[pa.Table]:
+    """
+    Abre o cache Arrow IPC via memory-map, se existir e estiver atualizado.
+
+    A tabela retornada referencia as páginas do arquivo mapeado: todos os
+    processos que abrem o mesmo cache compartilham uma única cópia no page
+    cache do sistema operacional.
+
+    Returns:
+        Tabela Arrow mapeada, ou None se o cache não existir ou estiver desatualizado.
+    """
+    cache_path = arrow_cache_path(source_path)
+    if not cache_path.exists():
+        return None
+
+    try:
+        table = pa.ipc.open_file(pa.memory_map(str(cache_path), "r")).read_all()
+    except Exception as e:
+        logger.warning(f"Cache Arrow inválido em {cache_path}: {e}")
+        return None
+
+    metadata = table.schema.metadata or {}
+    signature = _source_signature(source_path)
+    if any(metadata.get(key) != value for key, value in signature.items()):
+        logger.info(f"Cache Arrow desatualizado: {cache_path}")
+        return None
+    return table
+
+
+def load_dataframe(source_path: Path) -> pd.DataFrame:
+    """
+    Carrega o dataset a partir do cache Arrow mapeado em memória (gerando-o se preciso).
+
+    Colunas numéricas sem nulos viram arrays NumPy somente leitura apontando
+    direto para o arquivo mapeado (sem cópia). Se o cache não puder ser usado,
+    lê o Parquet normalmente.
+    """
+    table = _get_arrow_table(source_path)
+    if table is not None:
+        return apply_dtype_plan(_arrow_to_pandas(table))
+    return apply_dtype_plan(enforce_column_catalog(pd.read_parquet(source_path).reset_index(drop=True)))
+
+
+def _arrow_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Converte a tabela Arrow sem copiar numéricos nem as colunas de string Arrow."""
+    return table.to_pandas(
+        split_blocks=True, types_mapper={pa.large_string(): pd.StringDtype("pyarrow")}.get
+    )
+
+
+def _get_arrow_table(source_path: Path) -> Optional[pa.Table]:
+    """Abre o cache Arrow atualizado, gerando-o a partir do Parquet quando necessário."""
+    table = open_arrow_cache(source_path)
+    if table is None:
+        try:
+            build_arrow_cache(source_path)
+            table = open_arrow_cache(source_path)
+        except Exception as e:
+            logger.warning(f"Não foi possível gerar o cache Arrow ({e}); lendo Parquet.")
+    return table
+
+
+def _dataset_files(directory: Path) -> List[Path]:
+    """Arquivos Parquet de um diretório de dataset (ignora '_*' e '.*', como o pyarrow)."""
+    return sorted(
+        path
+        for path in directory.rglob("*.parquet")
+        if not any(part.startswith(("_", ".")) for part in path.relative_to(directory).parts)
+    )
+
+
+def file_version(path: Path) -> Optional[str]:
+    """
+    Versão do arquivo (mtime em ns + tamanho), ou None se não existir.
+
+    Para diretórios: maior mtime, tamanho total e número de arquivos Parquet.
+    """
+    path = Path(path)
+    try:
+        if path.is_dir():
+            stats = [file.stat() for file in _dataset_files(path)]
+            mtime = max((stat.st_mtime_ns for stat in stats), default=0)
+            size = sum(stat.st_size for stat in stats)
+            return f"{mtime}-{size}-{len(stats)}"
+        stat = path.stat()
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def _scan_arguments(
+    dataset: ds.Dataset,
+    columns: Optional[List[str]],
+    filters: Optional[FilterSpec],
+    extra_filter: Optional[ds.Expression] = None,
+) -> Tuple[Optional[List[str]], Optional[ds.Expression]]:
+    """Projeção (colunas existentes) e expressão de filtro para o scanner do pyarrow."""
+    projection = None
+    if columns:
+        projection = [col for col in columns if col in dataset.schema.names]
+
+    expression = _build_filter_expression(filters, dataset.schema)
+    if extra_filter is not None:
+        expression = extra_filter if expression is None else expression & extra_filter
+    return projection, expression
+
+
+def _scan_dataset(
+    dataset: ds.Dataset,
+    columns: Optional[List[str]] = None,
+    filters: Optional[FilterSpec] = None,
+    limit: Optional[int] = None,
+    extra_filter: Optional[ds.Expression] = None,
+) -> pd.DataFrame:
+    """Lê o dataset com projeção e filtro (pushdown) e aplica os tipos do dataset."""
+    projection, expression = _scan_arguments(dataset, columns, filters, extra_filter)
+
+    if limit:
+        table = dataset.head(limit, columns=projection, filter=expression)
+    else:
+        table = dataset.to_table(columns=projection, filter=expression)
+
+    return apply_dtype_plan(enforce_column_catalog(_arrow_to_pandas(table)))
+
+
+def _iter_dataset_batches(
+    dataset: ds.Dataset,
+    columns: Optional[List[str]] = None,
+    filters: Optional[FilterSpec] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    extra_filter: Optional[ds.Expression] = None,
+    as_arrow: bool = False,
+    normalize: bool = True,
+) -> Iterator[Union[pd.DataFrame, pa.RecordBatch]]:
+    """
+    Percorre o dataset em lotes pelo scanner do pyarrow (projeção e filtro aplicados
+    na leitura); só um lote é materializado por vez.
+
+    Erros de filtro (coluna inexistente) são registrados e encerram a iteração sem lotes.
+    """
+    try:
+        projection, expression = _scan_arguments(dataset, columns, filters, extra_filter)
+    except KeyError as e:
+        logger.warning(e.args[0])
+        return
+
+    batches = dataset.to_batches(columns=projection, filter=expression, batch_size=batch_size)
+    for batch in batches:
+        if batch.num_rows == 0:
+            continue
+        if as_arrow:
+            yield batch
+            continue
+        df = _arrow_to_pandas(pa.Table.from_batches([batch]))
+        yield apply_dtype_plan(enforce_column_catalog(df)) if normalize else df
+
+
+def iter_dataset_batches(
+    source_path: Path,
+    columns: Optional[List[str]] = None,
+    filters: Optional[FilterSpec] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    as_arrow: bool = False,
+    normalize: bool = True,
+) -> Iterator[Union[pd.DataFrame, pa.RecordBatch]]:
+    """
+    Lê um arquivo Parquet (ou diretório particionado) em lotes, sem carregá-lo inteiro.
+
+    Args:
+        source_path: Arquivo .parquet ou diretório com partições Hive.
+        columns: Colunas a ler (projeção).
+        filters: Filtros no formato aceito por get_filtered_data.
+        batch_size: Número máximo de linhas por lote.
+        as_arrow: Se True, entrega pa.RecordBatch em vez de DataFrames.
+        normalize: Se False, entrega os DataFrames com os tipos do arquivo (sem
+            correção de tipos nem plano de tipos compactos).
+    """
+    dataset = ds.dataset(source_path, format="parquet", partitioning="hive")
+    return _iter_dataset_batches(
+        dataset, columns, filters, batch_size, as_arrow=as_arrow, normalize=normalize
+    )
+
+
+def _freeze(value: Any) -> Any:
+    """Forma imutável e canônica de um valor de filtro/projeção (usada em chaves de cache)."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_freeze(v) for v in value), key=repr))
+    if isinstance(value, (list, tuple, np.ndarray, pd.Series, pd.Index)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _canonical_filters(filters: Optional[FilterSpec]) -> Tuple:
+    """
+    Forma canônica dos filtros para a chave do cache de resultados.
+
+    A ordem das condições (e dos valores de 'in'/'not in') não altera o
+    resultado, então não altera a chave; dict e lista continuam distintos
+    porque seguem caminhos de filtragem diferentes.
+    """
+    if not filters:
+        return ()
+    kind = "dict" if isinstance(filters, dict) else "list"
+    try:
+        normalized = _normalize_filters(filters)
+    except (TypeError, ValueError):
+        # Formato inválido: a consulta trata o erro; a chave só precisa ser estável
+        return ("raw", repr(filters))
+    conditions = []
+    for column, operator, value in normalized:
+        column = KEY_COLUMN_ALIASES.get(str(column).upper(), column)
+        if operator in ("in", "not in") and isinstance(value, (list, tuple, set, frozenset)):
+            value = frozenset(value) if all(_is_hashable(v) for v in value) else list(value)
+        conditions.append((str(column), operator, _freeze(value)))
+    return (kind, tuple(sorted(conditions, key=repr)))
+
+
+def _is_hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _normalize_key(value: Any) -> str:
+    """Normaliza uma chave de produto: sem aspas/espaços e sem sufixo decimal ('9.0' -> '9')."""
+    key = str(value).strip().strip('"').strip()
+    if re.fullmatch(r"\d+\.0+", key):
+        key = key.split(".")[0]
+    return key
+
+
+def _build_key_index(series: pd.Series) -> Dict[str, np.ndarray]:
+    """Constrói o índice hash chave normalizada -> posições das linhas."""
+    keys = series.map(_normalize_key).to_numpy()
+    return pd.Series(keys).groupby(keys, sort=False).indices
+
+
+def _normalize_filters(filters: Optional[FilterSpec]) -> List[Tuple[str, str, Any]]:
+    """Converte qualquer formato de filtro aceito em uma lista de (coluna, operador, valor)."""
+    if not filters:
+        return []
+    if isinstance(filters, dict):
+        return [(col, "==", value) for col, value in filters.items()]
+
+    normalized = []
+    for item in filters:
+        if isinstance(item, dict):
+            normalized.append(
+                (item.get("column"), str(item.get("operator", "==")).lower(), item.get("value"))
+            )
+        else:
+            col, op, value = item
+            normalized.append((col, str(op).lower(), value))
+    return normalized
+
+
+def _coerce_filter_value(value: Any, field_type: pa.DataType) -> Any:
+    """Converte o valor do filtro para o tipo Arrow da coluna."""
+    if isinstance(value, (list, tuple, set)):
+        return [_coerce_filter_value(v, field_type) for v in value]
+    if value is None:
+        return None
+    if pa.types.is_dictionary(field_type):
+        return _coerce_filter_value(value, field_type.value_type)
+    if pa.types.is_string(field_type) or pa.types.is_large_string(field_type):
+        return str(value)
+    if pa.types.is_integer(field_type) or pa.types.is_floating(field_type):
+        converted = pd.to_numeric(value, errors="raise")
+        return converted.item() if hasattr(converted, "item") else converted
+    if pa.types.is_timestamp(field_type) or pa.types.is_date(field_type):
+        return pd.Timestamp(value).to_pydatetime()
+    return value
+
+
+def _build_filter_expression(
+    filters: Optional[FilterSpec], schema: pa.Schema
+) -> Optional[ds.Expression]:
+    """Monta a expressão de filtro do pyarrow (pushdown) a partir do filtro estruturado."""
+    expression = None
+    for col, op, value in _normalize_filters(filters):
+        if col not in schema.names:
+            raise KeyError(f"Coluna '{col}' não encontrada para filtragem.")
+        if op not in _FILTER_OPERATORS:
+            raise ValueError(f"Operador de filtro não suportado: '{op}'")
+
+        field = pc.field(col)
+        if op == "contains":
+            condition = _FILTER_OPERATORS[op](field, value)
+        else:
+            try:
+                condition = _FILTER_OPERATORS[op](
+                    field,
+                    _coerce_filter_value(coerce_filter_value(col, value), schema.field(col).type),
+                )
+            except (ValueError, TypeError):
+                # Valor incompatível com o tipo da coluna: compara como string
+                if op in ("in", "not in"):
+                    value = [str(v) for v in value]
+                else:
+                    value = str(value)
+                condition = _FILTER_OPERATORS[op](field.cast(pa.string()), value)
+
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+class _DatasetState:
+    """
+    Uma versão carregada do dataset: DataFrame, índices e tabela Arrow.
+
+    Os dados nunca são alterados depois de publicados (só o dataset de scan é
+    criado sob demanda); o reload monta um novo estado e o troca atomicamente,
+    então leitores em andamento continuam com o anterior.
+    """
+
+    __slots__ = (
+        "version",
+        "df",
+        "key_indexes",
+        "text_indexes",
+        "arrow_table",
+        "dataset",
+        "uncompacted_bytes",
+        "cube",
+        "sales_matrix",
+        "sql_engine",
+    )
+
+    def __init__(
+        self,
+        version: Optional[str],
+        df: pd.DataFrame,
+        key_indexes: Dict[str, Dict[str, np.ndarray]],
+        text_indexes: Dict[str, TrigramIndex],
+        arrow_table: Optional[pa.Table] = None,
+        uncompacted_bytes: Optional[int] = None,
+        cube: Optional[AggregateCube] = None,
+        sales_matrix: Optional[SalesMatrix] = None,
+    ):
+        self.version = version
+        self.df = df
+        self.key_indexes = key_indexes
+        self.text_indexes = text_indexes
+        self.arrow_table = arrow_table
+        self.dataset: Optional[ds.Dataset] = None
+        # Memória que o DataFrame ocuparia sem o plano de tipos compactos
+        self.uncompacted_bytes = uncompacted_bytes
+        self.cube = cube
+        self.sales_matrix = sales_matrix
+        self.sql_engine: Optional[DuckDBQueryEngine] = None
+
+    @classmethod
+    def empty(cls) -> "_DatasetState":
+        return cls(None, pd.DataFrame(), {}, {})
+
+    @property
+    def nbytes(self) -> int:
+        """Memória aproximada do estado (DataFrame, índices, cubo e matriz) para o registro de cache."""
+        size = memory_usage_bytes(self.df)
+        for index in self.key_indexes.values():
+            size += sum(positions.nbytes for positions in index.values())
+            size += estimate_size(list(index))
+        for index in self.text_indexes.values():
+            size += sum(postings.nbytes for postings in index._postings.values())
+            size += estimate_size(index._docs)
+        if self.cube is not None:
+            size += memory_usage_bytes(self.cube.base)
+        if self.sales_matrix is not None:
+            size += self.sales_matrix.nbytes
+        return size
+
 
 class FilialMadureiraDataSource:
-    """Acesso centralizado ao arquivo Filial_Madureira.parquet."""
+    """
+    Acesso centralizado ao arquivo Filial_Madureira.parquet.
+
+    Também serve a partição de uma filial no dataset particionado (um
+    diretório 'filial=<nome>' com arquivos Parquet), ver PartitionedDataSource.
+    """
 
-    def __init__(self):
+    # Intervalo mínimo (s) entre verificações de nova versão do arquivo
+    RELOAD_CHECK_INTERVAL = 30.0
+    # Validade (s) dos resultados de consultas filtradas em cache
+    RESULT_CACHE_TTL = 300.0
+
+    def __init__(
+        self,
+        file_path: Optional[Path] = None,
+        reload_check_interval: Optional[float] = RELOAD_CHECK_INTERVAL,
+        result_cache_ttl: Optional[float] = RESULT_CACHE_TTL,
+    ):
         self._connected = False
-        self._df_cache: Optional[pd.DataFrame] = None
+        # _reload_lock serializa as montagens de estado (pode ficar preso durante
+        # uma leitura lenta); _reload_thread_lock só protege o início da thread
+        self._reload_lock = threading.Lock()
+        self._reload_thread_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self._last_version_check = 0.0
+        self.reload_check_interval = reload_check_interval
 
         # Priorizar arquivo limpo se existir
         clean_path = Path(CLEAN_DATA_FILE)
-        if clean_path.exists():
+        if file_path is not None:
+            self.file_path = Path(file_path)
+            logger.info(f"📊 Usando arquivo: {self.file_path}")
+        elif clean_path.exists():
             self.file_path = clean_path
             logger.info(f"📊 Usando arquivo limpo: {CLEAN_DATA_FILE}")
         else:
             self.file_path = Path(MAIN_DATA_FILE)
             logger.info(f"📊 Usando arquivo original: {MAIN_DATA_FILE}")
 
+        # Estado carregado fica em _published_states; no registro de cache global
+        # só o seu tamanho é reservado (conta no orçamento sem ser despejado)
+        self._cache = get_cache_registry().namespace(DATASET_CACHE_NAMESPACE)
+        self._cache_key = str(self.file_path.resolve())
+        # Resultados de consultas: chave inclui a versão do dataset; o reload
+        # também invalida o namespace (tag DATA_TAG). TTL 0/None desativa.
+        self.result_cache_ttl = result_cache_ttl
+        self._results = get_cache_registry().namespace(
+            RESULT_CACHE_NAMESPACE, ttl=result_cache_ttl, tags=(DATA_TAG,)
+        )
+
     def connect(self) -> bool:
         """Verifica se arquivo Parquet existe."""
         if self.file_path.exists():
@@ -47,41 +806,559 @@ class FilialMadureiraDataSource:
         """Verifica se está conectado."""
         return self._connected and self.file_path.exists()
 
-    def _load_data(self, force_reload: bool = False) -> pd.DataFrame:
-        """Carrega dados com cache."""
-        if force_reload or self._df_cache is None:
-            try:
-                self._df_cache = pd.read_parquet(self.file_path)
-                logger.info(f"✓ Dados carregados: {self._df_cache.shape}")
+    def _load_state(self) -> _DatasetState:
+        """Lê o arquivo e monta um novo estado (DataFrame + índices)."""
+        # Versão lida antes dos dados: se o arquivo mudar durante a leitura,
+        # a próxima verificação detecta a diferença e recarrega de novo
+        version = file_version(self.file_path)
+
+        arrow_table = _get_arrow_table(self.file_path)
+        if arrow_table is not None:
+            # Cache Arrow já tem os tipos corrigidos; numéricos sem cópia
+            df = _arrow_to_pandas(arrow_table)
+            uncompacted = (arrow_table.schema.metadata or {}).get(b"uncompacted_memory_bytes")
+            uncompacted = int(uncompacted) if uncompacted else None
+        else:
+            df = pd.read_parquet(self.file_path)
+            uncompacted = None
+        logger.info(f"✓ Dados carregados: {df.shape}")
 
-                # Forçar tipos de dados corretos para colunas problemáticas
-                # Colunas que deveriam ser strings
-                for col in ["DESCRIÇÃO", "FABRICANTE"]:
-                    if col in self._df_cache.columns:
-                        self._df_cache[col] = self._df_cache[col].astype(str).replace('nan', pd.NA) # Converte NaN para NA do Pandas
+        # Rótulos do índice = posição da linha (usado pelos índices)
+        df = df.reset_index(drop=True)
 
-                # Colunas que deveriam ser datetime
-                for col in ["DT CADASTRO", "DT ULTIMA COMPRA"]:
-                    if col in self._df_cache.columns:
-                        # Tenta converter para datetime, coercing erros para NaT (Not a Time)
-                        self._df_cache[col] = pd.to_datetime(self._df_cache[col], errors='coerce')
+        # Forçar tipos de dados corretos e aplicar o plano de tipos compactos
+        df = enforce_column_catalog(df)
+        if uncompacted is None:
+            uncompacted = memory_usage_bytes(df)
+        df = apply_dtype_plan(df)
+        logger.info(
+            f"📊 Plano de tipos: {uncompacted / 1024**2:.2f} MB -> "
+            f"{memory_usage_bytes(df) / 1024**2:.2f} MB"
+        )
+        key_indexes = self._build_indexes(df)
+        return _DatasetState(
+            version,
+            df,
+            key_indexes,
+            self._build_text_indexes(df),
+            arrow_table,
+            uncompacted,
+            self._build_cube(df),
+            self._build_sales_matrix(df, key_indexes),
+        )
 
+    def _published_state(self) -> Optional[_DatasetState]:
+        """Estado atual do arquivo (None se ainda não carregado)."""
+        return _published_states.get(self._cache_key)
+
+    def _publish_state(self, state: _DatasetState) -> _DatasetState:
+        """Publica o estado (troca atômica) e reserva o seu tamanho no registro de cache."""
+        _published_states[self._cache_key] = state
+        self._cache.reserve(self._cache_key, state.nbytes)
+        return state
+
+    def _load_and_publish(self, force_reload: bool = False) -> _DatasetState:
+        """Carrega o arquivo e publica o estado (vazio se a leitura falhar)."""
+        # Outra thread pode ter publicado enquanto esta esperava a vez
+        state = None if force_reload else self._published_state()
+        if state is None:
+            try:
+                state = self._load_state()
             except Exception as e:
                 logger.error(f"Erro ao carregar dados: {e}")
-                self._df_cache = pd.DataFrame()
+                state = _DatasetState.empty()
+            self._publish_state(state)
+            self._last_version_check = time.monotonic()
+        return state
+
+    def _get_state(self, force_reload: bool = False) -> _DatasetState:
+        """
+        Retorna o estado atual, carregando na primeira chamada.
+
+        Leituras não usam lock: o estado é imutável e trocado atomicamente, então
+        um reload nunca bloqueia consultas. O carregamento frio é single-flight
+        por arquivo: requisições simultâneas esperam uma única leitura.
+
+        Se o arquivo mudou desde o carregamento, dispara o reload em segundo
+        plano e devolve o estado atual enquanto a nova versão é montada.
+        """
+        if force_reload:
+            with self._reload_lock:
+                return self._load_and_publish(force_reload=True)
+
+        pinned = _pinned_states.get()
+        if pinned is not None:
+            state = pinned.get(self._cache_key)
+            if state is None:
+                # Primeira leitura dentro de pinned_snapshot(): fixa a versão atual
+                state = pinned.setdefault(self._cache_key, self._current_state())
+            return state
+        return self._current_state()
+
+    def _current_state(self) -> _DatasetState:
+        """Estado publicado (ver _get_state), sem considerar versões fixadas."""
+        state = self._published_state()
+        if state is None:
+            return _dataset_loads.do(self._cache_key, self._load_and_publish)
+
+        interval = self.reload_check_interval
+        if interval is not None and time.monotonic() - self._last_version_check >= interval:
+            self.check_for_updates()
+        return state
+
+    def _ensure_loaded(self, force_reload: bool = False) -> pd.DataFrame:
+        """Carrega o DataFrame compartilhado (uma única vez) e o retorna sem copiar."""
+        return self._get_state(force_reload).df
+
+    def get_version(self) -> Optional[str]:
+        """Versão (mtime-tamanho) do arquivo que está carregado em memória."""
+        return self._get_state().version
+
+    def check_for_updates(self, wait: bool = False) -> bool:
+        """
+        Verifica se o arquivo mudou e, se sim, recarrega.
+
+        O novo estado é montado fora do caminho dos leitores e publicado com
+        uma única atribuição; quem já obteve um snapshot continua com ele.
+
+        Args:
+            wait: Se True, recarrega na thread atual e só retorna ao terminar.
+
+        Returns:
+            True se um reload foi iniciado (ou feito, com wait=True).
+        """
+        self._last_version_check = time.monotonic()
+        state = self._published_state()
+        current = file_version(self.file_path)
+        if state is not None and (current is None or current == state.version):
+            return False
+
+        if wait:
+            return self._reload()
+
+        # Lock curto (nunca mantido durante o _load_state): leitores que caem
+        # aqui durante um reload lento não esperam por ele
+        with self._reload_thread_lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self._reload_thread = threading.Thread(
+                target=self._reload, name="filial-dataset-reload", daemon=True
+            )
+            self._reload_thread.start()
+        return True
+
+    def _reload(self) -> bool:
+        """Monta o novo estado e o troca atomicamente (mantém o antigo se falhar)."""
+        with self._reload_lock:
+            try:
+                new_state = self._load_state()
+            except Exception as e:
+                logger.error(f"✗ Falha ao recarregar dados (mantendo versão atual): {e}")
+                return False
+            self._publish_state(new_state)
+        logger.info(f"🔄 Dataset recarregado (versão {new_state.version})")
+        # Caches derivados dos dados (respostas, agregações) ficam obsoletos
+        get_cache_registry().invalidate(tag=DATA_TAG)
+        return True
+
+    @staticmethod
+    def _build_indexes(df: pd.DataFrame) -> Dict[str, Dict[str, np.ndarray]]:
+        """Constrói os índices hash das colunas-chave presentes no DataFrame."""
+        indexes = {}
+        for col in KEY_COLUMNS:
+            if col in df.columns:
+                indexes[col] = _build_key_index(df[col])
+                logger.info(f"✓ Índice '{col}' construído: {len(indexes[col])} chaves")
+        return indexes
+
+    @staticmethod
+    def _build_text_indexes(df: pd.DataFrame) -> Dict[str, TrigramIndex]:
+        """Constrói os índices de trigramas das colunas de texto livre."""
+        indexes = {}
+        for col in TEXT_INDEX_COLUMNS:
+            if col in df.columns:
+                indexes[col] = TrigramIndex(df[col].tolist())
+                logger.info(
+                    f"✓ Índice textual '{col}' construído: "
+                    f"{indexes[col].vocabulary_size} trigramas"
+                )
+        return indexes
+
+    @staticmethod
+    def _build_cube(df: pd.DataFrame) -> Optional[AggregateCube]:
+        """Pré-calcula o cubo GRUPO x FABRICANTE x mês (None se não houver dimensões)."""
+        try:
+            cube = AggregateCube(
+                df, CUBE_DIMENSIONS, CUBE_MEASURES, MONTHLY_SALES_COLUMNS, margin=CUBE_MARGIN
+            )
+        except Exception as e:
+            logger.warning(f"Cubo de agregados não construído: {e}")
+            return None
+        if not cube.dimensions:
+            return None
+        logger.info(f"✓ Cubo de agregados construído: {len(cube)} células")
+        return cube
+
+    @staticmethod
+    def _build_sales_matrix(
+        df: pd.DataFrame, key_indexes: Dict[str, Dict[str, np.ndarray]]
+    ) -> Optional[SalesMatrix]:
+        """Pré-calcula a matriz produtos x meses (None sem colunas mensais ou sem ITEM)."""
+        if "ITEM" not in df.columns:
+            return None
+        try:
+            matrix = SalesMatrix(
+                df,
+                MONTHLY_SALES_COLUMNS,
+                key_column="ITEM",
+                dimensions=CUBE_DIMENSIONS,
+                key_index=key_indexes.get("ITEM"),
+                normalize_key=_normalize_key,
+            )
+        except Exception as e:
+            logger.warning(f"Matriz de vendas não construída: {e}")
+            return None
+        if not matrix.month_columns:
+            return None
+        logger.info(
+            f"✓ Matriz de vendas construída: {len(matrix)} produtos x {len(matrix.months)} meses"
+        )
+        return matrix
+
+    @staticmethod
+    def _resolve_column(column: str) -> str:
+        """Resolve apelidos de colunas-chave (ex.: 'CODIGO' -> 'CÓDIGO')."""
+        return KEY_COLUMN_ALIASES.get(str(column).upper(), column)
+
+    def lookup(
+        self, column: str, key: Any, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Busca exata pela chave usando o índice hash da coluna (O(1)).
+
+        Args:
+            column: Coluna-chave ('ITEM' ou 'CÓDIGO'/'CODIGO').
+            key: Valor procurado (ex.: 9, '9', '"7896205901654"').
+            columns: Colunas a retornar (opcional).
+
+        Returns:
+            Linhas com a chave exata, ou DataFrame vazio se não houver.
+        """
+        state = self._get_state()
+        df = state.df
+        index = state.key_indexes.get(self._resolve_column(column))
+        if index is None:
+            return pd.DataFrame()
+
+        positions = index.get(_normalize_key(key))
+        if positions is None:
+            result = df.iloc[0:0]
+        else:
+            result = df.iloc[positions]
+
+        if columns:
+            result = result[[col for col in columns if col in result.columns]]
+        return result
+
+    def get_many(
+        self,
+        keys: List[Any],
+        columns: Optional[List[str]] = None,
+        column: str = "ITEM",
+    ) -> pd.DataFrame:
+        """
+        Busca exata de várias chaves de uma vez.
+
+        As posições de todas as chaves saem do índice hash e as linhas são
+        extraídas com um único `iloc`, na ordem das chaves pedidas (chaves
+        repetidas aparecem uma vez). Colunas sem índice usam um único `isin`.
+
+        Args:
+            keys: Valores procurados (ex.: [9, '12', '"7896205901654"']).
+            columns: Colunas a retornar (opcional).
+            column: Coluna-chave ('ITEM' ou 'CÓDIGO'/'CODIGO').
+        """
+        state = self._get_state()
+        df = state.df
+        column = self._resolve_column(column)
+        normalized = list(dict.fromkeys(_normalize_key(key) for key in keys))
+
+        index = state.key_indexes.get(column)
+        if index is not None:
+            found = [index[key] for key in normalized if key in index]
+            positions = np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+            result = df.iloc[positions]
+        elif column in df.columns:
+            mask = df[column].map(_normalize_key).isin(normalized)
+            result = df[mask.to_numpy(dtype=bool, na_value=False)]
+        else:
+            return pd.DataFrame()
 
-        df_copy = self._df_cache.copy() if not self._df_cache.empty else pd.DataFrame()
-        return df_copy
+        if columns:
+            result = result[[col for col in columns if col in result.columns]]
+        return result
+
+    def missing_keys(self, keys: List[Any], column: str = "ITEM") -> List[str]:
+        """Chaves (normalizadas) que não existem na coluna-chave."""
+        state = self._get_state()
+        column = self._resolve_column(column)
+        index = state.key_indexes.get(column)
+        if index is None:
+            present = (
+                set(state.df[column].map(_normalize_key)) if column in state.df.columns else set()
+            )
+        else:
+            present = index
+        normalized = dict.fromkeys(_normalize_key(key) for key in keys)
+        return [key for key in normalized if key not in present]
+
+    def text_search(
+        self,
+        column: str,
+        query: str,
+        limit: Optional[int] = 10,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Busca textual ranqueada, sem distinção de maiúsculas e acentos.
+
+        Todos os termos da consulta precisam aparecer (em qualquer ordem) como
+        substring do texto; os resultados vêm do mais para o menos relevante.
+
+        Args:
+            column: Coluna de texto indexada ('DESCRIÇÃO' ou 'FABRICANTE').
+            query: Texto buscado (ex.: 'esmalte vermelho').
+            limit: Número máximo de resultados (None = todos).
+            columns: Colunas a retornar (opcional).
+        """
+        state = self._get_state()
+        df = state.df
+        index = state.text_indexes.get(column)
+        if index is None:
+            return pd.DataFrame()
+
+        positions = [position for position, _ in index.search(query, limit)]
+        result = df.iloc[positions]
+
+        if columns:
+            result = result[[col for col in columns if col in result.columns]]
+        return result
+
+    def get_cube(self) -> Optional[AggregateCube]:
+        """Cubo de agregados da versão carregada (None se o dataset não tiver dimensões)."""
+        return self._get_state().cube
+
+    def get_sales_matrix(self) -> Optional[SalesMatrix]:
+        """Matriz de vendas produtos x meses da versão carregada (None sem colunas mensais)."""
+        return self._get_state().sales_matrix
+
+    def get_product_sales(self, key: Any, column: str = "ITEM") -> Optional[pd.Series]:
+        """
+        Vendas mensais de um produto, pela matriz de vendas (índice = meses, ex.: 'JAN').
+
+        A chave é resolvida pelo índice hash da coluna ('ITEM' ou 'CÓDIGO');
+        linhas com a mesma chave são somadas. Matriz e índice saem do mesmo
+        estado, então a série é sempre de uma única versão.
+
+        Returns:
+            A série, ou None se a chave não existir ou não houver matriz.
+        """
+        state = self._get_state()
+        matriz = state.sales_matrix
+        index = state.key_indexes.get(self._resolve_column(column))
+        if matriz is None or index is None:
+            return None
+        rows = index.get(_normalize_key(key))
+        if rows is None:
+            return None
+        return pd.Series(matriz.values[rows].sum(axis=0), index=matriz.months)
+
+    def get_snapshot(self, force_reload: bool = False) -> pd.DataFrame:
+        """
+        Retorna um snapshot somente leitura dos dados, sem copiar.
+
+        O snapshot é uma cópia rasa (Copy-on-Write) do DataFrame em cache:
+        compartilha a memória com o cache e com os demais snapshots, e
+        qualquer modificação feita pelo chamador fica isolada no próprio
+        snapshot, sem afetar o cache. Se o processo não ligou o Copy-on-Write
+        (core.utils.env_setup.enable_copy_on_write), a cópia é profunda.
+        """
+        return shared_copy(self._ensure_loaded(force_reload))
+
+    def _load_data(self, force_reload: bool = False) -> pd.DataFrame:
+        """Carrega dados com cache (snapshot Copy-on-Write, sem cópia profunda)."""
+        return self.get_snapshot(force_reload)
+
+    def _get_dataset(self) -> ds.Dataset:
+        """
+        Retorna o dataset pyarrow usado nos scans com pushdown.
+
+        Usa a tabela Arrow mapeada em memória quando disponível (filtro
+        vetorizado direto nas páginas compartilhadas); senão, o Parquet.
+        """
+        state = self._get_state()
+        if state.dataset is None:
+            if state.arrow_table is not None:
+                state.dataset = ds.dataset(state.arrow_table)
+            else:
+                state.dataset = ds.dataset(self.file_path, format="parquet", partitioning="hive")
+        return state.dataset
+
+    def _get_sql_engine(self) -> DuckDBQueryEngine:
+        """Motor DuckDB da versão carregada (tabela 'filial_madureira' sobre o Arrow)."""
+        state = self._get_state()
+        if state.sql_engine is None:
+            state.sql_engine = DuckDBQueryEngine({DEFAULT_TABLE_NAME: self._get_dataset()})
+        return state.sql_engine
+
+    def execute_query(
+        self,
+        query: str,
+        params: QueryParams = None,
+        max_rows: Optional[int] = DEFAULT_MAX_ROWS,
+    ) -> pd.DataFrame:
+        """
+        Executa SQL somente leitura (DuckDB) sobre a tabela 'filial_madureira'.
+
+        Raises:
+            ValueError: Consulta inválida, com operação proibida ou com erro.
+        """
+        return self._get_sql_engine().execute(query, params, max_rows=max_rows)
+
+    def iter_query(
+        self,
+        query: str,
+        params: QueryParams = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Iterator[pd.DataFrame]:
+        """Executa SQL somente leitura e entrega o resultado em lotes."""
+        return self._get_sql_engine().iter_batches(query, params, batch_size=batch_size)
+
+    def scan(
+        self,
+        columns: Optional[List[str]] = None,
+        filters: Optional[FilterSpec] = None,
+        limit: int = None,
+    ) -> pd.DataFrame:
+        """
+        Lê direto do arquivo com projeção e filtro aplicados pelo scanner do pyarrow.
+
+        Apenas as colunas pedidas são decodificadas e os row groups descartados
+        pelas estatísticas do Parquet nem chegam a ser lidos.
+
+        Args:
+            columns: Colunas a retornar (colunas inexistentes são ignoradas).
+            filters: Filtro estruturado (ver FilterSpec).
+            limit: Número máximo de linhas.
+        """
+        try:
+            return _scan_dataset(self._get_dataset(), columns, filters, limit)
+        except KeyError as e:
+            logger.warning(e.args[0])
+            return pd.DataFrame()
+        except Exception as e:
+            logger.error(f"Erro ao ler com pushdown: {e}")
+            return pd.DataFrame()
+
+    def iter_batches(
+        self,
+        columns: Optional[List[str]] = None,
+        filters: Optional[FilterSpec] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        as_arrow: bool = False,
+    ) -> Iterator[Union[pd.DataFrame, pa.RecordBatch]]:
+        """
+        Percorre os dados em lotes de até `batch_size` linhas (projeção e filtro
+        aplicados pelo scanner). Ver DataSourceManager.iter_batches.
+        """
+        return _iter_dataset_batches(
+            self._get_dataset(), columns, filters, batch_size, as_arrow=as_arrow
+        )
+
+    def _cached_result(self, operation: str, args: Tuple, compute) -> pd.DataFrame:
+        """
+        Resultado de `compute()` pelo cache de resultados.
+
+        A chave combina arquivo, versão do dataset, operação e argumentos
+        canônicos. Resultados vazios não são guardados (podem vir de erros
+        transitórios). Acertos devolvem cópia rasa (Copy-on-Write).
+        """
+        if not self.result_cache_ttl:
+            return compute()
+
+        key = (self._cache_key, self._get_state().version, operation, args)
+        cached = self._results.get(key)
+        if cached is not None:
+            return shared_copy(cached)
+
+        result = compute()
+        if result is not None and not result.empty:
+            self._results.put(key, result)
+            return shared_copy(result)
+        return result
+
+    def get_result_cache_stats(self) -> Dict[str, Any]:
+        """Acertos, faltas, taxa de acerto e memória do cache de resultados."""
+        return self._results.stats()
+
+    def get_data(
+        self,
+        limit: int = None,
+        columns: Optional[List[str]] = None,
+        filters: Optional[FilterSpec] = None,
+    ) -> pd.DataFrame:
+        """Obtém todos os dados ou limitados (com projeção/filtro opcionais)."""
+        if columns or filters:
+            return self._cached_result(
+                "scan",
+                (_canonical_filters(filters), _freeze(columns), limit),
+                lambda: self.scan(columns=columns, filters=filters, limit=limit),
+            )
 
-    def get_data(self, limit: int = None) -> pd.DataFrame:
-        """Obtém todos os dados ou limitados."""
         df = self._load_data()
         if limit and not df.empty:
             df = df.head(limit)
         return df
 
-    def search(self, column: str, value: str, limit: int = 10) -> pd.DataFrame:
-        """Busca em uma coluna."""
+    def search(
+        self,
+        column: str,
+        value: str,
+        limit: int = 10,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Busca em uma coluna.
+
+        Colunas-chave (ITEM, CÓDIGO) usam o índice hash para match exato;
+        DESCRIÇÃO e FABRICANTE usam o índice de trigramas (sem acentos e
+        ranqueado); as demais fazem varredura por substring. Resultados
+        repetidos saem do cache de resultados.
+        """
+        column = self._resolve_column(column)
+        return self._cached_result(
+            "search",
+            (column, _freeze(value), limit, _freeze(columns)),
+            lambda: self._search(column, value, limit, columns),
+        )
+
+    def _search(
+        self, column: str, value: str, limit: int, columns: Optional[List[str]]
+    ) -> pd.DataFrame:
+        """Busca sem cache (ver search)."""
+        if column in KEY_COLUMNS:
+            exact = self.lookup(column, value, columns=columns)
+            if not exact.empty:
+                return exact.head(limit) if limit else exact
+
+        if column in TEXT_INDEX_COLUMNS:
+            return self.text_search(column, value, limit, columns=columns)
+
+        if columns:
+            return self.scan(
+                columns=columns, filters=[(column, "contains", value)], limit=limit
+            )
+
         try:
             df = self._load_data()
             if df.empty or column not in df.columns:
@@ -97,32 +1374,52 @@ class FilialMadureiraDataSource:
             return pd.DataFrame()
 
     def get_filtered_data(
-        self, filters: Dict[str, Any], limit: int = None
+        self,
+        filters: FilterSpec,
+        limit: int = None,
+        columns: Optional[List[str]] = None,
     ) -> pd.DataFrame:
-        """Busca com filtros exatos."""
+        """Busca com filtros exatos (ou estruturados, com pushdown), com cache de resultados."""
+        return self._cached_result(
+            "filtered",
+            (_canonical_filters(filters), limit, _freeze(columns)),
+            lambda: self._get_filtered_data(filters, limit, columns),
+        )
+
+    def _get_filtered_data(
+        self,
+        filters: FilterSpec,
+        limit: int = None,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Busca com filtros sem cache (ver get_filtered_data)."""
+        if columns or not isinstance(filters, dict):
+            return self.scan(columns=columns, filters=filters, limit=limit)
+
         try:
-            df = self._load_data()
+            filters = {self._resolve_column(col): value for col, value in filters.items()}
+
+            # Colunas-chave primeiro: o índice reduz o DataFrame às linhas da chave
+            key_indexes = self._get_state().key_indexes
+            key_col = next(
+                (col for col in KEY_COLUMNS if col in filters and col in key_indexes),
+                None,
+            )
+            if key_col:
+                df = self.lookup(key_col, filters.pop(key_col))
+            else:
+                df = self._load_data()
             if df.empty:
                 return pd.DataFrame()
 
             for col, value in filters.items():
                 if col in df.columns:
-                    # Tenta converter o valor para o tipo da coluna
-                    col_dtype = df[col].dtype
+                    # Converte só o valor para o tipo do catálogo; a coluna já
+                    # chega tipada do carregamento
                     try:
-                        if pd.api.types.is_numeric_dtype(col_dtype) and isinstance(value, str):
-                            # Tenta converter a string para o tipo numérico da coluna
-                            converted_value = pd.to_numeric(value, errors='raise')
-                            df = df[df[col] == converted_value]
-                        elif pd.api.types.is_datetime64_any_dtype(col_dtype) and isinstance(value, str):
-                            # Tenta converter a string para o tipo datetime da coluna
-                            converted_value = pd.to_datetime(value, errors='raise')
-                            df = df[df[col] == converted_value]
-                        else:
-                            # Para outros tipos ou falha na conversão, usa o valor original
-                            df = df[df[col] == value]
+                        df = df[df[col] == coerce_filter_value(col, value, df[col].dtype)]
                     except (ValueError, TypeError):
-                        # Se a conversão falhar, faz a comparação como string (case-insensitive)
+                        # Valor incompatível com o tipo: compara como string (case-insensitive)
                         df = df[df[col].astype(str).str.lower() == str(value).lower()]
                 else:
                     logger.warning(f"Coluna '{col}' não encontrada para filtragem.")
@@ -138,44 +1435,477 @@ class FilialMadureiraDataSource:
 
     def get_columns(self) -> List[str]:
         """Retorna lista de colunas."""
-        df = self._load_data()
+        df = self._ensure_loaded()
         return df.columns.tolist() if not df.empty else []
 
     def get_shape(self) -> tuple:
         """Retorna dimensões dos dados."""
-        df = self._load_data()
+        df = self._ensure_loaded()
         return df.shape if not df.empty else (0, 0)
 
     def get_info(self) -> Dict[str, Any]:
         """Retorna informações sobre os dados."""
-        df = self._load_data()
+        state = self._get_state()
+        df = state.df
         if df.empty:
             return {"status": "sem_dados"}
 
+        memory = memory_usage_bytes(df)
+        uncompacted = state.uncompacted_bytes or memory
         return {
             "file": str(self.file_path),
+            "version": state.version,
             "shape": df.shape,
             "columns": df.columns.tolist(),
             "dtypes": df.dtypes.to_dict(),
-            "memory_mb": round(df.memory_usage(deep=True).sum() / 1024**2, 2),
+            "memory_mb": round(memory / 1024**2, 2),
+            "memory_saved_mb": round((uncompacted - memory) / 1024**2, 2),
+            "memory_saved_pct": round(100 * (1 - memory / uncompacted), 1) if uncompacted else 0.0,
         }
 
 
+# Filiais às quais as chamadas ao DataSourceManager estão restritas (None = fonte padrão)
+_filial_scope: ContextVar[Optional[Tuple[str, ...]]] = ContextVar("filial_scope", default=None)
+
+
+@contextmanager
+def filial_scope(*filiais: str):
+    """
+    Restringe às filiais informadas todas as chamadas ao DataSourceManager
+    feitas dentro do bloco (inclusive pelas ferramentas do agente).
+
+    Exemplo:
+        with filial_scope("madureira", "centro"):
+            gerar_dashboard_executivo.invoke({})
+    """
+    token = _filial_scope.set(tuple(filiais) or None)
+    try:
+        yield
+    finally:
+        _filial_scope.reset(token)
+
+
+def get_filial_scope() -> Optional[Tuple[str, ...]]:
+    """Filiais do escopo atual (filial_scope), ou None fora de um escopo."""
+    return _filial_scope.get()
+
+
+# Estados do dataset fixados por pinned_snapshot() (arquivo -> estado)
+_pinned_states: ContextVar[Optional[Dict[str, "_DatasetState"]]] = ContextVar(
+    "pinned_states", default=None
+)
+
+
+@contextmanager
+def pinned_snapshot():
+    """
+    Fixa a versão do dataset para todas as leituras feitas dentro do bloco.
+
+    A primeira leitura de cada arquivo fixa o estado publicado naquele momento;
+    as seguintes usam o mesmo estado, mesmo que um reload publique outro no
+    meio do caminho. Threads que rodam com uma cópia do contexto (ex.:
+    `contextvars.copy_context().run`) compartilham as versões fixadas. Vale
+    para a fonte padrão e para cada filial; varreduras de várias filiais ao
+    mesmo tempo leem a versão corrente do dataset particionado.
+
+    Exemplo:
+        with pinned_snapshot():
+            vendas = manager.get_data(columns=["GRUPO", "VENDA R$"])
+            estoque = manager.get_data(columns=["GRUPO", "QTD"])  # mesma versão
+    """
+    current = _pinned_states.get()
+    token = _pinned_states.set({} if current is None else current)
+    try:
+        yield
+    finally:
+        _pinned_states.reset(token)
+
+
+class PartitionedDataSource:
+    """
+    Dataset de várias filiais particionado no layout Hive
+    (<raiz>/filial=<nome>/ano=<aaaa>/*.parquet).
+
+    Leituras com projeção/filtro usam o scanner do pyarrow sobre a raiz: o
+    filtro de filial (e de ano) descarta as partições que não interessam sem
+    abrir seus arquivos. Operações que precisam do DataFrame completo (índices,
+    busca textual, cubo) carregam só as filiais pedidas, cada uma em seu
+    próprio FilialMadureiraDataSource.
+    """
+
+    def __init__(
+        self,
+        root_dir: Path,
+        reload_check_interval: Optional[float] = FilialMadureiraDataSource.RELOAD_CHECK_INTERVAL,
+    ):
+        self.root_dir = Path(root_dir)
+        self.reload_check_interval = reload_check_interval
+        self._branches: Dict[str, FilialMadureiraDataSource] = {}
+        self._dataset: Optional[ds.Dataset] = None
+        self._version: Optional[str] = None
+        self._last_version_check = 0.0
+        self._sql_engines: Dict[Tuple[str, ...], DuckDBQueryEngine] = {}
+        # Leitores (consultas) compartilham o lock; a troca do dataset/filiais é
+        # exclusiva e curta, pois a redescoberta dos arquivos acontece fora dele
+        self._lock = ReadWriteLock()
+        self._refresh = SingleFlight()
+
+    def list_branches(self) -> List[str]:
+        """Filiais presentes no dataset (nomes das partições 'filial=')."""
+        prefix = f"{PARTITION_COLUMN}="
+        if not self.root_dir.is_dir():
+            return []
+        return sorted(
+            path.name[len(prefix):]
+            for path in self.root_dir.iterdir()
+            if path.is_dir() and path.name.startswith(prefix)
+        )
+
+    def branch(self, filial: str) -> FilialMadureiraDataSource:
+        """Fonte de uma filial (carregada sob demanda e mantida para as próximas chamadas)."""
+        with self._lock.read_lock():
+            source = self._branches.get(filial)
+        if source is not None:
+            return source
+
+        path = self.root_dir / f"{PARTITION_COLUMN}={filial}"
+        if not path.is_dir():
+            raise KeyError(f"Filial '{filial}' não encontrada em {self.root_dir}")
+        with self._lock.write_lock():
+            source = self._branches.get(filial)
+            if source is None:
+                source = FilialMadureiraDataSource(
+                    file_path=path, reload_check_interval=self.reload_check_interval
+                )
+                source.connect()
+                self._branches[filial] = source
+        return source
+
+    def _get_dataset(self) -> ds.Dataset:
+        """Dataset pyarrow da raiz, redescoberto quando arquivos mudam."""
+        with self._lock.read_lock():
+            dataset = self._dataset
+            last_check = self._last_version_check
+        interval = self.reload_check_interval
+        if dataset is not None and (
+            interval is None or time.monotonic() - last_check < interval
+        ):
+            return dataset
+        return self._refresh.do("dataset", self._refresh_dataset)
+
+    def _refresh_dataset(self) -> ds.Dataset:
+        """Verifica a versão e redescobre os arquivos fora do lock; só a troca é exclusiva."""
+        version = file_version(self.root_dir)
+        with self._lock.read_lock():
+            dataset, current = self._dataset, self._version
+        if dataset is None or version != current:
+            dataset = ds.dataset(
+                self.root_dir,
+                format="parquet",
+                partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+            )
+            with self._lock.write_lock():
+                self._dataset = dataset
+                self._version = version
+                self._sql_engines = {}
+                self._last_version_check = time.monotonic()
+        else:
+            with self._lock.write_lock():
+                self._last_version_check = time.monotonic()
+        return dataset
+
+    def get_version(self) -> Optional[str]:
+        """Versão do dataset particionado (muda quando qualquer partição muda)."""
+        self._get_dataset()
+        return self._version
+
+    @staticmethod
+    def _partition_filter(filiais: Optional[List[str]]) -> Optional[ds.Expression]:
+        if not filiais:
+            return None
+        return pc.field(PARTITION_COLUMN).isin([str(filial) for filial in filiais])
+
+    def count_fragments(
+        self, filiais: Optional[List[str]] = None, filters: Optional[FilterSpec] = None
+    ) -> int:
+        """Número de arquivos que uma leitura com esses filtros precisa abrir."""
+        dataset = self._get_dataset()
+        expression = _build_filter_expression(filters, dataset.schema)
+        partition = self._partition_filter(filiais)
+        if partition is not None:
+            expression = partition if expression is None else expression & partition
+        return sum(1 for _ in dataset.get_fragments(filter=expression))
+
+    def scan(
+        self,
+        columns: Optional[List[str]] = None,
+        filters: Optional[FilterSpec] = None,
+        limit: int = None,
+        filiais: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Lê as filiais pedidas com projeção e filtro (partições podadas pelo filtro).
+
+        A coluna 'filial' é sempre incluída para identificar a origem das linhas.
+        """
+        if columns and PARTITION_COLUMN not in columns:
+            columns = [*columns, PARTITION_COLUMN]
+        try:
+            return _scan_dataset(
+                self._get_dataset(), columns, filters, limit, self._partition_filter(filiais)
+            )
+        except KeyError as e:
+            logger.warning(e.args[0])
+            return pd.DataFrame()
+        except Exception as e:
+            logger.error(f"Erro ao ler dataset particionado: {e}")
+            return pd.DataFrame()
+
+    def iter_batches(
+        self,
+        columns: Optional[List[str]] = None,
+        filters: Optional[FilterSpec] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        filiais: Optional[List[str]] = None,
+        as_arrow: bool = False,
+    ) -> Iterator[Union[pd.DataFrame, pa.RecordBatch]]:
+        """Percorre as filiais pedidas em lotes, lendo só as partições necessárias."""
+        if columns and PARTITION_COLUMN not in columns:
+            columns = [*columns, PARTITION_COLUMN]
+        return _iter_dataset_batches(
+            self._get_dataset(),
+            columns,
+            filters,
+            batch_size,
+            extra_filter=self._partition_filter(filiais),
+            as_arrow=as_arrow,
+        )
+
+    def _get_sql_engine(self, filiais: Optional[List[str]]) -> DuckDBQueryEngine:
+        dataset = self._get_dataset()
+        key = tuple(sorted(filiais or []))
+        with self._lock.read_lock():
+            engine = self._sql_engines.get(key)
+        if engine is not None:
+            return engine
+
+        partition = self._partition_filter(filiais)
+        scoped = dataset.filter(partition) if partition is not None else dataset
+        # 'filiais' e o nome da fonte padrão apontam para o mesmo recorte,
+        # então as consultas das ferramentas funcionam em qualquer escopo
+        engine = DuckDBQueryEngine({"filiais": scoped, DEFAULT_TABLE_NAME: scoped})
+        with self._lock.write_lock():
+            # Só guarda se o dataset não foi trocado enquanto o motor era criado
+            if self._dataset is dataset:
+                engine = self._sql_engines.setdefault(key, engine)
+        return engine
+
+    def execute_query(
+        self,
+        query: str,
+        params: QueryParams = None,
+        max_rows: Optional[int] = DEFAULT_MAX_ROWS,
+        filiais: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """SQL somente leitura sobre as filiais pedidas (tabela 'filiais')."""
+        return self._get_sql_engine(filiais).execute(query, params, max_rows=max_rows)
+
+    def iter_query(
+        self,
+        query: str,
+        params: QueryParams = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        filiais: Optional[List[str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """SQL somente leitura sobre as filiais pedidas, em lotes."""
+        return self._get_sql_engine(filiais).iter_batches(query, params, batch_size=batch_size)
+
+
 class DataSourceManager:
     """
     Gerenciador de fonte de dados centralizado.
-    Acessa unicamente: data/parquet/Filial_Madureira.parquet
+
+    Fonte padrão: data/parquet/Filial_Madureira.parquet. Se existir o dataset
+    particionado (data/parquet/filiais/filial=<nome>/...), chamadas com
+    `source` (uma filial ou lista de filiais) ou dentro de `filial_scope(...)`
+    são atendidas apenas pelas partições dessas filiais.
     """
 
-    def __init__(self):
-        self._source = FilialMadureiraDataSource()
+    def __init__(
+        self,
+        file_path: Optional[Path] = None,
+        partitioned_dir: Optional[Path] = None,
+    ):
+        self._source = FilialMadureiraDataSource(file_path)
         self._source.connect()
 
+        partitioned_dir = Path(partitioned_dir) if partitioned_dir else PARTITIONED_DATA_DIR
+        self._partitioned: Optional[PartitionedDataSource] = None
+        if partitioned_dir.is_dir():
+            self._partitioned = PartitionedDataSource(partitioned_dir)
+            logger.info(f"📊 Dataset particionado: {partitioned_dir}")
+
+    def _resolve_branches(self, source: Union[str, List[str], None]) -> Optional[List[str]]:
+        """
+        Filiais pedidas (parâmetro `source` ou escopo atual); None = fonte padrão.
+        """
+        filiais = source if source else _filial_scope.get()
+        if not filiais:
+            return None
+        if isinstance(filiais, str):
+            filiais = [filiais]
+        filiais = [str(filial) for filial in filiais if str(filial).lower() != DEFAULT_SOURCE_NAME]
+        if not filiais:
+            return None
+        if self._partitioned is None:
+            logger.warning(
+                f"Dataset particionado não encontrado; ignorando filiais {filiais} "
+                "e usando a fonte padrão."
+            )
+            return None
+        return filiais
+
+    def _branch_sources(self, filiais: List[str]) -> List[Tuple[str, FilialMadureiraDataSource]]:
+        sources = []
+        for filial in filiais:
+            try:
+                sources.append((filial, self._partitioned.branch(filial)))
+            except KeyError as e:
+                logger.warning(e.args[0])
+        return sources
+
+    def _from_branches(self, filiais: List[str], read, limit: Optional[int] = None) -> pd.DataFrame:
+        """Executa `read(fonte)` em cada filial e junta os resultados com a coluna 'filial'."""
+        frames = []
+        for filial, branch in self._branch_sources(filiais):
+            df = read(branch)
+            if df is not None and not df.empty:
+                frames.append(df.assign(**{PARTITION_COLUMN: filial}))
+        if not frames:
+            return pd.DataFrame()
+        result = pd.concat(frames, ignore_index=True)
+        return result.head(limit) if limit else result
+
     def get_data(
-        self, table_name: str = None, limit: int = None, source: str = None
+        self,
+        table_name: str = None,
+        limit: int = None,
+        source: str = None,
+        columns: Optional[List[str]] = None,
+        filters: Optional[FilterSpec] = None,
     ) -> pd.DataFrame:
-        """Obtém dados (table_name é ignorado)."""
-        return self._source.get_data(limit)
+        """
+        Obtém dados (table_name é ignorado).
+
+        Com `columns` e/ou `filters`, a leitura é feita com projeção e filtro
+        aplicados pelo scanner do pyarrow, decodificando só o necessário.
+        `source` escolhe a filial (ou lista de filiais) do dataset particionado.
+        """
+        filiais = self._resolve_branches(source)
+        if filiais is None:
+            return self._source.get_data(limit, columns=columns, filters=filters)
+        if len(filiais) == 1:
+            return self._partitioned.branch(filiais[0]).get_data(
+                limit, columns=columns, filters=filters
+            )
+        return self._partitioned.scan(columns, filters, limit, filiais=filiais)
+
+    def iter_batches(
+        self,
+        columns: Optional[List[str]] = None,
+        filters: Optional[FilterSpec] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        source: Union[str, List[str], None] = None,
+        as_arrow: bool = False,
+    ) -> Iterator[Union[pd.DataFrame, pa.RecordBatch]]:
+        """
+        Percorre os dados em lotes, com memória limitada ao tamanho do lote.
+
+        Usa o scanner do pyarrow com projeção e filtro (mesmo formato de
+        `get_filtered_data`); com várias filiais, as partições são lidas uma a
+        uma direto dos arquivos, sem montar o DataFrame completo.
+
+        Args:
+            columns: Colunas a ler (padrão: todas).
+            filters: Filtros aplicados na leitura.
+            batch_size: Número máximo de linhas por lote.
+            source: Filial ou lista de filiais do dataset particionado.
+            as_arrow: Se True, entrega pa.RecordBatch em vez de DataFrames.
+
+        Yields:
+            DataFrames (tipos do dataset; categorias podem variar entre lotes)
+            ou RecordBatches.
+        """
+        filiais = self._resolve_branches(source)
+        if filiais is None:
+            return self._source.iter_batches(columns, filters, batch_size, as_arrow=as_arrow)
+        return self._partitioned.iter_batches(
+            columns, filters, batch_size, filiais=filiais, as_arrow=as_arrow
+        )
+
+    def get_snapshot(self) -> pd.DataFrame:
+        """Retorna snapshot somente leitura (Copy-on-Write) do dataset completo."""
+        filiais = self._resolve_branches(None)
+        if filiais is None:
+            return self._source.get_snapshot()
+        if len(filiais) == 1:
+            return self._partitioned.branch(filiais[0]).get_snapshot()
+        return self._from_branches(filiais, lambda branch: branch.get_snapshot())
+
+    def get_cube(self) -> Optional[AggregateCube]:
+        """
+        Cubo de agregados GRUPO x FABRICANTE x mês, pré-calculado no carregamento.
+
+        Use `rollup(by, filters)`, `totals()` e `monthly()` para responder
+        agregações sem varrer as linhas do dataset. Com escopo de várias
+        filiais não há cubo (retorna None) e os chamadores usam as linhas.
+        """
+        filiais = self._resolve_branches(None)
+        if filiais is None:
+            return self._source.get_cube()
+        if len(filiais) == 1:
+            return self._partitioned.branch(filiais[0]).get_cube()
+        return None
+
+    def get_sales_matrix(self) -> Optional[SalesMatrix]:
+        """
+        Matriz de vendas produtos x meses com índice ITEM -> linhas.
+
+        Séries de produto são fatias (`product(item)`); séries por GRUPO ou
+        FABRICANTE (`series`, `by`), totais mensais e sazonalidade saem de
+        reduções pré-calculadas. Com escopo de várias filiais retorna None.
+        """
+        filiais = self._resolve_branches(None)
+        if filiais is None:
+            return self._source.get_sales_matrix()
+        if len(filiais) == 1:
+            return self._partitioned.branch(filiais[0]).get_sales_matrix()
+        return None
+
+    def get_product_sales(self, key: Any, column: str = "ITEM") -> Optional[pd.Series]:
+        """
+        Vendas mensais de um produto por ITEM ou CÓDIGO, da matriz de vendas.
+        Com escopo de várias filiais retorna None.
+        """
+        filiais = self._resolve_branches(None)
+        if filiais is None:
+            return self._source.get_product_sales(key, column=column)
+        if len(filiais) == 1:
+            return self._partitioned.branch(filiais[0]).get_product_sales(key, column=column)
+        return None
+
+    def get_dataset_version(self) -> Optional[str]:
+        """Versão do dataset carregado (muda a cada reload do arquivo)."""
+        filiais = self._resolve_branches(None)
+        if filiais is None:
+            return self._source.get_version()
+        if len(filiais) == 1:
+            return self._partitioned.branch(filiais[0]).get_version()
+        return self._partitioned.get_version()
+
+    def check_for_updates(self, wait: bool = False) -> bool:
+        """Recarrega o dataset se o arquivo mudou (ver FilialMadureiraDataSource)."""
+        return self._source.check_for_updates(wait=wait)
 
     def search_data(
         self,
@@ -184,46 +1914,238 @@ class DataSourceManager:
         value: str = None,
         limit: int = 10,
         source: str = None,
+        columns: Optional[List[str]] = None,
     ) -> pd.DataFrame:
         """Busca dados em coluna especificada."""
         if not column or not value:
             return pd.DataFrame()
-        return self._source.search(column, value, limit)
+        filiais = self._resolve_branches(source)
+        if filiais is None:
+            return self._source.search(column, value, limit, columns=columns)
+        return self._from_branches(
+            filiais, lambda branch: branch.search(column, value, limit, columns=columns), limit
+        )
 
     def get_filtered_data(
         self,
         table_name: str = None,
-        filters: Dict[str, Any] = None,
+        filters: FilterSpec = None,
         limit: int = None,
         source: str = None,
+        columns: Optional[List[str]] = None,
     ) -> pd.DataFrame:
-        """Busca com filtros."""
+        """
+        Busca com filtros.
+
+        `filters` aceita um dict {coluna: valor} (igualdade) ou uma lista de
+        condições (coluna, operador, valor) com os operadores ==, !=, >, >=,
+        <, <=, in, not in e contains, aplicadas via pushdown no pyarrow.
+        """
         if not filters:
             return pd.DataFrame()
-        return self._source.get_filtered_data(filters, limit)
+        filiais = self._resolve_branches(source)
+        if filiais is None:
+            return self._source.get_filtered_data(filters, limit, columns=columns)
+        if len(filiais) == 1:
+            return self._partitioned.branch(filiais[0]).get_filtered_data(
+                filters, limit, columns=columns
+            )
+        return self._partitioned.scan(columns, filters, limit, filiais=filiais)
 
-    def execute_query(self, query: str, params: Dict = None) -> List[Dict]:
-        """Não suportado."""
-        return []
+    # Versões assíncronas: o trabalho pandas/Arrow roda no executor limitado
+    # (core.utils.async_executor), fora do event loop. Levantam
+    # ExecutorBusyError quando não há vaga e asyncio.TimeoutError quando
+    # `timeout` estoura; cancelar a tarefa descarta a chamada.
+
+    async def aget_data(
+        self,
+        table_name: str = None,
+        limit: int = None,
+        source: str = None,
+        columns: Optional[List[str]] = None,
+        filters: Optional[FilterSpec] = None,
+        timeout: Optional[float] = None,
+    ) -> pd.DataFrame:
+        """Versão assíncrona de `get_data`."""
+        return await get_async_executor().run(
+            self.get_data, table_name, limit, source, columns, filters, timeout=timeout
+        )
+
+    async def asearch_data(
+        self,
+        table_name: str = None,
+        column: str = None,
+        value: str = None,
+        limit: int = 10,
+        source: str = None,
+        columns: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> pd.DataFrame:
+        """Versão assíncrona de `search_data`."""
+        return await get_async_executor().run(
+            self.search_data, table_name, column, value, limit, source, columns, timeout=timeout
+        )
+
+    async def aget_filtered_data(
+        self,
+        table_name: str = None,
+        filters: FilterSpec = None,
+        limit: int = None,
+        source: str = None,
+        columns: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> pd.DataFrame:
+        """Versão assíncrona de `get_filtered_data`."""
+        return await get_async_executor().run(
+            self.get_filtered_data, table_name, filters, limit, source, columns, timeout=timeout
+        )
+
+    def execute_query(
+        self,
+        query: str,
+        params: QueryParams = None,
+        max_rows: Optional[int] = DEFAULT_MAX_ROWS,
+        source: Union[str, List[str], None] = None,
+    ) -> List[Dict]:
+        """
+        Executa SQL somente leitura (DuckDB) sobre a tabela 'filial_madureira'.
+
+        Com filiais em escopo (`source` ou `filial_scope`), a mesma tabela (e o
+        apelido 'filiais') contém só as partições dessas filiais, com a coluna
+        'filial'.
+
+        Args:
+            query: Uma instrução SELECT/WITH. Colunas com espaços ou acentos
+                vão entre aspas duplas (ex.: "VENDA QTD JAN").
+            params: Parâmetros ligados (dict para $nome, lista para ?).
+            max_rows: Limite de linhas retornadas (None = sem limite).
+            source: Filial ou lista de filiais do dataset particionado.
+
+        Returns:
+            Lista de registros (dict por linha).
+
+        Raises:
+            ValueError: Consulta inválida, com operação proibida ou com erro.
+        """
+        filiais = self._resolve_branches(source)
+        if filiais is None:
+            result = self._source.execute_query(query, params, max_rows=max_rows)
+        else:
+            result = self._partitioned.execute_query(
+                query, params, max_rows=max_rows, filiais=filiais
+            )
+        return result.to_dict("records")
+
+    def iter_query(
+        self,
+        query: str,
+        params: QueryParams = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        source: Union[str, List[str], None] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """Executa SQL somente leitura e entrega o resultado em DataFrames por lote."""
+        filiais = self._resolve_branches(source)
+        if filiais is None:
+            return self._source.iter_query(query, params, batch_size=batch_size)
+        return self._partitioned.iter_query(
+            query, params, batch_size=batch_size, filiais=filiais
+        )
+
+    def lookup(
+        self, column: str, key: Any, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Busca exata O(1) por ITEM ou CÓDIGO usando o índice hash."""
+        filiais = self._resolve_branches(None)
+        if filiais is None:
+            return self._source.lookup(column, key, columns=columns)
+        return self._from_branches(
+            filiais, lambda branch: branch.lookup(column, key, columns=columns)
+        )
+
+    def get_many(
+        self,
+        keys: List[Any],
+        columns: Optional[List[str]] = None,
+        column: str = "ITEM",
+        source: Union[str, List[str], None] = None,
+    ) -> pd.DataFrame:
+        """
+        Busca vários produtos de uma vez por ITEM ou CÓDIGO (uma única passada).
+
+        Returns:
+            Linhas encontradas, na ordem das chaves pedidas.
+        """
+        filiais = self._resolve_branches(source)
+        if filiais is None:
+            return self._source.get_many(keys, columns=columns, column=column)
+        return self._from_branches(
+            filiais, lambda branch: branch.get_many(keys, columns=columns, column=column)
+        )
+
+    def missing_keys(
+        self, keys: List[Any], column: str = "ITEM", source: Union[str, List[str], None] = None
+    ) -> List[str]:
+        """Chaves pedidas que não existem (em nenhuma das filiais em escopo)."""
+        filiais = self._resolve_branches(source)
+        if filiais is None:
+            return self._source.missing_keys(keys, column=column)
+        missing = list(dict.fromkeys(_normalize_key(key) for key in keys))
+        for _, branch in self._branch_sources(filiais):
+            branch_missing = set(branch.missing_keys(missing, column=column))
+            missing = [key for key in missing if key in branch_missing]
+        return missing
+
+    def text_search(
+        self,
+        column: str,
+        query: str,
+        limit: Optional[int] = 10,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Busca textual ranqueada e sem acentos em DESCRIÇÃO/FABRICANTE."""
+        filiais = self._resolve_branches(None)
+        if filiais is None:
+            return self._source.text_search(column, query, limit, columns=columns)
+        return self._from_branches(
+            filiais, lambda branch: branch.text_search(column, query, limit, columns=columns), limit
+        )
 
     def get_available_sources(self) -> List[str]:
-        """Retorna fontes disponíveis."""
-        if self._source.is_connected():
-            return ["filial_madureira"]
-        return []
+        """Retorna fontes disponíveis (fonte padrão + filiais do dataset particionado)."""
+        sources = [DEFAULT_SOURCE_NAME] if self._source.is_connected() else []
+        if self._partitioned is not None:
+            sources.extend(self._partitioned.list_branches())
+        return sources
+
+    def list_branches(self) -> List[str]:
+        """Filiais disponíveis no dataset particionado."""
+        return self._partitioned.list_branches() if self._partitioned is not None else []
 
     def get_source_info(self) -> Dict[str, Any]:
         """Retorna informações da fonte."""
         return self._source.get_info()
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Uso de memória e acertos/faltas/despejos do registro de cache, por namespace."""
+        return get_cache_registry().stats()
+
 
 # Instância global singleton
 _data_manager_instance: Optional[DataSourceManager] = None
+_data_manager_lock = threading.Lock()
 
 
 def get_data_manager() -> DataSourceManager:
-    """Retorna instância singleton do DataSourceManager."""
+    """
+    Retorna instância singleton do DataSourceManager.
+
+    Thread-safe: em chamadas simultâneas só uma thread cria a instância.
+    """
     global _data_manager_instance
-    if _data_manager_instance is None:
-        _data_manager_instance = DataSourceManager()
-    return _data_manager_instance
+    instance = _data_manager_instance
+    if instance is None:
+        with _data_manager_lock:
+            if _data_manager_instance is None:
+                _data_manager_instance = DataSourceManager()
+            instance = _data_manager_instance
+    return instance
@@ -1,7 +1,17 @@
 from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator
 
 
 class BaseLLMAdapter(ABC):
     @abstractmethod
     def get_completion(self, prompt: str) -> str:
         pass
+
+    def get_completion_stream(self, *args: Any, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Resposta em pedaços ({"content": ...}, {"tool_calls": [...]} ou {"error": ...}).
+
+        Padrão para adaptadores sem streaming: a resposta inteira de
+        get_completion em um único pedaço.
+        """
+        yield self.get_completion(*args, **kwargs)
@@ -1,8 +1,11 @@
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import hashlib
 import logging
+import os
 import threading
 import time
-from queue import Queue
 import json # Adicionado para json.dumps
 from core.llm_base import BaseLLMAdapter
 from core.config.config import Config
@@ -19,10 +22,69 @@ except ImportError as e:
     print(f"Erro de importação do Gemini: {e}")
 
 
+# Prazo total (s) de uma chamada, incluindo retries e a espera por vaga
+GEMINI_CALL_TIMEOUT = float(os.getenv("GEMINI_CALL_TIMEOUT", "90"))
+# Chamadas simultâneas ao Gemini no processo (as demais esperam por uma vaga)
+GEMINI_MAX_CONCURRENT = int(os.getenv("GEMINI_MAX_CONCURRENT", "8"))
+# Modelos (GenerativeModel com as ferramentas já convertidas) mantidos em memória
+MODEL_CACHE_SIZE = 16
+
+# Compartilhados entre instâncias do adaptador (uma por sessão do Streamlit)
+_models: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+_tool_digests: "OrderedDict[int, Tuple[Any, str]]" = OrderedDict()
+_models_lock = threading.Lock()
+_call_slots = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENT)
+
+
+def _tools_digest(tools: Optional[Dict[str, Any]]) -> str:
+    """
+    Hash do conjunto de ferramentas. O mesmo objeto de declarações (tratado
+    como imutável) é reconhecido pela identidade, sem serializar de novo.
+    """
+    if not tools:
+        return ""
+    with _models_lock:
+        cached = _tool_digests.get(id(tools))
+        if cached is not None and cached[0] is tools:
+            return cached[1]
+    payload = json.dumps(tools, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    with _models_lock:
+        _tool_digests[id(tools)] = (tools, digest)
+        while len(_tool_digests) > MODEL_CACHE_SIZE:
+            _tool_digests.popitem(last=False)
+    return digest
+
+
+def clear_model_cache() -> None:
+    """Descarta os modelos em cache (ex.: após trocar a chave da API ou em testes)."""
+    with _models_lock:
+        _models.clear()
+        _tool_digests.clear()
+
+
+@contextmanager
+def _call_slot(timeout: float):
+    """Ocupa uma das GEMINI_MAX_CONCURRENT vagas de chamada até o fim do bloco."""
+    if not _call_slots.acquire(timeout=max(0.0, timeout)):
+        raise TimeoutError(
+            f"Sem vaga para chamar o Gemini: {GEMINI_MAX_CONCURRENT} chamadas em andamento"
+        )
+    try:
+        yield
+    finally:
+        _call_slots.release()
+
+
 class GeminiLLMAdapter(BaseLLMAdapter):
     """
     Adaptador para Google Gemini API.
     Implementa padrão similar ao OpenAI com retry automático e tratamento de erros.
+
+    Os modelos são reaproveitados entre chamadas, por (modelo, conjunto de
+    ferramentas), e cada chamada roda na thread de quem chama, ocupando uma
+    vaga limitada, com prazo repassado ao gRPC: ao estourar o prazo a
+    requisição é de fato cancelada, sem threads órfãs.
     """
 
     def __init__(self):
@@ -42,6 +104,7 @@ class GeminiLLMAdapter(BaseLLMAdapter):
         self.model_name = Config().GEMINI_MODEL_NAME
         self.max_retries = 3
         self.retry_delay = 2
+        self.timeout = GEMINI_CALL_TIMEOUT
 
         self.logger.info(f"Gemini adapter inicializado com modelo: {self.model_name}")
 
@@ -60,120 +123,207 @@ class GeminiLLMAdapter(BaseLLMAdapter):
         Returns:
             Dicionário com resultado ou erro
         """
+        deadline = time.monotonic() + self.timeout
+        try:
+            gemini_messages = self._convert_messages(messages)
+            model = self._get_model(tools)
+        except Exception as e:
+            self.logger.error(f"Erro ao preparar chamada Gemini: {e}", exc_info=True)
+            return {"error": f"Erro: {e}"}
+
+        for attempt in range(self.max_retries):
+            try:
+                with _call_slot(deadline - time.monotonic()):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.logger.info(
+                        f"Chamada Gemini (tentativa {attempt + 1}/"
+                        f"{self.max_retries})"
+                    )
+                    response = model.generate_content(
+                        gemini_messages, request_options={"timeout": remaining}
+                    )
+
+                self.logger.info("Chamada Gemini concluída.")
+                return self._parse_response(response)
+
+            except Exception as e:
+                retentable = self._is_retryable(e)
+                self.logger.warning(
+                    f"Erro Gemini na tentativa {attempt + 1}: {e} "
+                    f"(retentável: {retentable})"
+                )
+                if not self._wait_retry(retentable, attempt, deadline):
+                    return {"error": f"Erro: {e}"}
+
+        return {"error": f"Tempo limite de {self.timeout:.0f}s excedido na chamada ao Gemini"}
+
+    def get_completion_stream(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Obtém a resposta da API Gemini em streaming, trecho a trecho.
+
+        Produz {"content": "<trecho>"} a cada pedaço de texto recebido e, ao
+        final, {"tool_calls": [...]} se o modelo pediu uma ferramenta. Em caso
+        de falha produz {"error": "..."} e encerra. O retry só acontece antes
+        do primeiro trecho de texto: depois disso, repetir a chamada
+        duplicaria o texto já exibido.
+
+        Args:
+            messages: Lista de mensagens no formato OpenAI-like
+            tools: Dicionário opcional de ferramentas no formato Gemini (com 'function_declarations')
+        """
+        deadline = time.monotonic() + self.timeout
+        try:
+            gemini_messages = self._convert_messages(messages)
+            model = self._get_model(tools)
+        except Exception as e:
+            self.logger.error(f"Erro ao preparar chamada Gemini: {e}", exc_info=True)
+            yield {"error": f"Erro: {e}"}
+            return
+
         for attempt in range(self.max_retries):
+            emitted = False
             try:
-                q = Queue()
-
-                def worker():
-                    try:
-                        gemini_messages = self._convert_messages(messages)
-                        
-                        if tools:
-                            gemini_tools = self._convert_tools(tools)
-                        else:
-                            gemini_tools = []
-
-                        model = genai.GenerativeModel(
-                            model_name=self.model_name,
-                            tools=gemini_tools if gemini_tools else None,
-                        )
-
-                        chat_session = model.start_chat(history=gemini_messages[:-1])
-
-                        self.logger.info(
-                            f"Chamada Gemini (tentativa {attempt + 1}/"
-                            f"{self.max_retries})"
-                        )
-
-                        response = chat_session.send_message(gemini_messages[-1]["parts"])
-
-                        self.logger.info("Chamada Gemini concluída.")
-
-                        tool_calls = []
-                        content = ""
-                        
-                        if response.candidates:
-                            candidate = response.candidates[0]
-                            if candidate.content and candidate.content.parts:
-                                for part in candidate.content.parts:
-                                    if part.function_call:
-                                        function_call = part.function_call
-                                        tool_calls.append({
-                                            "id": f"call_{function_call.name}", # Gemini doesn't provide an ID, so we generate one
-                                            "function": {
-                                                "arguments": json.dumps(dict(function_call.args)),
-                                                "name": function_call.name,
-                                            },
-                                            "type": "function",
-                                        })
-                                        # Se há tool_call, o conteúdo textual deve ser vazio
-                                        content = "" 
-                                        break # Only handle the first function call for now
-                                    elif part.text:
-                                        content = part.text
-                                        break # Only handle the first text part for now
-                        
-                        result = {"content": content}
-                        if tool_calls:
-                            result["tool_calls"] = tool_calls
-                        
-                        q.put(result)
-
-                    except Exception as e:
-                        error_msg = str(e).lower()
-
-                        retentable = any(
-                            [
-                                "quota" in error_msg,
-                                "rate" in error_msg,
-                                "timeout" in error_msg,
-                                "500" in error_msg,
-                                "503" in error_msg,
-                                "429" in error_msg,
-                            ]
-                        )
-
-                        self.logger.warning(
-                            f"Erro Gemini na tentativa {attempt + 1}: {e} "
-                            f"(retentável: {retentable})"
-                        )
-
-                        q.put({"error": f"Erro: {e}", "retry": retentable})
-
-                thread = threading.Thread(target=worker)
-                thread.start()
-                thread.join(timeout=90.0)
-
-                if thread.is_alive():
-                    self.logger.warning(f"Thread timeout tentativa {attempt + 1}")
-                    continue
-
-                result = q.get()
-
-                if "error" not in result:
-                    return result
-
-                if result.get("retry") and (attempt < self.max_retries - 1):
-                    delay = self.retry_delay * (2**attempt)
+                # A vaga fica ocupada enquanto o stream é consumido
+                with _call_slot(deadline - time.monotonic()):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
                     self.logger.info(
-                        f"Aguardando {delay}s antes da próxima tentativa..."
+                        f"Chamada Gemini em streaming (tentativa {attempt + 1}/"
+                        f"{self.max_retries})"
                     )
-                    time.sleep(delay)
-                    continue
+                    response = model.generate_content(
+                        gemini_messages, stream=True, request_options={"timeout": remaining}
+                    )
+
+                    function_calls = []
+                    for chunk in response:
+                        for part in self._response_parts(chunk):
+                            if part.function_call:
+                                function_calls.append(part.function_call)
+                            elif part.text:
+                                emitted = True
+                                yield {"content": part.text}
 
-                return result
+                # Todas as chamadas de função do turno (o agente as executa em paralelo)
+                if function_calls:
+                    yield {"tool_calls": self._to_tool_calls(function_calls)}
+
+                self.logger.info("Streaming Gemini concluído.")
+                return
 
             except Exception as e:
-                self.logger.error(
-                    f"Erro externo tentativa {attempt + 1}: {e}", exc_info=True
+                retentable = self._is_retryable(e)
+                self.logger.warning(
+                    f"Erro Gemini no streaming, tentativa {attempt + 1}: {e} "
+                    f"(retentável: {retentable})"
                 )
-                if attempt < self.max_retries - 1:
-                    delay = self.retry_delay * (2**attempt)
-                    time.sleep(delay)
-                    continue
-                return {"error": f"Erro após {self.max_retries} tentativas: {e}"}
+                if emitted or not self._wait_retry(retentable, attempt, deadline):
+                    yield {"error": f"Erro: {e}"}
+                    return
+
+        yield {"error": f"Tempo limite de {self.timeout:.0f}s excedido na chamada ao Gemini"}
+
+    def _get_model(self, tools: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Any:
+        """
+        GenerativeModel para o conjunto de ferramentas, reaproveitado entre
+        chamadas: as declarações são convertidas só na primeira vez.
+        """
+        key = (self.model_name, _tools_digest(tools))
+        with _models_lock:
+            model = _models.get(key)
+            if model is not None:
+                _models.move_to_end(key)
+                return model
+
+        gemini_tools = self._convert_tools(tools) if tools else []
+        model = genai.GenerativeModel(
+            model_name=self.model_name,
+            tools=gemini_tools if gemini_tools else None,
+        )
+        self.logger.info(
+            f"Modelo Gemini criado ({len(gemini_tools)} ferramentas); "
+            f"reaproveitado nas próximas chamadas"
+        )
+
+        with _models_lock:
+            model = _models.setdefault(key, model)
+            _models.move_to_end(key)
+            while len(_models) > MODEL_CACHE_SIZE:
+                _models.popitem(last=False)
+        return model
+
+    def _wait_retry(self, retentable: bool, attempt: int, deadline: float) -> bool:
+        """Aguarda o backoff se ainda há tentativa e prazo; False = desistir."""
+        if not retentable or attempt >= self.max_retries - 1:
+            return False
+        delay = self.retry_delay * (2**attempt)
+        if time.monotonic() + delay >= deadline:
+            return False
+        self.logger.info(f"Aguardando {delay}s antes da próxima tentativa...")
+        time.sleep(delay)
+        return True
+
+    @staticmethod
+    def _response_parts(response: Any) -> List[Any]:
+        """Partes do primeiro candidato da resposta (ou de um trecho do stream)."""
+        if not response.candidates:
+            return []
+        content = response.candidates[0].content
+        return list(content.parts) if content and content.parts else []
+
+    def _parse_response(self, response: Any) -> Dict[str, Any]:
+        """
+        Converte a resposta do Gemini para {'content', 'tool_calls'}, com todas
+        as chamadas de função do turno (o modelo pode pedir várias de uma vez).
+        """
+        parts = self._response_parts(response)
+        function_calls = [part.function_call for part in parts if part.function_call]
+
+        if function_calls:
+            # Se há tool_call, o conteúdo textual deve ser vazio
+            return {"content": "", "tool_calls": self._to_tool_calls(function_calls)}
+
+        return {"content": "".join(part.text for part in parts if part.text)}
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Erros transitórios da API (cota, rate limit, timeout, 5xx)."""
+        error_msg = str(error).lower()
+        return any(
+            code in error_msg
+            for code in ("quota", "rate", "timeout", "500", "503", "429")
+        )
+
+    @staticmethod
+    def _to_tool_calls(function_calls: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Converte os function_calls de um turno para o formato OpenAI-like.
 
-        return {"error": f"Falha após {self.max_retries} tentativas"}
+        O Gemini não fornece IDs: são gerados a partir do nome, com sufixo
+        quando a mesma ferramenta é chamada mais de uma vez no turno.
+        """
+        tool_calls = []
+        seen: Dict[str, int] = {}
+        for function_call in function_calls:
+            count = seen.get(function_call.name, 0)
+            seen[function_call.name] = count + 1
+            suffix = f"_{count}" if count else ""
+            tool_calls.append({
+                "id": f"call_{function_call.name}{suffix}",
+                "function": {
+                    "arguments": json.dumps(dict(function_call.args)),
+                    "name": function_call.name,
+                },
+                "type": "function",
+            })
+        return tool_calls
 
     def _convert_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
         """
@@ -211,7 +361,8 @@ class GeminiLLMAdapter(BaseLLMAdapter):
                         {
                             "function_response": {
                                 "name": function_call["name"],
-                                "response": {"content": content}
+                                # O CustomLangChainLLM envia o resultado em function_call["response"]
+                                "response": function_call.get("response") or {"content": content}
                             }
                         }
                     ]
@@ -224,6 +375,18 @@ class GeminiLLMAdapter(BaseLLMAdapter):
                 self.logger.warning(f"Unexpected role encountered: {role}. Treating as 'user'.")
                 gemini_msg = {"role": "user", "parts": [{"text": content}]}
 
+            # Respostas de várias ferramentas do mesmo turno voltam ao modelo
+            # juntas, em um único conteúdo (uma parte por chamada)
+            if (
+                function_call
+                and not tool_calls
+                and gemini_messages
+                and gemini_messages[-1]["role"] == "user"
+                and all("function_response" in part for part in gemini_messages[-1]["parts"])
+            ):
+                gemini_messages[-1]["parts"].extend(gemini_msg["parts"])
+                continue
+
             gemini_messages.append(gemini_msg)
 
         return gemini_messages
@@ -1,8 +1,15 @@
 # core/llm_langchain_adapter.py
-from typing import Any, List, Optional, Dict
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Iterator, List, Optional, Dict, Tuple
+import asyncio
+import contextlib
 import json
+import threading
 
-from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import (
     BaseMessage,
@@ -12,6 +19,7 @@ from langchain_core.messages import (
     FunctionMessage,
     ToolMessage,
     ToolCall,
+    ToolCallChunk,
     AIMessageChunk,
 )
 from langchain_core.outputs import (
@@ -19,9 +27,13 @@ from langchain_core.outputs import (
     ChatGeneration,
     ChatGenerationChunk,
 )
+from langchain_core.pydantic_v1 import PrivateAttr
 
 from core.llm_base import BaseLLMAdapter
 
+# Mensagens convertidas mantidas por instância (histórico + passos do agente)
+MESSAGE_CACHE_SIZE = 256
+
 
 def _clean_json_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -48,10 +60,147 @@ def _clean_json_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
     return cleaned_schema
 
 
+def _convert_message(msg: BaseMessage) -> Dict[str, Any]:
+    # Convert LangChain messages to a generic dictionary format
+    # that GeminiLLMAdapter can understand (similar to OpenAI-like format)
+    if isinstance(msg, HumanMessage):
+        return {"role": "user", "content": msg.content}
+    elif isinstance(msg, AIMessage):
+        if msg.tool_calls:
+            processed_tool_calls = []
+            for tc in msg.tool_calls:
+                tc_dict = tc if isinstance(tc, dict) else tc.dict()
+                processed_tool_calls.append({
+                    "id": tc_dict.get("id"),
+                    "type": "function",
+                    "function": {
+                        "name": tc_dict.get("name"),
+                        "arguments": json.dumps(tc_dict.get("args", {})),
+                    },
+                })
+            return {
+                "role": "model",
+                "content": msg.content,
+                "tool_calls": processed_tool_calls,
+            }
+        return {"role": "model", "content": msg.content}
+    elif isinstance(msg, SystemMessage):
+        # Treat SystemMessage as a user message for Gemini
+        return {"role": "user", "content": msg.content}
+    elif isinstance(msg, FunctionMessage):
+        # FunctionMessage is typically a tool response in LangChain
+        # Convert it to a user message with function_response for Gemini
+        return {
+            "role": "user",
+            "function_call": { # This key is used by GeminiLLMAdapter to identify tool responses
+                "name": msg.name, # The name of the tool that was called
+                "response": {"content": str(msg.content)}
+            }
+        }
+    elif isinstance(msg, ToolMessage):
+        # ToolMessage is also a tool response in LangChain
+        # Convert it to a user message with function_response for Gemini
+
+        # Extract tool name from ToolMessage (o AgentExecutor o coloca em additional_kwargs)
+        tool_name = msg.name or msg.additional_kwargs.get("name")
+
+        # Fallback: if name is empty, try to extract from tool_call_id
+        if not tool_name or tool_name == "":
+            if hasattr(msg, 'tool_call_id') and msg.tool_call_id:
+                # tool_call_id format is typically "call_<function_name>"
+                tool_name = msg.tool_call_id.replace("call_", "")
+            else:
+                # Last resort: use a default name
+                tool_name = "unknown_tool"
+
+        return {
+            "role": "user", # Tool responses are part of the user's turn
+            "function_call": { # This key is used by GeminiLLMAdapter to identify tool responses
+                "name": tool_name,  # The name of the tool that was called
+                "response": {"content": str(msg.content)}
+            }
+        }
+    else:
+        raise ValueError(f"Unsupported message type: {type(msg)}")
+
+
+def _message_key(msg: BaseMessage) -> Optional[Tuple[Any, ...]]:
+    """Chave da conversão de uma mensagem (None = conteúdo não textual, sem cache)."""
+    if not isinstance(msg.content, str):
+        return None
+    tool_calls = tuple(repr(tc) for tc in getattr(msg, "tool_calls", None) or ())
+    return (
+        type(msg),
+        msg.content,
+        getattr(msg, "name", None),
+        getattr(msg, "tool_call_id", None),
+        tool_calls,
+    )
+
+
+def _tool_declaration(tool: Any) -> Dict[str, Any]:
+    """Declaração de função (formato Gemini) de uma ferramenta do LangChain."""
+    if hasattr(tool, 'name') and hasattr(tool, 'description') and hasattr(tool, 'args'):
+        # LangChain's StructuredTool has 'name', 'description', and 'args'
+        # 'args' is already a dictionary representing the parameters
+
+        # Infer required parameters: those without a default value
+        required_params = [
+            param for param, details in tool.args.items()
+            if details.get("default") is None and details.get("type") != "null"
+        ]
+
+        # Create a copy of tool.args and remove 'default' if it's causing issues
+        processed_args = {}
+        for param, details in tool.args.items():
+            param_details = details.copy()
+            if "default" in param_details:
+                del param_details["default"] # Remover a chave 'default'
+            if "title" in param_details: # Remover a chave 'title'
+                del param_details["title"]
+            processed_args[param] = param_details
+
+        # Limpar o esquema de processed_args para remover 'anyOf'
+        cleaned_processed_args = _clean_json_schema(processed_args)
+
+        return {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": {
+                "type": "object",
+                "properties": cleaned_processed_args, # Usar cleaned_processed_args
+                "required": required_params,
+            },
+        }
+    elif isinstance(tool, dict) and "name" in tool and "description" in tool and "parameters" in tool:
+        # If it's already a dictionary in the expected function declaration format
+        return tool
+
+    # Fallback for other tool types or if the tool object is not fully formed
+    # This might need more robust handling depending on actual tool types
+    print(f"Warning: Unexpected tool format encountered: {type(tool)} - {tool}")
+    if hasattr(tool, 'name') and hasattr(tool, 'description'):
+        return {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": {"type": "object", "properties": {}}, # Empty parameters
+        }
+    raise ValueError(f"Unsupported tool object: {tool}")
+
+
 class CustomLangChainLLM(BaseChatModel):
     llm_adapter: BaseLLMAdapter
     tools: Optional[List[Any]] = None # Adicionado para permitir o campo 'tools'
 
+    # Caches por instância: declarações pela identidade da ferramenta e
+    # mensagens convertidas pelo conteúdo (ver _convert_tools e _convert_messages)
+    _tool_declarations: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    _declarations: Dict[int, Tuple[Any, Dict[str, Any]]] = PrivateAttr(default_factory=dict)
+    _converted_messages: "OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = PrivateAttr(
+        default_factory=OrderedDict
+    )
+    _cache_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
     @property
     def _llm_type(self) -> str:
         return "custom_llm"
@@ -78,8 +227,69 @@ class CustomLangChainLLM(BaseChatModel):
         # want to create a new runnable that wraps the model and the tools.
         new_instance = self.__class__(llm_adapter=self.llm_adapter, **kwargs)
         new_instance.tools = tools  # Store tools for _generate to access
+        # Declarações compiladas uma vez aqui (reaproveitando as já compiladas
+        # por esta instância) e repassadas por referência a cada chamada
+        new_instance._declarations = self._declarations
+        new_instance._tool_declarations = new_instance._compile_tools(tools) if tools else None
         return new_instance
 
+    def _convert_messages(self, messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+        """
+        Converte as mensagens para o formato genérico do adaptador.
+
+        Incremental entre os passos do agente: o prompt do sistema, o
+        histórico e o scratchpad se repetem a cada passo (como cópias rasas,
+        feitas pelo ChatPromptValue), então cada mensagem é convertida uma vez
+        e reaproveitada pelo conteúdo. Os dicionários devolvidos são
+        compartilhados e não devem ser alterados.
+        """
+        generic_messages = []
+        for msg in messages:
+            key = _message_key(msg)
+            if key is None:
+                generic_messages.append(_convert_message(msg))
+                continue
+
+            with self._cache_lock:
+                converted = self._converted_messages.get(key)
+                if converted is not None:
+                    self._converted_messages.move_to_end(key)
+            if converted is None:
+                converted = _convert_message(msg)
+                with self._cache_lock:
+                    self._converted_messages[key] = converted
+                    while len(self._converted_messages) > MESSAGE_CACHE_SIZE:
+                        self._converted_messages.popitem(last=False)
+            generic_messages.append(converted)
+
+        return generic_messages
+
+    def _convert_tools(self, tools: Optional[List[Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Declarações das ferramentas no formato esperado pelo adaptador.
+
+        As ferramentas ligadas via bind_tools já vêm compiladas, e o mesmo
+        objeto é repassado a cada chamada (o adaptador reaproveita o modelo
+        pela identidade). Ferramentas passadas em kwargs usam o cache por
+        identidade de cada ferramenta.
+        """
+        if self.tools:
+            if self._tool_declarations is None:
+                self._tool_declarations = self._compile_tools(self.tools)
+            return self._tool_declarations
+        return self._compile_tools(tools) if tools else None
+
+    def _compile_tools(self, tools: List[Any]) -> Dict[str, Any]:
+        declarations = []
+        for tool in tools:
+            cached = self._declarations.get(id(tool))
+            if cached is None or cached[0] is not tool:
+                cached = self._declarations[id(tool)] = (tool, _tool_declaration(tool))
+            declarations.append(cached[1])
+
+        # Gemini API expects a single list of function declarations under a 'function_declarations' key
+        return {"function_declarations": declarations}
+
     def _generate(
         self,
         messages: List[BaseMessage],
@@ -87,141 +297,8 @@ class CustomLangChainLLM(BaseChatModel):
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> ChatResult:
-        # Convert LangChain messages to a generic dictionary format
-        # that GeminiLLMAdapter can understand (similar to OpenAI-like format)
-        generic_messages = []
-        for msg in messages:
-            if isinstance(msg, HumanMessage):
-                generic_messages.append({"role": "user", "content": msg.content})
-            elif isinstance(msg, AIMessage):
-                if msg.tool_calls:
-                    processed_tool_calls = []
-                    for tc in msg.tool_calls:
-                        tc_dict = tc if isinstance(tc, dict) else tc.dict()
-                        processed_tool_calls.append({
-                            "id": tc_dict.get("id"),
-                            "type": "function",
-                            "function": {
-                                "name": tc_dict.get("name"),
-                                "arguments": json.dumps(tc_dict.get("args", {})),
-                            },
-                        })
-                    generic_messages.append(
-                        {
-                            "role": "model",
-                            "content": msg.content,
-                            "tool_calls": processed_tool_calls,
-                        }
-                    )
-                else:
-                    generic_messages.append(
-                        {"role": "model", "content": msg.content}
-                    )
-            elif isinstance(msg, SystemMessage):
-                # Treat SystemMessage as a user message for Gemini
-                generic_messages.append({"role": "user", "content": msg.content})
-            elif isinstance(msg, FunctionMessage):
-                # FunctionMessage is typically a tool response in LangChain
-                # Convert it to a user message with function_response for Gemini
-                generic_messages.append(
-                    {
-                        "role": "user",
-                        "function_call": { # This key is used by GeminiLLMAdapter to identify tool responses
-                            "name": msg.name, # The name of the tool that was called
-                            "response": {"content": str(msg.content)}
-                        }
-                    }
-                )
-            elif isinstance(msg, ToolMessage):
-                # ToolMessage is also a tool response in LangChain
-                # Convert it to a user message with function_response for Gemini
-
-                # Extract tool name from ToolMessage
-                tool_name = msg.name
-
-                # Fallback: if name is empty, try to extract from tool_call_id
-                if not tool_name or tool_name == "":
-                    if hasattr(msg, 'tool_call_id') and msg.tool_call_id:
-                        # tool_call_id format is typically "call_<function_name>"
-                        tool_name = msg.tool_call_id.replace("call_", "")
-                    else:
-                        # Last resort: use a default name
-                        tool_name = "unknown_tool"
-
-                generic_messages.append(
-                    {
-                        "role": "user", # Tool responses are part of the user's turn
-                        "function_call": { # This key is used by GeminiLLMAdapter to identify tool responses
-                            "name": tool_name,  # The name of the tool that was called
-                            "response": {"content": str(msg.content)}
-                        }
-                    }
-                )
-            else:
-                raise ValueError(f"Unsupported message type: {type(msg)}")
-
-        # Check if tools were bound via bind_tools or passed directly in kwargs
-        tools_to_pass = getattr(self, 'tools', None) or kwargs.get("tools")
-        if tools_to_pass:
-            generic_tools_declarations = []
-            for tool in tools_to_pass:
-                if hasattr(tool, 'name') and hasattr(tool, 'description') and hasattr(tool, 'args'):
-                    # LangChain's StructuredTool has 'name', 'description', and 'args'
-                    # 'args' is already a dictionary representing the parameters
-                    
-                    # Infer required parameters: those without a default value
-                    required_params = [
-                        param for param, details in tool.args.items() 
-                        if details.get("default") is None and details.get("type") != "null"
-                    ]
-
-                    # Create a copy of tool.args and remove 'default' if it's causing issues
-                    processed_args = {}
-                    for param, details in tool.args.items():
-                        param_details = details.copy()
-                        if "default" in param_details:
-                            del param_details["default"] # Remover a chave 'default'
-                        if "title" in param_details: # Remover a chave 'title'
-                            del param_details["title"]
-                        processed_args[param] = param_details
-
-                    # Limpar o esquema de processed_args para remover 'anyOf'
-                    cleaned_processed_args = _clean_json_schema(processed_args)
-
-                    generic_tools_declarations.append(
-                        {
-                            "name": tool.name,
-                            "description": tool.description,
-                            "parameters": {
-                                "type": "object",
-                                "properties": cleaned_processed_args, # Usar cleaned_processed_args
-                                "required": required_params,
-                            },
-                        }
-                    )
-                elif isinstance(tool, dict) and "name" in tool and "description" in tool and "parameters" in tool:
-                    # If it's already a dictionary in the expected function declaration format
-                    generic_tools_declarations.append(tool)
-                else:
-                    # Fallback for other tool types or if the tool object is not fully formed
-                    # This might need more robust handling depending on actual tool types
-                    print(f"Warning: Unexpected tool format encountered: {type(tool)} - {tool}")
-                    if hasattr(tool, 'name') and hasattr(tool, 'description'):
-                         generic_tools_declarations.append(
-                                {
-                                    "name": tool.name,
-                                    "description": tool.description,
-                                    "parameters": {"type": "object", "properties": {}}, # Empty parameters
-                                }
-                        )
-                    else:
-                        raise ValueError(f"Unsupported tool object: {tool}")
-
-            # Gemini API expects a single list of function declarations under a 'function_declarations' key
-            tools_to_pass = {"function_declarations": generic_tools_declarations}
-        else:
-            tools_to_pass = None
-
+        generic_messages = self._convert_messages(messages)
+        tools_to_pass = self._convert_tools(kwargs.get("tools"))
 
         llm_response = self.llm_adapter.get_completion(
             messages=generic_messages, tools=tools_to_pass
@@ -270,13 +347,66 @@ class CustomLangChainLLM(BaseChatModel):
         stop: Optional[List[str]] = None,
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
-    ) -> ChatResult:
-        chat_result = self._generate(messages, stop, run_manager, **kwargs)
-        generation = chat_result.generations[0]
-        ai_message = generation.message
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        Repassa os trechos do adaptador (get_completion_stream) à medida que
+        chegam: texto vira AIMessageChunk (e on_llm_new_token) e as chamadas de
+        ferramenta viram tool_call_chunks, que o LangChain junta no AIMessage final.
+        """
+        generic_messages = self._convert_messages(messages)
+        tools_to_pass = self._convert_tools(kwargs.get("tools"))
 
-        message_chunk = AIMessageChunk(
-            content=ai_message.content, tool_calls=ai_message.tool_calls
-        )
+        tool_call_index = 0
+        for piece in self.llm_adapter.get_completion_stream(
+            messages=generic_messages, tools=tools_to_pass
+        ):
+            if "error" in piece:
+                raise Exception(f"LLM Adapter Error: {piece['error']}")
+
+            content = piece.get("content") or ""
+            tool_call_chunks = []
+            for tc_data in piece.get("tool_calls") or []:
+                tool_call_chunks.append(
+                    ToolCallChunk(
+                        name=tc_data["function"]["name"],
+                        args=tc_data["function"]["arguments"],
+                        id=tc_data["id"],
+                        index=tool_call_index,
+                    )
+                )
+                tool_call_index += 1
+
+            if not content and not tool_call_chunks:
+                continue
 
-        yield ChatGenerationChunk(message=message_chunk)
+            chunk = ChatGenerationChunk(
+                message=AIMessageChunk(content=content, tool_call_chunks=tool_call_chunks)
+            )
+            if run_manager and content:
+                run_manager.on_llm_new_token(content, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        # O adaptador é síncrono: cada trecho é lido em uma thread do executor
+        # padrão, sem bloquear o event loop entre um trecho e outro
+        loop = asyncio.get_running_loop()
+        iterator = self._stream(messages, stop, None, **kwargs)
+        done = object()
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, next, iterator, done)
+                if chunk is done:
+                    break
+                if run_manager and chunk.text:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            # Consumidor parou antes do fim: encerra a chamada ao adaptador
+            with contextlib.suppress(ValueError):
+                iterator.close()
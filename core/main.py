@@ -2,15 +2,24 @@
 import logging
 import subprocess
 import sys
-from fastapi import FastAPI
+import asyncio
+import json
+from fastapi import FastAPI, HTTPException
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
+from core.data_source_manager import get_data_manager
+from core.utils.async_executor import ExecutorBusyError, get_async_executor
+from core.utils.env_setup import enable_copy_on_write
+
 # Configuração do logging
 logging.basicConfig(
     level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# Snapshots do dataset e entradas de cache servidos como cópias rasas
+enable_copy_on_write()
+
 
 # --- Lógica para ler credenciais ---
 def get_db_credentials_from_file() -> dict:
@@ -64,6 +73,8 @@ def trigger_pipeline_subprocess():
         logging.info(f"STDOUT:\n{process.stdout}")
         if process.stderr:
             logging.warning(f"STDERR:\n{process.stderr}")
+        # Publica a nova versão dos dados sem reiniciar (troca atômica do snapshot)
+        get_data_manager().check_for_updates()
     except subprocess.CalledProcessError as e:
         logging.error(
             f"Subprocesso do pipeline falhou com código de saída {e.returncode}"
@@ -102,6 +113,7 @@ async def startup_event():
 async def shutdown_event():
     logging.info("Encerrando o agendador de tarefas...")
     scheduler.shutdown()
+    get_async_executor().shutdown(wait=False)
 
 
 @app.get("/status", tags=["Monitoring"])
@@ -118,5 +130,21 @@ async def trigger_pipeline_endpoint():
     return {"message": "Execução do pipeline de dados iniciada."}
 
 
+@app.get("/dados/busca", tags=["Dados"])
+async def buscar_dados(coluna: str, valor: str, limite: int = 10, filial: str = None):
+    """Busca produtos sem bloquear o event loop (executor limitado)."""
+    try:
+        df = await get_data_manager().asearch_data(
+            column=coluna, value=valor, limit=min(limite, 500), source=filial, timeout=30
+        )
+    except ExecutorBusyError:
+        raise HTTPException(status_code=503, detail="Serviço ocupado, tente novamente")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Tempo limite da consulta excedido")
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"total": len(df), "dados": json.loads(df.to_json(orient="records", date_format="iso"))}
+
+
 # Para executar este servidor diretamente:
 # uvicorn core.main:app --reload
@@ -1,6 +1,9 @@
 # core/query_processor.py
 import logging
+from typing import Callable, Optional
+
 from core.agents.supervisor_agent import SupervisorAgent
+from core.data_source_manager import get_filial_scope
 from core.factory.component_factory import ComponentFactory
 from core.llm_factory import LLMFactory
 from core.cache import Cache
@@ -34,12 +37,16 @@ class QueryProcessor:
                 "GEMINI_API_KEY não configurada. Configure a chave da API do Google Gemini nos secrets do Streamlit Cloud."
             ) from e
 
-    def process_query(self, query: str) -> dict:
+    def process_query(
+        self, query: str, on_token: Optional[Callable[[str], None]] = None
+    ) -> dict:
         """
         Processa a consulta do usuário, delegando-a diretamente ao SupervisorAgent.
 
         Args:
             query (str): A consulta do usuário.
+            on_token (callable, opcional): Recebe o texto do LLM em streaming,
+                trecho a trecho, enquanto a resposta é gerada.
 
         Returns:
             dict: O resultado do processamento pelo agente especialista apropriado.
@@ -58,7 +65,10 @@ class QueryProcessor:
                 "output": "Eu sou um Agente de Negócios, pronto para ajudar com suas análises de dados."
             }
 
-        cached_result = self.cache.get(query)
+        # Respostas de filiais diferentes não se misturam no cache
+        filiais = get_filial_scope()
+        cache_key = query if not filiais else f"{query} [filiais: {', '.join(filiais)}]"
+        cached_result = self.cache.get(cache_key)
         if cached_result:
             self.logger.info(
                 f'Resultado recuperado do cache para a consulta: "{query}"'
@@ -66,6 +76,6 @@ class QueryProcessor:
             return cached_result
 
         self.logger.info(f'Delegando a consulta para o Supervisor: "{query}"')
-        result = self.supervisor.route_query(query)
-        self.cache.set(query, result)
+        result = self.supervisor.route_query(query, on_token=on_token)
+        self.cache.set(cache_key, result)
         return result
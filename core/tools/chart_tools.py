@@ -3,22 +3,43 @@ Ferramentas para geração de gráficos e visualizações.
 Integração com Plotly para análise visual de dados.
 """
 
+import contextvars
 import logging
-from typing import Dict, Any
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
 import pandas as pd
 import plotly.graph_objects as go
 from langchain_core.tools import tool
-from core.data_source_manager import get_data_manager
+from core.data_source_manager import get_data_manager, get_filial_scope, pinned_snapshot
+from core.utils.aggregate_cube import AggregateCube
+from core.utils.chart_cache import memoize_chart
 from core.visualization.advanced_charts import AdvancedChartGenerator
 
 logger = logging.getLogger(__name__)
 
+# Colunas de vendas mensais da Filial Madureira
+MES_COLS = {
+    'JAN': 'VENDA QTD JAN', 'FEV': 'VENDA QTD FEV', 'MAR': 'VENDA QTD MAR',
+    'ABR': 'VENDA QTD ABR', 'MAI': 'VENDA QTD MAI', 'JUN': 'VENDA QTD JUN',
+    'JUL': 'VENDA QTD JUL', 'AGO': 'VENDA QTD AGO', 'SET': 'VENDA QTD SET',
+    'OUT': 'VENDA QTD OUT', 'NOV': 'VENDA QTD NOV', 'DEZ': 'VENDA QTD DEZ'
+}
+
 
 def _get_theme_template() -> str:
     """Retorna o template de tema padrão."""
     return "plotly_white"
 
 
+def _cube_has(cube, dimension: str, *measures: str) -> bool:
+    """Indica se o cubo de agregados responde pela dimensão e medidas pedidas."""
+    return (
+        isinstance(cube, AggregateCube)
+        and dimension in cube.dimensions
+        and all(measure in cube.measures for measure in measures)
+    )
+
+
 def _apply_chart_customization(
     fig: go.Figure, title: str = "", show_legend: bool = True
 ) -> go.Figure:
@@ -52,6 +73,26 @@ def _apply_chart_customization(
     return fig
 
 
+# Dentro de um painel de dashboard as ferramentas devolvem a própria figura em
+# 'chart_data', para ser composta sem serializar e reinterpretar o JSON
+_figura_direta: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "figura_direta", default=False
+)
+
+
+def _versao_dados() -> Any:
+    """Versão do dataset usada na chave do cache de gráficos."""
+    return get_data_manager().get_dataset_version()
+
+
+# Resultados das ferramentas (figura serializada + resumo) memoizados por
+# ferramenta, argumentos, versão dos dados e escopo de filial. Painéis de
+# dashboard não passam pelo cache: o dashboard inteiro já é memoizado.
+_memoizar_grafico = memoize_chart(
+    version=_versao_dados, scope=get_filial_scope, bypass=_figura_direta.get
+)
+
+
 def _export_chart_to_json(fig: go.Figure) -> str:
     """
     Exporta figura como JSON para Streamlit.
@@ -60,12 +101,51 @@ def _export_chart_to_json(fig: go.Figure) -> str:
         fig: Figura Plotly
 
     Returns:
-        JSON string da figura
+        JSON string da figura (a própria figura quando chamada por um painel
+        de dashboard, ver _gerar_painel)
     """
+    if _figura_direta.get():
+        return fig
     return fig.to_json()
 
 
+def _gerar_painel(ferramenta, args: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Executa uma ferramenta de gráfico recebendo a go.Figure em 'chart_data'."""
+    token = _figura_direta.set(True)
+    try:
+        return ferramenta.invoke(args or {})
+    finally:
+        _figura_direta.reset(token)
+
+
+def _executar_paineis(tarefas: List[Callable[[], Any]]) -> List[Any]:
+    """
+    Calcula os painéis de um dashboard, em sequência, sobre a mesma versão dos dados.
+
+    Todas as tarefas rodam dentro de um pinned_snapshot(), então leem o mesmo
+    estado do dataset mesmo que um reload aconteça no meio. Os painéis são
+    código pandas/Plotly que segura o GIL: threads não os adiantariam, e a
+    única etapa que solta o GIL (a leitura do dataset) é compartilhada e
+    feita uma vez, ao fixar a versão.
+
+    Returns:
+        Resultados na ordem das tarefas; a exceção de uma tarefa que falhou
+        ocupa a posição dela (as demais não são afetadas).
+    """
+    resultados = []
+    with pinned_snapshot():
+        # Fixa a versão (e carrega o dataset, se preciso) antes dos painéis
+        get_data_manager().get_dataset_version()
+        for tarefa in tarefas:
+            try:
+                resultados.append(tarefa())
+            except Exception as e:
+                resultados.append(e)
+    return resultados
+
+
 @tool
+@_memoizar_grafico
 def gerar_grafico_vendas_por_categoria(
     limite: int = 10, ordenar_por: str = "descendente"
 ) -> Dict[str, Any]:
@@ -84,7 +164,7 @@ def gerar_grafico_vendas_por_categoria(
 
     try:
         manager = get_data_manager()
-        df = manager.get_data()
+        df = manager.get_data(columns=["GRUPO"])
 
         if df is None or df.empty or "GRUPO" not in df.columns:
             return {
@@ -135,6 +215,7 @@ def gerar_grafico_vendas_por_categoria(
 
 
 @tool
+@_memoizar_grafico
 def gerar_grafico_estoque_por_produto(
     limite: int = 15, minimo_estoque: int = 0
 ) -> Dict[str, Any]:
@@ -153,7 +234,7 @@ def gerar_grafico_estoque_por_produto(
 
     try:
         manager = get_data_manager()
-        df = manager.get_data()
+        df = manager.get_data(columns=["DESCRIÇÃO", "QTD"])
 
         if df is None or df.empty:
             return {"status": "error", "message": "Não foi possível carregar dados"}
@@ -170,7 +251,7 @@ def gerar_grafico_estoque_por_produto(
 
         # Preparar dados
         df_estoque = df[[nome_col, estoque_col]].copy()
-        df_estoque[estoque_col] = pd.to_numeric(df_estoque[estoque_col], errors='coerce').fillna(0)
+        df_estoque[estoque_col] = df_estoque[estoque_col].fillna(0)
         df_estoque = df_estoque[df_estoque[estoque_col] >= minimo_estoque]
         df_estoque = df_estoque.sort_values(estoque_col, ascending=False).head(limite)
 
@@ -223,6 +304,7 @@ def gerar_grafico_estoque_por_produto(
 
 
 @tool
+@_memoizar_grafico
 def gerar_comparacao_precos_categorias() -> Dict[str, Any]:
     """
     Gera gráfico de comparação de preços médios por grupo (categoria).
@@ -235,30 +317,48 @@ def gerar_comparacao_precos_categorias() -> Dict[str, Any]:
 
     try:
         manager = get_data_manager()
-        df = manager.get_data()
-
-        if df is None or df.empty:
-            return {"status": "error", "message": "Não foi possível carregar dados"}
 
         # As colunas de categoria e preço são 'GRUPO' e 'VENDA UNIT R$'
         categoria_col = 'GRUPO'
         preco_col = 'VENDA UNIT R$'
 
-        if not categoria_col in df.columns or not preco_col in df.columns:
-            return {
-                "status": "error",
-                "message": "Colunas 'GRUPO' e/ou 'VENDA UNIT R$' não encontradas",
-            }
+        cube = manager.get_cube()
+        if _cube_has(cube, categoria_col, preco_col):
+            # Preço médio/mín/máx por grupo direto do cubo de agregados
+            cubo_grupos = cube.rollup(categoria_col)
+            cubo_grupos = cubo_grupos[cubo_grupos[f"{preco_col}_contagem"] > 0]
+            preco_medio = pd.DataFrame(
+                {
+                    "mean": cubo_grupos[f"{preco_col}_media"],
+                    "min": cubo_grupos[f"{preco_col}_min"],
+                    "max": cubo_grupos[f"{preco_col}_max"],
+                    "count": cubo_grupos[f"{preco_col}_contagem"].astype(int),
+                }
+            ).reset_index()
+            totais = cube.totals()
+            preco_medio_geral = totais[f"{preco_col}_media"]
+        else:
+            df = manager.get_data(columns=[categoria_col, preco_col])
+
+            if df is None or df.empty:
+                return {"status": "error", "message": "Não foi possível carregar dados"}
+
+            if not categoria_col in df.columns or not preco_col in df.columns:
+                return {
+                    "status": "error",
+                    "message": "Colunas 'GRUPO' e/ou 'VENDA UNIT R$' não encontradas",
+                }
+
+            # Calcular preço médio por categoria (coluna já numérica pelo catálogo de tipos)
+            df = df.dropna(subset=[preco_col])
+
+            preco_medio = (
+                df.groupby(categoria_col, observed=True)[preco_col]
+                .agg(["mean", "min", "max", "count"])
+                .reset_index()
+            )
+            preco_medio_geral = df[preco_col].mean()
 
-        # Calcular preço médio por categoria
-        df[preco_col] = pd.to_numeric(df[preco_col], errors='coerce')
-        df = df.dropna(subset=[preco_col])
-        
-        preco_medio = (
-            df.groupby(categoria_col)[preco_col]
-            .agg(["mean", "min", "max", "count"])
-            .reset_index()
-        )
         preco_medio = preco_medio.sort_values("mean", ascending=False)
 
         # Criar gráfico com múltiplas séries
@@ -298,7 +398,7 @@ def gerar_comparacao_precos_categorias() -> Dict[str, Any]:
             "chart_data": _export_chart_to_json(fig),
             "summary": {
                 "grupos": len(preco_medio),
-                "preco_medio_geral": float(df[preco_col].mean()),
+                "preco_medio_geral": float(preco_medio_geral),
                 "preco_maximo": float(preco_medio["max"].max()),
                 "preco_minimo": float(preco_medio["min"].min()),
                 "grupos_data": preco_medio.to_dict("records"),
@@ -310,6 +410,7 @@ def gerar_comparacao_precos_categorias() -> Dict[str, Any]:
 
 
 @tool
+@_memoizar_grafico
 def gerar_analise_distribuicao_estoque() -> Dict[str, Any]:
     """
     Gera histograma e box plot da distribuição de estoque.
@@ -322,7 +423,7 @@ def gerar_analise_distribuicao_estoque() -> Dict[str, Any]:
 
     try:
         manager = get_data_manager()
-        df = manager.get_data()
+        df = manager.get_data(columns=["QTD"])
 
         if df is None or df.empty:
             return {"status": "error", "message": "Não foi possível carregar dados"}
@@ -333,8 +434,7 @@ def gerar_analise_distribuicao_estoque() -> Dict[str, Any]:
         if not estoque_col in df.columns:
             return {"status": "error", "message": "Coluna 'QTD' não encontrada"}
 
-        # Converter para numérico
-        df[estoque_col] = pd.to_numeric(df[estoque_col], errors="coerce")
+        # Coluna já numérica pelo catálogo de tipos do carregamento
         df = df.dropna(subset=[estoque_col])
 
         # Criar subplots
@@ -403,6 +503,7 @@ def gerar_analise_distribuicao_estoque() -> Dict[str, Any]:
 
 
 @tool
+@_memoizar_grafico
 def gerar_grafico_pizza_categorias() -> Dict[str, Any]:
     """
     Gera gráfico de pizza mostrando proporção de produtos por grupo (categoria).
@@ -415,7 +516,7 @@ def gerar_grafico_pizza_categorias() -> Dict[str, Any]:
 
     try:
         manager = get_data_manager()
-        df = manager.get_data()
+        df = manager.get_data(columns=["GRUPO"])
 
         if df is None or df.empty:
             return {"status": "error", "message": "Não foi possível carregar dados"}
@@ -462,6 +563,7 @@ def gerar_grafico_pizza_categorias() -> Dict[str, Any]:
 
 
 @tool
+@_memoizar_grafico
 def gerar_dashboard_analise_completa() -> Dict[str, Any]:
     """
     Gera dashboard completo com múltiplas visualizações em um único lugar.
@@ -474,7 +576,7 @@ def gerar_dashboard_analise_completa() -> Dict[str, Any]:
 
     try:
         manager = get_data_manager()
-        df = manager.get_data()
+        df = manager.get_data(columns=["GRUPO", "QTD", "VENDA UNIT R$", "DESCRIÇÃO"])
 
         if df is None or df.empty:
             return {"status": "error", "message": "Não foi possível carregar dados"}
@@ -491,10 +593,8 @@ def gerar_dashboard_analise_completa() -> Dict[str, Any]:
         if not all([categoria_col in df.columns, estoque_col in df.columns, preco_col in df.columns, nome_col in df.columns]):
             return {"status": "error", "message": "Colunas necessárias não encontradas"}
 
-        # Preparar dados
-        df_conv = df.copy()
-        df_conv[estoque_col] = pd.to_numeric(df_conv[estoque_col], errors="coerce")
-        df_conv[preco_col] = pd.to_numeric(df_conv[preco_col], errors="coerce")
+        # Colunas já tipadas no carregamento (catálogo de tipos): sem conversões
+        df_conv = df
 
         # Criar subplots 2x2
         fig = make_subplots(
@@ -549,7 +649,7 @@ def gerar_dashboard_analise_completa() -> Dict[str, Any]:
 
         # Gráfico 4: Preço médio
         preco_med = (
-            df_conv.groupby(categoria_col)[preco_col]
+            df_conv.groupby(categoria_col, observed=True)[preco_col]
             .mean()
             .sort_values(ascending=False)
         )
@@ -771,6 +871,7 @@ def gerar_grafico_automatico(descricao: str) -> Dict[str, Any]:
 
 
 @tool
+@_memoizar_grafico
 def gerar_grafico_vendas_mensais_produto(
     codigo_produto: int,
 ) -> Dict[str, Any]:
@@ -787,22 +888,21 @@ def gerar_grafico_vendas_mensais_produto(
     logger.info(f"Gerando gráfico de vendas mensais do produto {codigo_produto}")
 
     try:
-        manager = get_data_manager()
-        df_raw = manager.get_data()
-
-        if df_raw is None or df_raw.empty:
-            return {"status": "error", "message": "Não foi possível carregar dados"}
-
         # A coluna de código do produto é 'ITEM'
         codigo_col = 'ITEM'
-        
-        # Converter a coluna 'ITEM' para numérico para garantir a comparação
-        df_raw[codigo_col] = pd.to_numeric(df_raw[codigo_col], errors='coerce')
-        
-        # Filtrar por código de produto
-        df_produto = df_raw[df_raw[codigo_col] == codigo_produto].copy()
-
-        if df_produto.empty:
+
+        # Busca exata O(1) pelo índice de ITEM do DataSourceManager; série e
+        # dados do produto da mesma versão do dataset
+        manager = get_data_manager()
+        colunas = [codigo_col, "DESCRIÇÃO", "FABRICANTE", "GRUPO"]
+        with pinned_snapshot():
+            # Série mensal: linhas do ITEM na matriz produtos x meses
+            serie = manager.get_product_sales(codigo_produto, column=codigo_col)
+            if serie is None:
+                colunas += list(MES_COLS.values())
+            df_produto = manager.lookup(codigo_col, codigo_produto, columns=colunas)
+
+        if df_produto is None or df_produto.empty:
             return {
                 "status": "error",
                 "message": (
@@ -811,24 +911,19 @@ def gerar_grafico_vendas_mensais_produto(
                 ),
             }
 
-        # Extrair colunas de meses
-        mes_cols = {
-            'JAN': 'VENDA QTD JAN', 'FEV': 'VENDA QTD FEV', 'MAR': 'VENDA QTD MAR',
-            'ABR': 'VENDA QTD ABR', 'MAI': 'VENDA QTD MAI', 'JUN': 'VENDA QTD JUN',
-            'JUL': 'VENDA QTD JUL', 'AGO': 'VENDA QTD AGO', 'SET': 'VENDA QTD SET',
-            'OUT': 'VENDA QTD OUT', 'NOV': 'VENDA QTD NOV', 'DEZ': 'VENDA QTD DEZ'
-        }
-        
-        vendas_mensais = []
-        mes_labels = []
-        
-        for mes_abrev, col_name in mes_cols.items():
-            if col_name in df_produto.columns:
-                valor_bruto = df_produto[col_name].iloc[0]
-                valor_numerico = pd.to_numeric(valor_bruto, errors='coerce')
-                valor = 0 if pd.isna(valor_numerico) else valor_numerico
-                vendas_mensais.append(valor)
-                mes_labels.append(mes_abrev)
+        # Sem matriz (ou várias filiais em escopo), lê as 12 colunas do produto
+        if serie is not None:
+            mes_labels = serie.index.tolist()
+            vendas_mensais = [int(valor) for valor in serie.to_numpy()]
+        else:
+            vendas_mensais = []
+            mes_labels = []
+            produto = df_produto.iloc[0]
+            for mes_abrev, col_name in MES_COLS.items():
+                if col_name in df_produto.columns:
+                    valor = produto[col_name]
+                    vendas_mensais.append(0 if pd.isna(valor) else int(valor))
+                    mes_labels.append(mes_abrev)
 
         if not vendas_mensais:
             return {
@@ -928,6 +1023,7 @@ def gerar_grafico_vendas_mensais_produto(
 
 
 @tool
+@_memoizar_grafico
 def gerar_grafico_vendas_por_grupo(
     nome_grupo: str, agregacao: str = "soma"
 ) -> Dict[str, Any]:
@@ -946,57 +1042,77 @@ def gerar_grafico_vendas_por_grupo(
 
     try:
         manager = get_data_manager()
-        df = manager.get_data()
-
-        if df is None or df.empty:
-            return {"status": "error", "message": "Não foi possível carregar dados"}
+        cube = manager.get_cube()
+
+        if _cube_has(cube, "GRUPO") and cube.month_columns:
+            # Vendas mensais dos grupos que casam com o nome, direto do cubo
+            grupos = cube.match_dimension("GRUPO", nome_grupo)
+            if not grupos:
+                grupos_disponiveis = cube.dimension_values("GRUPO")[:10]
+                return {
+                    "status": "error",
+                    "message": (
+                        f"Grupo '{nome_grupo}' não encontrado. "
+                        f"Grupos disponíveis: {', '.join(map(str, grupos_disponiveis))}"
+                    )
+                }
 
-        # Verificar se coluna GRUPO existe
-        if "GRUPO" not in df.columns:
-            return {
-                "status": "error",
-                "message": "Coluna 'GRUPO' não encontrada no dataset"
-            }
+            filtro = {"GRUPO": grupos}
+            total_produtos = int(cube.totals(filtro)["PRODUTOS"])
+            agregacao_serie = "media" if agregacao == "media" else "soma"
+            matriz = manager.get_sales_matrix()
+            if matriz is not None and "GRUPO" in matriz.dimensions:
+                # Redução pré-calculada da matriz produtos x meses
+                serie_mensal = matriz.series("GRUPO", grupos, agregacao=agregacao_serie)
+            else:
+                serie_mensal = cube.monthly(filtro, agregacao=agregacao_serie)
+            mes_labels = serie_mensal.index.tolist()
+            vendas_mensais = [float(valor) for valor in serie_mensal.values]
+        else:
+            df = manager.get_data(columns=["GRUPO", *MES_COLS.values()])
 
-        # Filtrar produtos do grupo (case-insensitive)
-        df_grupo = df[df["GRUPO"].str.upper().str.contains(nome_grupo.upper(), na=False)].copy()
+            if df is None or df.empty:
+                return {"status": "error", "message": "Não foi possível carregar dados"}
 
-        if df_grupo.empty:
-            grupos_disponiveis = df["GRUPO"].unique()[:10]
-            return {
-                "status": "error",
-                "message": (
-                    f"Grupo '{nome_grupo}' não encontrado. "
-                    f"Grupos disponíveis: {', '.join(map(str, grupos_disponiveis))}"
-                )
-            }
+            # Verificar se coluna GRUPO existe
+            if "GRUPO" not in df.columns:
+                return {
+                    "status": "error",
+                    "message": "Coluna 'GRUPO' não encontrada no dataset"
+                }
 
-        # Colunas de vendas mensais
-        mes_cols = {
-            'JAN': 'VENDA QTD JAN', 'FEV': 'VENDA QTD FEV', 'MAR': 'VENDA QTD MAR',
-            'ABR': 'VENDA QTD ABR', 'MAI': 'VENDA QTD MAI', 'JUN': 'VENDA QTD JUN',
-            'JUL': 'VENDA QTD JUL', 'AGO': 'VENDA QTD AGO', 'SET': 'VENDA QTD SET',
-            'OUT': 'VENDA QTD OUT', 'NOV': 'VENDA QTD NOV', 'DEZ': 'VENDA QTD DEZ'
-        }
+            # Filtrar produtos do grupo (case-insensitive)
+            df_grupo = df[df["GRUPO"].str.upper().str.contains(nome_grupo.upper(), na=False)].copy()
+
+            if df_grupo.empty:
+                grupos_disponiveis = df["GRUPO"].unique()[:10]
+                return {
+                    "status": "error",
+                    "message": (
+                        f"Grupo '{nome_grupo}' não encontrado. "
+                        f"Grupos disponíveis: {', '.join(map(str, grupos_disponiveis))}"
+                    )
+                }
 
-        # Converter para numérico
-        for col in mes_cols.values():
-            if col in df_grupo.columns:
-                df_grupo[col] = pd.to_numeric(df_grupo[col], errors='coerce').fillna(0)
+            # Meses ausentes contam como zero (colunas já numéricas pelo catálogo)
+            for col in MES_COLS.values():
+                if col in df_grupo.columns:
+                    df_grupo[col] = df_grupo[col].fillna(0)
 
-        # Agregar vendas mensais
-        vendas_mensais = []
-        mes_labels = []
+            # Agregar vendas mensais
+            total_produtos = len(df_grupo)
+            vendas_mensais = []
+            mes_labels = []
 
-        for mes_abrev, col_name in mes_cols.items():
-            if col_name in df_grupo.columns:
-                if agregacao == "media":
-                    valor = df_grupo[col_name].mean()
-                else:  # soma (padrão)
-                    valor = df_grupo[col_name].sum()
+            for mes_abrev, col_name in MES_COLS.items():
+                if col_name in df_grupo.columns:
+                    if agregacao == "media":
+                        valor = df_grupo[col_name].mean()
+                    else:  # soma (padrão)
+                        valor = df_grupo[col_name].sum()
 
-                vendas_mensais.append(float(valor))
-                mes_labels.append(mes_abrev)
+                    vendas_mensais.append(float(valor))
+                    mes_labels.append(mes_abrev)
 
         if not vendas_mensais:
             return {
@@ -1066,7 +1182,7 @@ def gerar_grafico_vendas_por_grupo(
             "chart_data": _export_chart_to_json(fig),
             "summary": {
                 "grupo": nome_grupo.upper(),
-                "total_produtos": len(df_grupo),
+                "total_produtos": total_produtos,
                 "agregacao": agregacao,
                 "total_vendas": int(total_vendas),
                 "venda_media_mensal": float(venda_media),
@@ -1088,6 +1204,7 @@ def gerar_grafico_vendas_por_grupo(
 
 
 @tool
+@_memoizar_grafico
 def gerar_ranking_produtos_mais_vendidos(top_n: int = 10) -> Dict[str, Any]:
     """
     Gera um gráfico de barras horizontais com o ranking dos produtos mais vendidos no ano.
@@ -1103,20 +1220,32 @@ def gerar_ranking_produtos_mais_vendidos(top_n: int = 10) -> Dict[str, Any]:
 
     try:
         manager = get_data_manager()
-        df = manager.get_data()
+        # Matriz e snapshot da mesma versão: as posições da matriz indexam o snapshot
+        with pinned_snapshot():
+            matriz = manager.get_sales_matrix()
+            snapshot = manager.get_snapshot() if matriz is not None else None
+        if snapshot is not None and 'DESCRIÇÃO' in snapshot.columns:
+            # Top N pelos totais anuais pré-calculados da matriz (linhas = posições no dataset)
+            top = matriz.top_products(top_n)
+            ranking_df = pd.DataFrame({
+                'DESCRIÇÃO': snapshot['DESCRIÇÃO'].iloc[top.index].to_numpy(),
+                'VENDAS_TOTAIS': top.round().astype('int64').to_numpy(),
+            })
+        else:
+            df = manager.get_data(columns=["DESCRIÇÃO", *MES_COLS.values()])
 
-        if df is None or df.empty:
-            return {"status": "error", "message": "Não foi possível carregar dados."}
+            if df is None or df.empty:
+                return {"status": "error", "message": "Não foi possível carregar dados."}
 
-        mes_cols = [col for col in df.columns if 'VENDA QTD' in col]
-        if not mes_cols:
-            return {"status": "error", "message": "Nenhuma coluna de vendas mensais encontrada."}
+            mes_cols = [col for col in df.columns if 'VENDA QTD' in col]
+            if not mes_cols:
+                return {"status": "error", "message": "Nenhuma coluna de vendas mensais encontrada."}
 
-        # Calcular vendas totais
-        df['VENDAS_TOTAIS'] = df[mes_cols].sum(axis=1)
+            # Calcular vendas totais
+            df['VENDAS_TOTAIS'] = df[mes_cols].sum(axis=1)
+            ranking_df = df.sort_values('VENDAS_TOTAIS', ascending=False).head(top_n)
 
         # Preparar dados para o gráfico
-        ranking_df = df.sort_values('VENDAS_TOTAIS', ascending=False).head(top_n)
         ranking_df = ranking_df.sort_values('VENDAS_TOTAIS', ascending=True) # Para exibição correta no gráfico de barras horizontal
 
         # Criar gráfico
@@ -1256,6 +1385,7 @@ def listar_graficos_disponiveis() -> Dict[str, Any]:
 
 
 @tool
+@_memoizar_grafico
 def gerar_dashboard_executivo() -> Dict[str, Any]:
     """
     Gera dashboard executivo completo com os principais indicadores de negócio.
@@ -1276,25 +1406,25 @@ def gerar_dashboard_executivo() -> Dict[str, Any]:
 
     try:
         manager = get_data_manager()
-        df = manager.get_data()
+        # Snapshot, cubo e matriz de vendas da mesma versão do dataset
+        with pinned_snapshot():
+            snapshot = manager.get_snapshot()
+            cube = manager.get_cube()
+            matriz = manager.get_sales_matrix()
 
-        if df is None or df.empty:
+        if snapshot is None or snapshot.empty:
             return {"status": "error", "message": "Não foi possível carregar dados"}
 
         from plotly.subplots import make_subplots
 
-        # Preparar dados
-        df_conv = df.copy()
-
-        # Converter colunas para numérico
-        for col in ['QTD', 'VENDA UNIT R$', 'VENDA R$', 'LUCRO R$']:
-            if col in df_conv.columns:
-                df_conv[col] = pd.to_numeric(df_conv[col], errors='coerce').fillna(0)
-
-        # Calcular vendas totais se não existir
-        mes_cols = [col for col in df_conv.columns if 'VENDA QTD' in col]
-        if mes_cols:
-            df_conv['VENDAS_TOTAIS'] = df_conv[mes_cols].sum(axis=1)
+        # Lê as colunas do snapshot (sem cópia); os agregados saem do cubo e da
+        # matriz de vendas quando disponíveis (com escopo de várias filiais, das linhas)
+        colunas = snapshot.columns
+        mes_cols = [col for col in colunas if 'VENDA QTD' in col]
+        usar_cubo = _cube_has(cube, 'GRUPO', 'QTD', 'VENDA UNIT R$', 'LUCRO R$')
+        if usar_cubo:
+            cubo_grupos = cube.rollup('GRUPO')
+            totais_cubo = cube.totals()
 
         # Criar subplots 2x3
         fig = make_subplots(
@@ -1315,88 +1445,115 @@ def gerar_dashboard_executivo() -> Dict[str, Any]:
             horizontal_spacing=0.1
         )
 
-        # 1. Top 10 Grupos
-        if 'GRUPO' in df_conv.columns:
-            grupos = df_conv['GRUPO'].value_counts().head(10)
-            fig.add_trace(
-                go.Bar(
-                    x=grupos.index,
-                    y=grupos.values,
-                    name="Produtos",
-                    marker_color="#2563EB"
-                ),
-                row=1, col=1
+        def painel_grupos():
+            if 'GRUPO' not in colunas:
+                return None
+            if usar_cubo:
+                grupos = cubo_grupos['PRODUTOS'].sort_values(ascending=False).head(10)
+            else:
+                grupos = snapshot['GRUPO'].value_counts().head(10)
+            return go.Bar(
+                x=grupos.index,
+                y=grupos.values,
+                name="Produtos",
+                marker_color="#2563EB"
             )
 
-        # 2. Top 10 Produtos Mais Vendidos
-        if 'VENDAS_TOTAIS' in df_conv.columns and 'DESCRIÇÃO' in df_conv.columns:
-            top_vendas = df_conv.nlargest(10, 'VENDAS_TOTAIS')
-            fig.add_trace(
-                go.Bar(
-                    x=top_vendas['VENDAS_TOTAIS'],
-                    y=top_vendas['DESCRIÇÃO'],
-                    orientation='h',
-                    name="Vendas",
-                    marker_color="#10B981"
-                ),
-                row=1, col=2
+        def painel_mais_vendidos():
+            if not mes_cols or 'DESCRIÇÃO' not in colunas:
+                return None
+            if matriz is not None:
+                # Posições da matriz indexam o snapshot (mesma versão)
+                top = matriz.top_products(10)
+                vendas = top.to_numpy()
+                descricoes = snapshot['DESCRIÇÃO'].iloc[top.index].to_numpy()
+            else:
+                top = snapshot[mes_cols].sum(axis=1).reset_index(drop=True).nlargest(10)
+                vendas = top.to_numpy()
+                descricoes = snapshot['DESCRIÇÃO'].iloc[top.index].to_numpy()
+            return go.Bar(
+                x=vendas,
+                y=descricoes,
+                orientation='h',
+                name="Vendas",
+                marker_color="#10B981"
             )
 
-        # 3. Lucro por Grupo
-        if 'GRUPO' in df_conv.columns and 'LUCRO R$' in df_conv.columns:
-            lucro_grupo = df_conv.groupby('GRUPO')['LUCRO R$'].sum().sort_values(ascending=False).head(10)
-            fig.add_trace(
-                go.Bar(
-                    x=lucro_grupo.index,
-                    y=lucro_grupo.values,
-                    name="Lucro",
-                    marker_color="#F59E0B"
-                ),
-                row=1, col=3
+        def painel_lucro():
+            if 'GRUPO' not in colunas or 'LUCRO R$' not in colunas:
+                return None
+            if usar_cubo:
+                lucro_grupo = cubo_grupos['LUCRO R$_soma'].sort_values(ascending=False).head(10)
+            else:
+                lucro_grupo = snapshot.groupby('GRUPO', observed=True)['LUCRO R$'].sum().sort_values(ascending=False).head(10)
+            return go.Bar(
+                x=lucro_grupo.index,
+                y=lucro_grupo.values,
+                name="Lucro",
+                marker_color="#F59E0B"
             )
 
-        # 4. Distribuição de Estoque
-        if 'QTD' in df_conv.columns:
-            fig.add_trace(
-                go.Histogram(
-                    x=df_conv['QTD'],
-                    nbinsx=30,
-                    name="Estoque",
-                    marker_color="#8B5CF6"
-                ),
-                row=2, col=1
+        def painel_estoque():
+            if 'QTD' not in colunas:
+                return None
+            return go.Histogram(
+                x=snapshot['QTD'].fillna(0),
+                nbinsx=30,
+                name="Estoque",
+                marker_color="#8B5CF6"
             )
 
-        # 5. Preço Médio por Grupo
-        if 'GRUPO' in df_conv.columns and 'VENDA UNIT R$' in df_conv.columns:
-            preco_grupo = df_conv.groupby('GRUPO')['VENDA UNIT R$'].mean().sort_values(ascending=False).head(10)
-            fig.add_trace(
-                go.Bar(
-                    x=preco_grupo.index,
-                    y=preco_grupo.values,
-                    name="Preço Médio",
-                    marker_color="#EC4899"
-                ),
-                row=2, col=2
+        def painel_preco():
+            if 'GRUPO' not in colunas or 'VENDA UNIT R$' not in colunas:
+                return None
+            if usar_cubo:
+                preco_grupo = cubo_grupos['VENDA UNIT R$_media'].sort_values(ascending=False).head(10)
+            else:
+                preco_grupo = snapshot.groupby('GRUPO', observed=True)['VENDA UNIT R$'].mean().sort_values(ascending=False).head(10)
+            return go.Bar(
+                x=preco_grupo.index,
+                y=preco_grupo.values,
+                name="Preço Médio",
+                marker_color="#EC4899"
             )
 
-        # 6. Vendas Mensais Totais
-        if mes_cols:
-            vendas_mensais = df_conv[mes_cols].sum()
+        def painel_vendas_mensais():
+            if not mes_cols:
+                return None
+            if usar_cubo and cube.month_columns:
+                vendas_mensais = cube.monthly()
+            elif matriz is not None:
+                vendas_mensais = matriz.monthly()
+            else:
+                vendas_mensais = snapshot[mes_cols].sum()
             meses = ['JAN', 'FEV', 'MAR', 'ABR', 'MAI', 'JUN', 'JUL', 'AGO', 'SET', 'OUT', 'NOV', 'DEZ']
-            fig.add_trace(
-                go.Scatter(
-                    x=meses,
-                    y=vendas_mensais.values,
-                    mode='lines+markers',
-                    name="Vendas Mensais",
-                    line=dict(color="#14B8A6", width=3),
-                    marker=dict(size=8),
-                    fill='tozeroy'
-                ),
-                row=2, col=3
+            return go.Scatter(
+                x=meses,
+                y=vendas_mensais.values,
+                mode='lines+markers',
+                name="Vendas Mensais",
+                line=dict(color="#14B8A6", width=3),
+                marker=dict(size=8),
+                fill='tozeroy'
             )
 
+        paineis = {
+            (1, 1): painel_grupos,               # 1. Top 10 Grupos
+            (1, 2): painel_mais_vendidos,        # 2. Top 10 Produtos Mais Vendidos
+            (1, 3): painel_lucro,                # 3. Lucro por Grupo
+            (2, 1): painel_estoque,              # 4. Distribuição de Estoque
+            (2, 2): painel_preco,                # 5. Preço Médio por Grupo
+            (2, 3): painel_vendas_mensais,       # 6. Vendas Mensais Totais
+        }
+        for (row, col), painel in paineis.items():
+            try:
+                trace = painel()
+            except Exception as e:
+                logger.error(f"Erro no painel '{painel.__name__}': {e}", exc_info=True)
+                continue
+            if trace is not None:
+                fig.add_trace(trace, row=row, col=col)
+
         # Atualizar layout
         fig.update_layout(
             title_text="Dashboard Executivo - Visão Geral do Negócio",
@@ -1412,14 +1569,29 @@ def gerar_dashboard_executivo() -> Dict[str, Any]:
         fig.update_xaxes(tickangle=-45, row=2, col=2)
 
         # Calcular métricas
-        metricas = {
-            "total_produtos": len(df_conv),
-            "total_grupos": df_conv['GRUPO'].nunique() if 'GRUPO' in df_conv.columns else 0,
-            "lucro_total": float(df_conv['LUCRO R$'].sum()) if 'LUCRO R$' in df_conv.columns else 0,
-            "vendas_totais": float(df_conv['VENDAS_TOTAIS'].sum()) if 'VENDAS_TOTAIS' in df_conv.columns else 0,
-            "estoque_total": float(df_conv['QTD'].sum()) if 'QTD' in df_conv.columns else 0,
-            "valor_estoque": float((df_conv['QTD'] * df_conv['VENDA UNIT R$']).sum()) if all(c in df_conv.columns for c in ['QTD', 'VENDA UNIT R$']) else 0
-        }
+        if usar_cubo:
+            metricas = {
+                "total_produtos": int(totais_cubo['PRODUTOS']),
+                "total_grupos": len(cube.dimension_values('GRUPO')),
+                "lucro_total": float(totais_cubo['LUCRO R$_soma']),
+                "vendas_totais": float(totais_cubo.get('VENDAS_TOTAIS', 0)),
+                "estoque_total": float(totais_cubo['QTD_soma']),
+            }
+        else:
+            if matriz is not None:
+                vendas_totais = float(matriz.product_totals.sum())
+            else:
+                vendas_totais = float(snapshot[mes_cols].sum().sum()) if mes_cols else 0
+            metricas = {
+                "total_produtos": len(snapshot),
+                "total_grupos": snapshot['GRUPO'].nunique() if 'GRUPO' in colunas else 0,
+                "lucro_total": float(snapshot['LUCRO R$'].sum()) if 'LUCRO R$' in colunas else 0,
+                "vendas_totais": vendas_totais,
+                "estoque_total": float(snapshot['QTD'].sum()) if 'QTD' in colunas else 0,
+            }
+        metricas.update({
+            "valor_estoque": float((snapshot['QTD'] * snapshot['VENDA UNIT R$']).sum()) if all(c in colunas for c in ['QTD', 'VENDA UNIT R$']) else 0
+        })
 
         return {
             "status": "success",
@@ -1434,6 +1606,7 @@ def gerar_dashboard_executivo() -> Dict[str, Any]:
 
 
 @tool
+@_memoizar_grafico
 def gerar_dashboard_dinamico(graficos: list) -> Dict[str, Any]:
     """
     Gera um dashboard dinâmico com uma seleção de gráficos.
@@ -1458,7 +1631,6 @@ def gerar_dashboard_dinamico(graficos: list) -> Dict[str, Any]:
 
     from plotly.subplots import make_subplots
     import math
-    import json
 
     num_graficos = len(graficos)
     if num_graficos > 4:
@@ -1477,22 +1649,32 @@ def gerar_dashboard_dinamico(graficos: list) -> Dict[str, Any]:
         'gerar_ranking_produtos_mais_vendidos': gerar_ranking_produtos_mais_vendidos,
     }
 
-    figuras = []
-    titulos = []
+    # Painéis sobre o mesmo snapshot; as figuras chegam prontas (sem JSON)
+    selecionados = []
     for nome_ferramenta in graficos:
         if nome_ferramenta in tool_map:
-            try:
-                resultado = tool_map[nome_ferramenta].invoke({})
-                if resultado.get("status") == "success":
-                    chart_data = json.loads(resultado["chart_data"])
-                    figura_individual = go.Figure(chart_data)
-                    figuras.append(figura_individual)
-                    titulos.append(figura_individual.layout.title.text)
-                else:
-                    logger.warning(f"A ferramenta '{nome_ferramenta}' falhou: {resultado.get('message')}")
-            except Exception as e:
-                logger.error(f"Erro ao executar a ferramenta '{nome_ferramenta}': {e}", exc_info=True)
-    
+            selecionados.append(nome_ferramenta)
+        else:
+            logger.warning(f"Ferramenta de gráfico desconhecida ignorada: '{nome_ferramenta}'")
+    resultados = _executar_paineis(
+        [partial(_gerar_painel, tool_map[nome]) for nome in selecionados]
+    )
+
+    figuras = []
+    titulos = []
+    for nome_ferramenta, resultado in zip(selecionados, resultados):
+        if isinstance(resultado, Exception):
+            logger.error(
+                f"Erro ao executar a ferramenta '{nome_ferramenta}': {resultado}",
+                exc_info=resultado,
+            )
+        elif resultado.get("status") == "success":
+            figura_individual = resultado["chart_data"]
+            figuras.append(figura_individual)
+            titulos.append(figura_individual.layout.title.text)
+        else:
+            logger.warning(f"A ferramenta '{nome_ferramenta}' falhou: {resultado.get('message')}")
+
     if not figuras:
         return {"status": "error", "message": "Nenhum dos gráficos solicitados pôde ser gerado."}
 
@@ -1501,9 +1683,20 @@ def gerar_dashboard_dinamico(graficos: list) -> Dict[str, Any]:
     rows = math.ceil(num_graficos / 2)
     cols = 2 if num_graficos > 1 else 1
 
+    # Tipo de cada célula conforme os traces (pizza exige subplot 'domain')
+    tipos = [
+        "domain" if any(trace.type == "pie" for trace in figura.data) else "xy"
+        for figura in figuras
+    ]
+    specs = [
+        [{"type": tipos[r * cols + c]} if r * cols + c < len(tipos) else None for c in range(cols)]
+        for r in range(rows)
+    ]
+
     fig = make_subplots(
         rows=rows, 
         cols=cols, 
+        specs=specs,
         subplot_titles=titulos,
         vertical_spacing=0.15, # Aumentar espaçamento vertical
         horizontal_spacing=0.1 # Aumentar espaçamento horizontal
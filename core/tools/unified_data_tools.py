@@ -4,7 +4,7 @@ Este arquivo foi refatorado para usar o DataSourceManager centralizado.
 """
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import pandas as pd
 from langchain_core.tools import tool
 
@@ -286,10 +286,108 @@ def obter_estoque(
         return {"status": "error", "message": f"Erro: {str(e)}"}
 
 
+# Máximo de chaves aceitas em uma consulta em lote
+MAX_CHAVES_LOTE = 200
+
+
+@tool
+def consultar_produtos(
+    codigos: List[str],
+    colunas: Optional[List[str]] = None,
+    coluna_chave: str = "ITEM",
+) -> Dict[str, Any]:
+    """
+    Consulta vários produtos de uma vez (ex.: "compare os itens 9, 12, 57 e 101").
+
+    Use esta ferramenta em vez de chamar consultar_dados/obter_estoque uma vez
+    por produto: todas as chaves são resolvidas em uma única busca.
+
+    Args:
+        codigos: Lista de ITEMs (ou de códigos de barras, com coluna_chave='CODIGO').
+        colunas: Colunas a retornar (opcional; padrão = todas).
+        coluna_chave: 'ITEM' (padrão) ou 'CODIGO'.
+
+    Returns:
+        Dicionário com os produtos encontrados e as chaves não encontradas.
+    """
+    logger.info(f"Consultando {len(codigos or [])} produtos em lote ({coluna_chave})")
+
+    if not codigos:
+        return {"status": "error", "message": "Informe ao menos um código de produto."}
+    if len(codigos) > MAX_CHAVES_LOTE:
+        return {
+            "status": "error",
+            "message": f"Máximo de {MAX_CHAVES_LOTE} produtos por consulta.",
+        }
+
+    try:
+        data_manager = get_data_manager()
+        df_result = data_manager.get_many(codigos, columns=colunas, column=coluna_chave)
+        nao_encontrados = data_manager.missing_keys(codigos, column=coluna_chave)
+
+        if df_result is None or df_result.empty:
+            return {
+                "status": "not_found",
+                "message": f"Nenhum produto encontrado para {coluna_chave} em {codigos}.",
+                "nao_encontrados": nao_encontrados,
+            }
+
+        return {
+            "status": "success",
+            "colunas": list(df_result.columns),
+            "nao_encontrados": nao_encontrados,
+            **_truncate_df_for_llm(df_result, max_rows=MAX_CHAVES_LOTE),
+        }
+
+    except Exception as e:
+        logger.error(f"Erro ao consultar produtos em lote: {e}", exc_info=True)
+        return {"status": "error", "message": f"Erro: {str(e)}"}
+
+
+@tool
+def consultar_sql(consulta: str, limite: int = 100) -> Dict[str, Any]:
+    """
+    Executa uma consulta SQL somente leitura (SELECT) sobre a tabela `filial_madureira`.
+
+    Ideal para agregações com várias colunas (somas, médias, rankings, GROUP BY).
+    Colunas com espaços, acentos ou símbolos vão entre aspas duplas, ex.:
+    SELECT GRUPO, SUM("VENDA QTD JAN") AS vendas FROM filial_madureira
+    GROUP BY GRUPO ORDER BY vendas DESC
+
+    Args:
+        consulta: Uma única instrução SELECT (INSERT/UPDATE/DELETE etc. são bloqueados).
+        limite: Número máximo de linhas retornadas (padrão: 100).
+
+    Returns:
+        Dicionário com as linhas resultantes.
+    """
+    logger.info(f"Consultando via SQL (DuckDB): {consulta}")
+
+    try:
+        data_manager = get_data_manager()
+        registros = data_manager.execute_query(consulta, max_rows=limite)
+        return {
+            "status": "success",
+            "data": registros,
+            "total_records": len(registros),
+            "message": (
+                f"Resultado limitado a {limite} linhas." if len(registros) >= limite else None
+            ),
+        }
+
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    except Exception as e:
+        logger.error(f"Erro ao executar consulta SQL: {e}", exc_info=True)
+        return {"status": "error", "message": f"Erro: {str(e)}"}
+
+
 # Lista de ferramentas unificadas - EXPORTAÇÃO IMPORTANTE
 unified_tools = [
     listar_colunas_disponiveis,
     consultar_dados,
     buscar_produto,
     obter_estoque,
+    consultar_produtos,
+    consultar_sql,
 ]
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Cubo de agregados pré-calculados (GRUPO × FABRICANTE × mês).
+
+Construído junto com o carregamento do dataset pelo DataSourceManager: uma
+única passada de groupby gera o cuboide base (uma linha por combinação das
+dimensões) com soma, contagem, mínimo e máximo de cada medida e a soma das
+vendas de cada mês. Roll-ups (por GRUPO, por FABRICANTE, total, série mensal)
+saem desse cuboide, que tem poucas centenas de linhas, sem voltar aos dados
+linha a linha. Médias e margens são derivadas das somas, então o roll-up é
+exato (não é média de médias).
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+PRODUCT_COUNT = "PRODUTOS"
+TOTAL_SALES = "VENDAS_TOTAIS"
+MARGIN = "MARGEM_%"
+
+_SUM, _COUNT, _MIN, _MAX, _MEAN = "_soma", "_contagem", "_min", "_max", "_media"
+
+
+class AggregateCube:
+    """
+    Cuboide base agregado por dimensões, com roll-up para qualquer subconjunto.
+
+    Args:
+        df: DataFrame com os dados linha a linha.
+        dimensions: Colunas de dimensão (ex.: ['GRUPO', 'FABRICANTE']).
+        measures: Colunas numéricas com soma/contagem/mín/máx/média.
+        month_columns: Colunas de vendas mensais (ex.: 'VENDA QTD JAN').
+        margin: Par (lucro, venda) usado para a margem agregada em %.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        dimensions: Sequence[str],
+        measures: Sequence[str],
+        month_columns: Sequence[str],
+        margin: Optional[Sequence[str]] = None,
+    ):
+        numeric = lambda col: col in df.columns and pd.api.types.is_numeric_dtype(df[col])
+        self.dimensions: List[str] = [col for col in dimensions if col in df.columns]
+        self.measures: List[str] = [col for col in measures if numeric(col)]
+        self.month_columns: List[str] = [col for col in month_columns if numeric(col)]
+        self.margin = (
+            tuple(margin) if margin and all(col in self.measures for col in margin) else None
+        )
+
+        named = {PRODUCT_COUNT: (self.measures[0] if self.measures else df.columns[0], "size")}
+        for col in self.measures:
+            named[col + _SUM] = (col, "sum")
+            named[col + _COUNT] = (col, "count")
+            named[col + _MIN] = (col, "min")
+            named[col + _MAX] = (col, "max")
+        for col in self.month_columns:
+            named[col] = (col, "sum")
+
+        if self.dimensions:
+            base = (
+                df.groupby(self.dimensions, observed=True, dropna=False, sort=False)
+                .agg(**named)
+                .reset_index()
+            )
+        else:
+            base = pd.DataFrame([{name: df[col].agg(func) for name, (col, func) in named.items()}])
+        self.base: pd.DataFrame = base
+        self.row_count = len(df)
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def _filtered(self, filters: Optional[Dict[str, Any]]) -> pd.DataFrame:
+        base = self.base
+        for col, value in (filters or {}).items():
+            if col not in self.dimensions:
+                raise KeyError(f"Dimensão '{col}' não existe no cubo")
+            if isinstance(value, (list, tuple, set)):
+                base = base[base[col].isin(list(value))]
+            else:
+                base = base[base[col] == value]
+        return base
+
+    def rollup(
+        self,
+        by: Union[str, Sequence[str], None] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> pd.DataFrame:
+        """
+        Agrega o cubo pelas dimensões pedidas.
+
+        Args:
+            by: Dimensão ou lista de dimensões (None = total geral).
+            filters: {dimensão: valor ou lista de valores} aplicado antes do roll-up.
+
+        Returns:
+            DataFrame indexado pelas dimensões com PRODUTOS, '<medida>_soma',
+            '_media', '_min', '_max', '_contagem', MARGEM_%, as vendas de cada
+            mês e VENDAS_TOTAIS.
+        """
+        by = [by] if isinstance(by, str) else list(by or [])
+        for col in by:
+            if col not in self.dimensions:
+                raise KeyError(f"Dimensão '{col}' não existe no cubo")
+
+        base = self._filtered(filters)
+        aggregations = {PRODUCT_COUNT: "sum"}
+        for col in self.measures:
+            aggregations.update(
+                {col + _SUM: "sum", col + _COUNT: "sum", col + _MIN: "min", col + _MAX: "max"}
+            )
+        aggregations.update({col: "sum" for col in self.month_columns})
+
+        if by:
+            result = base.groupby(by, observed=True, dropna=False, sort=False).agg(aggregations)
+        else:
+            result = pd.DataFrame(
+                [{col: base[col].agg(func) for col, func in aggregations.items()}]
+            )
+
+        for col in self.measures:
+            counts = result[col + _COUNT]
+            result[col + _MEAN] = (result[col + _SUM] / counts.where(counts > 0)).astype(float)
+        if self.margin:
+            profit, revenue = self.margin
+            revenue_sum = result[revenue + _SUM]
+            result[MARGIN] = (
+                result[profit + _SUM] / revenue_sum.where(revenue_sum != 0) * 100
+            ).astype(float)
+        if self.month_columns:
+            result[TOTAL_SALES] = result[self.month_columns].sum(axis=1)
+        return result
+
+    def totals(self, filters: Optional[Dict[str, Any]] = None) -> pd.Series:
+        """Totais gerais (uma linha do roll-up sem dimensões)."""
+        return self.rollup(None, filters).iloc[0]
+
+    def monthly(
+        self, filters: Optional[Dict[str, Any]] = None, agregacao: str = "soma"
+    ) -> pd.Series:
+        """
+        Série de vendas por mês (índice = sufixo da coluna, ex.: 'JAN').
+
+        Args:
+            filters: {dimensão: valor(es)} aplicado antes da agregação.
+            agregacao: 'soma' (padrão) ou 'media' (por produto).
+        """
+        totals = self.totals(filters)
+        series = totals[self.month_columns].astype(float)
+        if agregacao == "media":
+            products = totals[PRODUCT_COUNT]
+            series = series / products if products else series * 0
+        series.index = [col.split()[-1] for col in self.month_columns]
+        return series
+
+    def dimension_values(self, dimension: str) -> List[Any]:
+        """Valores distintos (não nulos) de uma dimensão."""
+        if dimension not in self.dimensions:
+            raise KeyError(f"Dimensão '{dimension}' não existe no cubo")
+        return self.base[dimension].dropna().unique().tolist()
+
+    def match_dimension(self, dimension: str, text: str) -> List[Any]:
+        """Valores da dimensão que contêm o texto (sem diferenciar maiúsculas)."""
+        needle = str(text).upper()
+        return [value for value in self.dimension_values(dimension) if needle in str(value).upper()]
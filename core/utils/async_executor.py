@@ -0,0 +1,142 @@
+"""
+Executor limitado para chamar a camada de dados (pandas/Arrow) a partir do asyncio.
+
+O trabalho roda em um pool de threads de tamanho fixo, fora do event loop.
+Um semáforo por event loop limita quantas chamadas podem estar pendentes
+(na fila ou executando): além do limite, quem chama espera (backpressure) e,
+se a espera passar de `acquire_timeout`, recebe ExecutorBusyError, em vez de
+o processo acumular threads ou fila sem limite.
+
+Cancelar a tarefa (ou estourar o `timeout`) cancela o trabalho que ainda está
+na fila; o que já está executando termina na thread, mas o resultado é
+descartado e a vaga só é liberada ao terminar, para o limite continuar real.
+As ContextVars (ex.: `filial_scope`) são copiadas para a thread.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = int(os.getenv("DATA_ASYNC_WORKERS", str(min(8, os.cpu_count() or 1))))
+DEFAULT_MAX_PENDING = int(os.getenv("DATA_ASYNC_MAX_PENDING", "64"))
+DEFAULT_ACQUIRE_TIMEOUT = float(os.getenv("DATA_ASYNC_ACQUIRE_TIMEOUT", "10"))
+
+
+class ExecutorBusyError(RuntimeError):
+    """Executor sem vaga dentro do tempo de espera (sobrecarga)."""
+
+
+class BoundedExecutor:
+    """
+    Pool de threads com limite de chamadas pendentes para uso com asyncio.
+
+    Args:
+        max_workers: Threads executando ao mesmo tempo.
+        max_pending: Chamadas admitidas (executando + na fila).
+        acquire_timeout: Espera máxima (s) por uma vaga; None = sem limite.
+        name: Prefixo do nome das threads.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        acquire_timeout: Optional[float] = DEFAULT_ACQUIRE_TIMEOUT,
+        name: str = "data-async",
+    ):
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(self.max_workers, int(max_pending))
+        self.acquire_timeout = acquire_timeout
+        self._name = name
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        pool = self._pool
+        if pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=self._name
+                    )
+                pool = self._pool
+        return pool
+
+    def _semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_pending)
+        return semaphore
+
+    def pending(self) -> int:
+        """Chamadas admitidas no event loop atual (executando ou na fila)."""
+        semaphore = self._semaphores.get(asyncio.get_running_loop())
+        return self.max_pending - semaphore._value if semaphore is not None else 0
+
+    async def run(
+        self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any
+    ) -> Any:
+        """
+        Executa `fn(*args, **kwargs)` no pool e aguarda o resultado.
+
+        Args:
+            timeout: Tempo máximo (s) de execução; ao estourar, a chamada é
+                cancelada e asyncio.TimeoutError é levantado.
+
+        Raises:
+            ExecutorBusyError: Sem vaga dentro de `acquire_timeout`.
+            asyncio.TimeoutError: Execução passou de `timeout`.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore(loop)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"✗ Executor '{self._name}' sem vaga após {self.acquire_timeout}s")
+            raise ExecutorBusyError(
+                f"Camada de dados ocupada: {self.max_pending} chamadas pendentes"
+            ) from None
+
+        def release(_future) -> None:
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                # Event loop já encerrado: não há mais quem esperar a vaga
+                pass
+
+        context = contextvars.copy_context()
+        try:
+            future = self._get_pool().submit(context.run, functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(release)
+
+        # wrap_future propaga o cancelamento para o Future do pool
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Encerra o pool (cancela o que ainda está na fila)."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor = BoundedExecutor()
+
+
+def get_async_executor() -> BoundedExecutor:
+    """Executor global da camada de dados (pool recriado sob demanda após shutdown)."""
+    return _executor
@@ -0,0 +1,372 @@
+"""
+Registro central de caches em memória, com orçamento global de bytes.
+
+Todos os caches do projeto (resultados do DataSourceManager, DataFrames do
+db_utils e respostas do QueryProcessor) guardam suas entradas aqui, cada um
+no seu namespace. O registro mede o tamanho de
+cada entrada, despeja as menos usadas recentemente (LRU) quando o total passa
+do orçamento e mantém contadores de acertos/faltas/despejos por namespace, de
+modo que `stats()` mostra quem está ocupando a memória.
+
+`invalidate()` é o único ponto de invalidação: limpa uma chave, um namespace,
+todos os namespaces de uma tag (ex.: DATA_TAG, usado no reload do dataset) ou
+tudo.
+
+Objetos que não podem sair da memória (o estado vivo do dataset) não são
+entradas: ficam com o dono e só têm o tamanho reservado (`reserve()`), que
+conta no orçamento, mas nunca é despejado nem recusado; as entradas comuns
+é que cedem espaço.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Orçamento padrão (MB), configurável pela variável de ambiente CACHE_MAX_MB
+DEFAULT_MAX_BYTES = int(float(os.getenv("CACHE_MAX_MB", "1024")) * 1024**2)
+
+# Tag dos namespaces cujo conteúdo depende da versão do dataset
+DATA_TAG = "dados"
+
+_MISSING = object()
+
+
+def shared_copy(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cópia de um DataFrame compartilhado (cache/estado do dataset) para quem o consome.
+
+    Rasa sob Copy-on-Write (ligado nos pontos de entrada, ver
+    core.utils.env_setup.enable_copy_on_write); sem ele, profunda, para que
+    escritas do chamador não alterem o valor compartilhado.
+    """
+    return df.copy(deep=not pd.get_option("mode.copy_on_write"))
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """
+    Tamanho aproximado (bytes) de um valor em cache.
+
+    DataFrames/Series usam memory_usage(deep=True); arrays NumPy/Arrow e
+    objetos com atributo `nbytes` usam esse valor; contêineres somam os itens.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (np.ndarray, pa.Array, pa.ChunkedArray, pa.Table, pa.RecordBatch)):
+        return int(value.nbytes)
+
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, (int, np.integer)):
+        return int(nbytes)
+
+    size = sys.getsizeof(value)
+    if _depth < 3:
+        if isinstance(value, dict):
+            size += sum(
+                estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+                for k, v in value.items()
+            )
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: Optional[float]):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class _NamespaceStats:
+    __slots__ = ("hits", "misses", "evictions", "expirations", "invalidations", "rejected",
+                 "entries", "bytes", "reserved_bytes")
+
+    def __init__(self):
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self.invalidations = self.rejected = self.entries = self.bytes = 0
+        self.reserved_bytes = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {name: getattr(self, name) for name in self.__slots__}
+        stats["hit_ratio"] = round(self.hits / lookups, 4) if lookups else 0.0
+        return stats
+
+
+class CacheRegistry:
+    """
+    Cache LRU único, limitado por bytes, dividido em namespaces.
+
+    Args:
+        max_bytes: Orçamento global; entradas menos usadas são despejadas
+            quando a soma dos tamanhos o ultrapassa.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[Tuple[str, Hashable], _Entry]" = OrderedDict()
+        self._stats: Dict[str, _NamespaceStats] = {}
+        self._tags: Dict[str, Tuple[str, ...]] = {}
+        self._limits: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._reserved: Dict[Tuple[str, Hashable], int] = {}
+        self._reserved_bytes = 0
+        self._lock = threading.RLock()
+
+    @property
+    def total_bytes(self) -> int:
+        """Bytes das entradas mais os reservados."""
+        return self._total_bytes + self._reserved_bytes
+
+    def namespace(
+        self,
+        name: str,
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+        max_bytes: Optional[int] = None,
+    ) -> "CacheNamespace":
+        """
+        Visão de um namespace (cria as estatísticas e registra as tags).
+
+        Args:
+            max_bytes: Orçamento próprio do namespace, dentro do global; ao
+                ultrapassá-lo, são despejadas as entradas LRU do namespace.
+        """
+        with self._lock:
+            self._stats.setdefault(name, _NamespaceStats())
+            self._tags[name] = tuple(sorted(set(self._tags.get(name, ())) | set(tags)))
+            if max_bytes is not None:
+                self._limits[name] = int(max_bytes)
+        return CacheNamespace(self, name, ttl)
+
+    def _ns_stats(self, namespace: str) -> _NamespaceStats:
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = _NamespaceStats()
+        return stats
+
+    def _remove(self, full_key: Tuple[str, Hashable]) -> _Entry:
+        entry = self._entries.pop(full_key)
+        self._total_bytes -= entry.size
+        stats = self._ns_stats(full_key[0])
+        stats.entries -= 1
+        stats.bytes -= entry.size
+        return entry
+
+    def _evict_over_budget(self) -> None:
+        while self._entries and self._total_bytes + self._reserved_bytes > self.max_bytes:
+            victim = next(iter(self._entries))
+            self._remove(victim)
+            self._ns_stats(victim[0]).evictions += 1
+
+    def reserve(self, namespace: str, key: Hashable, size: int) -> None:
+        """
+        Conta `size` bytes no orçamento para um objeto mantido fora do cache.
+
+        A reserva substitui a anterior da mesma chave (0 a libera) e nunca é
+        despejada: se o total passar do orçamento, saem entradas comuns (LRU).
+        """
+        full_key = (namespace, key)
+        size = max(int(size), 0)
+        with self._lock:
+            stats = self._ns_stats(namespace)
+            previous = self._reserved.pop(full_key, 0)
+            self._reserved_bytes -= previous
+            stats.reserved_bytes -= previous
+            if size:
+                self._reserved[full_key] = size
+                self._reserved_bytes += size
+                stats.reserved_bytes += size
+            self._evict_over_budget()
+
+    def get(self, namespace: str, key: Hashable, default: Any = None) -> Any:
+        """Valor em cache (marcado como usado recentemente) ou `default`."""
+        full_key = (namespace, key)
+        with self._lock:
+            stats = self._ns_stats(namespace)
+            entry = self._entries.get(full_key)
+            if entry is not None and entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                self._remove(full_key)
+                stats.expirations += 1
+                entry = None
+            if entry is None:
+                stats.misses += 1
+                return default
+            self._entries.move_to_end(full_key)
+            stats.hits += 1
+            return entry.value
+
+    def put(
+        self,
+        namespace: str,
+        key: Hashable,
+        value: Any,
+        size: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ) -> bool:
+        """
+        Guarda um valor, despejando entradas LRU se o orçamento for excedido.
+
+        Args:
+            size: Tamanho em bytes (padrão: `estimate_size(value)`).
+            ttl: Validade em segundos (None = até ser despejado/invalidado).
+
+        Returns:
+            False se a entrada sozinha não cabe no orçamento (não é guardada).
+        """
+        size = estimate_size(value) if size is None else int(size)
+        full_key = (namespace, key)
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            stats = self._ns_stats(namespace)
+            if full_key in self._entries:
+                self._remove(full_key)
+            limit = self._limits.get(namespace)
+            available = self.max_bytes - self._reserved_bytes
+            budget = available if limit is None else min(limit, available)
+            if size > budget:
+                stats.rejected += 1
+                logger.warning(
+                    f"Cache '{namespace}': entrada de {size / 1024**2:.1f} MB maior que o "
+                    f"orçamento livre ({max(budget, 0) / 1024**2:.1f} MB); não armazenada"
+                )
+                return False
+
+            self._entries[full_key] = _Entry(value, size, expires_at)
+            self._total_bytes += size
+            stats.entries += 1
+            stats.bytes += size
+
+            if limit is not None:
+                while stats.bytes > limit:
+                    victim = next(k for k in self._entries if k[0] == namespace)
+                    self._remove(victim)
+                    stats.evictions += 1
+            self._evict_over_budget()
+            return True
+
+    def get_or_load(
+        self,
+        namespace: str,
+        key: Hashable,
+        loader: Callable[[], Any],
+        size: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """Retorna o valor em cache ou chama `loader()` e guarda o resultado."""
+        value = self.get(namespace, key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.put(namespace, key, value, size=size, ttl=ttl)
+        return value
+
+    def invalidate(
+        self,
+        namespace: Optional[str] = None,
+        key: Any = _MISSING,
+        tag: Optional[str] = None,
+    ) -> int:
+        """
+        Único ponto de invalidação do cache.
+
+        - `invalidate()` limpa tudo;
+        - `invalidate("ns")` limpa um namespace;
+        - `invalidate("ns", chave)` remove uma entrada;
+        - `invalidate(tag=DATA_TAG)` limpa os namespaces marcados com a tag.
+
+        Returns:
+            Número de entradas removidas.
+        """
+        with self._lock:
+            if namespace is not None and key is not _MISSING:
+                targets = [(namespace, key)] if (namespace, key) in self._entries else []
+            else:
+                if namespace is not None:
+                    namespaces = {namespace}
+                elif tag is not None:
+                    namespaces = {ns for ns, tags in self._tags.items() if tag in tags}
+                else:
+                    namespaces = None
+                targets = [
+                    full_key
+                    for full_key in self._entries
+                    if namespaces is None or full_key[0] in namespaces
+                ]
+            for full_key in targets:
+                self._remove(full_key)
+                self._ns_stats(full_key[0]).invalidations += 1
+
+        if targets:
+            scope = namespace or (f"tag '{tag}'" if tag else "todos")
+            logger.info(f"🔄 Cache invalidado ({scope}): {len(targets)} entradas")
+        return len(targets)
+
+    def stats(self) -> Dict[str, Any]:
+        """Uso do orçamento e contadores por namespace."""
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "total_bytes": self._total_bytes + self._reserved_bytes,
+                "reserved_bytes": self._reserved_bytes,
+                "entries": len(self._entries),
+                "namespaces": {
+                    name: {**stats.as_dict(), "max_bytes": self._limits.get(name)}
+                    for name, stats in self._stats.items()
+                },
+            }
+
+
+class CacheNamespace:
+    """Atalho para as operações do registro em um namespace (com TTL padrão)."""
+
+    def __init__(self, registry: CacheRegistry, name: str, ttl: Optional[float] = None):
+        self.registry = registry
+        self.name = name
+        self.ttl = ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.registry.get(self.name, key, default)
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None,
+            ttl: Optional[float] = None) -> bool:
+        return self.registry.put(self.name, key, value, size=size, ttl=ttl or self.ttl)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    size: Optional[int] = None, ttl: Optional[float] = None) -> Any:
+        return self.registry.get_or_load(self.name, key, loader, size=size, ttl=ttl or self.ttl)
+
+    def invalidate(self, key: Any = _MISSING) -> int:
+        return self.registry.invalidate(self.name, key)
+
+    def reserve(self, key: Hashable, size: int) -> None:
+        self.registry.reserve(self.name, key, size)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.registry.stats()["namespaces"].get(self.name, _NamespaceStats().as_dict())
+
+
+_registry = CacheRegistry()
+
+
+def get_cache_registry() -> CacheRegistry:
+    """Registro de cache global do processo."""
+    return _registry
+
+
+def invalidate_caches(namespace: Optional[str] = None, tag: Optional[str] = None) -> int:
+    """Invalida caches do registro global (ver CacheRegistry.invalidate)."""
+    return _registry.invalidate(namespace, tag=tag)
@@ -0,0 +1,207 @@
+"""
+Memoização dos resultados das ferramentas de gráfico.
+
+O mesmo gráfico com os mesmos argumentos sobre a mesma versão dos dados é
+montado e serializado (fig.to_json) uma única vez: o resultado da ferramenta
+(figura serializada + resumo) fica no registro de cache, em um namespace com
+orçamento de bytes próprio (LRU), e opcionalmente em disco, para sobreviver a
+reinícios e ser compartilhado entre processos.
+
+A chave é (nome da ferramenta, argumentos normalizados, versão do dataset,
+escopo de filial). Só resultados com status 'success' são guardados.
+"""
+
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+
+from core.utils.cache_registry import DATA_TAG, get_cache_registry
+
+logger = logging.getLogger(__name__)
+
+CHART_CACHE_NAMESPACE = "graficos"
+# Orçamento (MB) em memória e em disco; diretório em disco opcional (desligado por padrão)
+CHART_CACHE_MAX_BYTES = int(float(os.getenv("CHART_CACHE_MAX_MB", "64")) * 1024**2)
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR") or None
+
+
+def _normalize_arguments(func: Callable, args: tuple, kwargs: dict) -> str:
+    """Argumentos com os padrões aplicados, em JSON canônico (ordem das chaves fixa)."""
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return json.dumps(bound.arguments, sort_keys=True, ensure_ascii=False, default=repr)
+
+
+class _DiskStore:
+    """Arquivos JSON por chave, com orçamento de bytes (despeja os menos usados)."""
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_bytes)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.json"
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        path = self._path(digest)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # marca como usado recentemente
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de gráfico inválido em {path}: {e}")
+            return None
+
+    def put(self, digest: str, value: Dict[str, Any]) -> bool:
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return False  # resumo com tipos não serializáveis: fica só em memória
+        if len(payload.encode("utf-8")) > self.max_bytes:
+            return False
+
+        path = self._path(digest)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(payload, encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o cache de gráfico: {e}")
+            return False
+        self._prune()
+        return True
+
+    def _prune(self) -> None:
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+
+class ChartCache:
+    """
+    Cache dos resultados de ferramentas de gráfico.
+
+    Args:
+        max_bytes: Orçamento em memória (e em disco, se habilitado).
+        directory: Diretório para persistir os resultados (None = só memória).
+        namespace: Namespace no registro de cache.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = CHART_CACHE_MAX_BYTES,
+        directory: Union[str, Path, None] = CHART_CACHE_DIR,
+        namespace: str = CHART_CACHE_NAMESPACE,
+    ):
+        self._memory = get_cache_registry().namespace(
+            namespace, tags=(DATA_TAG,), max_bytes=max_bytes
+        )
+        self._disk = _DiskStore(directory, max_bytes) if directory else None
+
+    @staticmethod
+    def make_key(name: str, arguments: str, version: Hashable, scope: Hashable = None) -> str:
+        """Chave (digest) de um resultado: ferramenta, argumentos, versão e escopo."""
+        raw = json.dumps([name, arguments, str(version), repr(scope)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._memory.get(key)
+        if value is None and self._disk is not None:
+            value = self._disk.get(key)
+            if value is not None:
+                self._memory.put(key, value)
+        return copy.deepcopy(value) if value is not None else None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        value = copy.deepcopy(value)
+        self._memory.put(key, value)
+        if self._disk is not None:
+            self._disk.put(key, value)
+
+    def clear(self) -> None:
+        self._memory.invalidate()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._memory.stats()
+
+
+_chart_cache: Optional[ChartCache] = None
+
+
+def get_chart_cache() -> ChartCache:
+    """Cache de gráficos global (configurado por CHART_CACHE_MAX_MB e CHART_CACHE_DIR)."""
+    global _chart_cache
+    if _chart_cache is None:
+        _chart_cache = ChartCache()
+    return _chart_cache
+
+
+def memoize_chart(
+    version: Callable[[], Any],
+    scope: Callable[[], Hashable] = lambda: None,
+    bypass: Callable[[], bool] = lambda: False,
+    cache: Optional[ChartCache] = None,
+):
+    """
+    Decorador de ferramentas de gráfico (aplicar abaixo do @tool).
+
+    Args:
+        version: Retorna a versão atual dos dados; se não for str, não há cache.
+        scope: Retorna o escopo dos dados (ex.: filiais) que entra na chave.
+        bypass: Se retornar True, a chamada ignora o cache (ex.: painéis de
+            dashboard que recebem a go.Figure em vez do JSON).
+        cache: Cache usado (padrão: get_chart_cache()).
+    """
+
+    def decorator(func: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if bypass():
+                return func(*args, **kwargs)
+            data_version = version()
+            if not isinstance(data_version, str):
+                return func(*args, **kwargs)
+
+            store = cache or get_chart_cache()
+            key = store.make_key(
+                func.__name__, _normalize_arguments(func, args, kwargs), data_version, scope()
+            )
+            result = store.get(key)
+            if result is not None:
+                logger.info(f"✓ Gráfico '{func.__name__}' servido do cache")
+                return result
+
+            result = func(*args, **kwargs)
+            if isinstance(result, dict) and result.get("status") == "success":
+                store.put(key, result)
+            return result
+
+        return wrapper
+
+    return decorator
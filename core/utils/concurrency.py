@@ -0,0 +1,108 @@
+"""
+Primitivas de concorrência usadas pelo carregamento de dados.
+
+- SingleFlight: várias threads pedindo a mesma chave ao mesmo tempo
+  executam o carregador uma única vez; as demais esperam e recebem o mesmo
+  resultado (ou a mesma exceção). Evita o "thundering herd" de leituras do
+  Parquet em requisições frias simultâneas.
+- ReadWriteLock: leitores simultâneos, escritor exclusivo e com preferência
+  (leitores novos esperam um escritor pendente, para ele não ficar sem vez).
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Deduplica chamadas simultâneas com a mesma chave."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Executa `fn()` para a chave, a menos que outra thread já esteja
+        executando; nesse caso espera e devolve o resultado dela.
+
+        A chave é liberada ao terminar: chamadas posteriores executam de novo
+        (o cache do resultado fica a cargo de quem chama).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Indica se há uma execução em andamento para a chave."""
+        with self._lock:
+            return key in self._calls
+
+
+class ReadWriteLock:
+    """Lock leitores-escritor (não reentrante) com preferência para escritores."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read_lock(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write_lock(self):
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
@@ -0,0 +1,110 @@
+"""
+Exportação de dados em lotes (CSV/Excel) com memória limitada ao lote.
+
+As funções recebem um iterável de DataFrames, normalmente
+`DataSourceManager.iter_batches(...)`, e escrevem cada lote assim que ele
+chega; o dataset completo nunca é materializado.
+"""
+
+import logging
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, TextIO, Union
+
+import pandas as pd
+
+try:
+    from openpyxl import Workbook
+
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Limite de linhas de uma planilha do Excel (incluindo o cabeçalho)
+EXCEL_MAX_ROWS = 1_048_576
+
+
+def iter_csv_chunks(
+    batches: Iterable[pd.DataFrame], sep: str = ",", decimal: str = "."
+) -> Iterator[str]:
+    """
+    Converte lotes em pedaços de texto CSV (cabeçalho só no primeiro lote).
+
+    Útil para respostas HTTP em streaming (ex.: Flask `Response(generator)`).
+    """
+    header = True
+    for batch in batches:
+        yield batch.to_csv(index=False, header=header, sep=sep, decimal=decimal)
+        header = False
+
+
+def write_csv(
+    batches: Iterable[pd.DataFrame],
+    target: Union[str, Path, TextIO],
+    sep: str = ",",
+    decimal: str = ".",
+    encoding: str = "utf-8",
+) -> int:
+    """
+    Grava os lotes em um CSV.
+
+    Args:
+        batches: DataFrames a gravar, em ordem.
+        target: Caminho do arquivo ou objeto de texto aberto.
+        sep/decimal: Separadores (use sep=';' e decimal=',' para Excel em pt-BR).
+        encoding: Codificação ao gravar em caminho.
+
+    Returns:
+        Número de linhas gravadas.
+    """
+    rows = 0
+    handle = open(target, "w", encoding=encoding, newline="") if isinstance(target, (str, Path)) else target
+    try:
+        for batch in batches:
+            handle.write(batch.to_csv(index=False, header=rows == 0, sep=sep, decimal=decimal))
+            rows += len(batch)
+    finally:
+        if handle is not target:
+            handle.close()
+    logger.info(f"✓ CSV exportado: {rows} linhas")
+    return rows
+
+
+def write_excel(
+    batches: Iterable[pd.DataFrame],
+    target: Union[str, Path, BinaryIO],
+    sheet_name: str = "Dados",
+) -> int:
+    """
+    Grava os lotes em uma planilha .xlsx no modo write-only do openpyxl
+    (as linhas vão para o arquivo sem manter a planilha em memória).
+
+    Returns:
+        Número de linhas gravadas.
+
+    Raises:
+        ImportError: Se o openpyxl não estiver instalado.
+        ValueError: Se os dados passarem do limite de linhas do Excel.
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise ImportError("openpyxl não está instalado (pip install openpyxl)")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_name)
+    rows = 0
+    for batch in batches:
+        if rows == 0:
+            sheet.append([str(col) for col in batch.columns])
+        if rows + len(batch) + 1 > EXCEL_MAX_ROWS:
+            raise ValueError(f"Limite de {EXCEL_MAX_ROWS} linhas do Excel excedido")
+        # NaN/NA/NaT viram células vazias
+        values = batch.astype(object).where(batch.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(list(row))
+        rows += len(batch)
+
+    workbook.save(target)
+    logger.info(f"✓ Excel exportado: {rows} linhas")
+    return rows
+
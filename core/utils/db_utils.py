@@ -2,33 +2,72 @@ import os
 import pandas as pd
 import logging
 
+from core.utils.cache_registry import get_cache_registry, shared_copy
+from core.utils.concurrency import SingleFlight
+
 logger = logging.getLogger(__name__)
 
-# Cache para armazenar DataFrames carregados
-_df_cache = {}
+# DataFrames carregados, no registro de cache global: (caminho, versão do arquivo) -> DataFrame
+_df_cache = get_cache_registry().namespace("db_utils")
+# Última versão lida com sucesso de cada arquivo (fallback se a leitura falhar)
+_last_version = {}
+# Leituras em andamento: requisições frias simultâneas esperam uma única leitura
+_loads = SingleFlight()
+
+
+def _file_version(file_path):
+    """Versão do arquivo (mtime em ns + tamanho) usada para invalidar o cache."""
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _read_and_cache(file_path, version):
+    """Lê o Parquet e publica no cache (executado por uma única thread por versão)."""
+    cached = _df_cache.get((file_path, version))
+    if cached is not None:
+        return cached
+
+    logger.info(f"Tentando ler: {file_path}")
+    df = pd.read_parquet(file_path)
+    # Versão anterior sai do cache; quem já a leu continua com ela
+    previous = _last_version.get(file_path)
+    if previous is not None and previous != version:
+        _df_cache.invalidate((file_path, previous))
+    _df_cache.put((file_path, version), df)
+    _last_version[file_path] = version
+    logger.info(f"Arquivo lido. {len(df)} linhas.")
+    return df
 
 
 def get_table_df(table_name, filters=None, parquet_dir="data/parquet"):
-    """Carrega Filial_Madureira.parquet com cache."""
+    """Carrega Filial_Madureira.parquet com cache (recarrega se o arquivo mudar)."""
     main_file_name = "Filial_Madureira.parquet"
     file_path = os.path.join(parquet_dir, main_file_name)
 
-    # Verifica cache
-    if file_path in _df_cache:
+    if not os.path.exists(file_path):
+        logger.error(f"Arquivo não encontrado: {file_path}")
+        return None
+
+    version = _file_version(file_path)
+    cached = _df_cache.get((file_path, version))
+
+    # Cache válido só para a mesma versão do arquivo (cópia rasa sob Copy-on-Write)
+    if cached is not None:
         logger.info("Carregando DataFrame do cache.")
-        df = _df_cache[file_path].copy()
+        df = shared_copy(cached)
     else:
-        logger.info(f"Tentando ler: {file_path}")
-        if not os.path.exists(file_path):
-            logger.error(f"Arquivo não encontrado: {file_path}")
-            return None
         try:
-            df = pd.read_parquet(file_path)
-            _df_cache[file_path] = df.copy()
-            logger.info(f"Arquivo lido. {len(df)} linhas.")
+            key = (file_path, version)
+            df = shared_copy(_loads.do(key, lambda: _read_and_cache(file_path, version)))
         except Exception as e:
             logger.error(f"Erro ao ler Parquet: {e}")
-            return None
+            previous = _last_version.get(file_path)
+            cached = _df_cache.get((file_path, previous)) if previous is not None else None
+            if cached is not None:
+                logger.warning("Mantendo a versão anterior do cache.")
+                df = shared_copy(cached)
+            else:
+                return None
 
     if filters:
         for col, val in filters.items():
@@ -0,0 +1,193 @@
+"""
+Motor SQL local (DuckDB) sobre os dados em Arrow do DataSourceManager.
+
+As tabelas são registradas direto do Arrow (sem cópia), então as consultas
+rodam no motor vetorizado do DuckDB sobre as mesmas páginas mapeadas em
+memória. A conexão é aberta sem acesso a arquivos externos e com a
+configuração travada; as consultas passam ainda pelo mesmo filtro de
+operações proibidas usado no SQL Server (`verificar_operacoes_proibidas`).
+"""
+
+import logging
+import re
+from typing import Any, Dict, Iterator, Optional, Sequence, Union
+
+import pandas as pd
+import pyarrow as pa
+
+from core.utils.sql_utils import verificar_operacoes_proibidas
+
+try:
+    import duckdb
+
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TABLE_NAME = "filial_madureira"
+DEFAULT_MAX_ROWS = 1000
+DEFAULT_BATCH_SIZE = 10_000
+
+# Operações de escrita do sql_utils + comandos do DuckDB que acessam arquivos,
+# extensões ou configuração
+OPERACOES_PROIBIDAS_DUCKDB = [
+    "INSERT",
+    "UPDATE",
+    "DELETE",
+    "DROP",
+    "ALTER",
+    "CREATE",
+    "EXEC",
+    "EXECUTE",
+    "TRUNCATE",
+    "MERGE",
+    "COPY",
+    "ATTACH",
+    "DETACH",
+    "INSTALL",
+    "LOAD",
+    "PRAGMA",
+    "SET",
+    "RESET",
+    "CALL",
+    "EXPORT",
+    "IMPORT",
+    "CHECKPOINT",
+    "VACUUM",
+]
+
+# Identificadores entre aspas duplas e literais entre aspas simples
+_QUOTED = re.compile(r'"(?:[^"]|"")*"|\'(?:[^\']|\'\')*\'')
+
+QueryParams = Optional[Union[Dict[str, Any], Sequence[Any]]]
+
+
+def validar_consulta(query: str) -> str:
+    """
+    Garante que a consulta é uma única instrução SELECT/WITH sem operações proibidas.
+
+    Nomes de colunas entre aspas (ex.: "VENDA QTD SET") e literais não contam
+    como palavras-chave na verificação.
+
+    Returns:
+        Consulta sem espaços e ';' finais.
+
+    Raises:
+        ValueError: Se a consulta estiver vazia, tiver várias instruções, não
+            for de leitura ou contiver operação proibida.
+    """
+    query = (query or "").strip().rstrip(";").strip()
+    if not query:
+        raise ValueError("Consulta SQL vazia")
+
+    sem_literais = _QUOTED.sub(" ", query)
+    if ";" in sem_literais:
+        raise ValueError("Apenas uma instrução SQL por consulta")
+    if not re.match(r"(select|with)\b", sem_literais.lstrip("( \n\t"), re.IGNORECASE):
+        raise ValueError("Apenas consultas de leitura (SELECT) são permitidas")
+    if verificar_operacoes_proibidas(sem_literais, OPERACOES_PROIBIDAS_DUCKDB):
+        raise ValueError("Operação não permitida na consulta SQL")
+    return query
+
+
+def _to_pandas(data: Union[pa.Table, pa.RecordBatch]) -> pd.DataFrame:
+    """Converte para pandas trocando decimais (ex.: SUM de inteiros) por int64/float64."""
+    fields = []
+    for field in data.schema:
+        if pa.types.is_decimal(field.type):
+            field = field.with_type(pa.int64() if field.type.scale == 0 else pa.float64())
+        fields.append(field)
+    schema = pa.schema(fields)
+    if schema != data.schema:
+        data = data.cast(schema)
+    return data.to_pandas()
+
+
+class DuckDBQueryEngine:
+    """
+    Executa SQL somente leitura sobre tabelas Arrow/pandas registradas.
+
+    Args:
+        tables: {nome da tabela: pa.Table, pyarrow.dataset.Dataset ou DataFrame}.
+    """
+
+    def __init__(self, tables: Dict[str, Any]):
+        if not DUCKDB_AVAILABLE:
+            raise ImportError("duckdb não está instalado (pip install duckdb)")
+
+        self._tables = dict(tables)
+        self._connection = duckdb.connect(config={"enable_external_access": False})
+        self._connection.execute("SET lock_configuration = true")
+
+    @property
+    def table_names(self):
+        return list(self._tables)
+
+    def _cursor(self):
+        """Cursor próprio por consulta (thread-safe), com as tabelas registradas."""
+        cursor = self._connection.cursor()
+        for name, table in self._tables.items():
+            cursor.register(name, table)
+        return cursor
+
+    def _reader(self, query: str, params: QueryParams, batch_size: int):
+        query = validar_consulta(query)
+        cursor = self._cursor()
+        try:
+            result = cursor.execute(query, params) if params else cursor.execute(query)
+            to_reader = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+            return cursor, to_reader(batch_size)
+        except duckdb.Error as e:
+            cursor.close()
+            raise ValueError(f"Erro na consulta SQL: {e}") from e
+
+    def execute(
+        self, query: str, params: QueryParams = None, max_rows: Optional[int] = DEFAULT_MAX_ROWS
+    ) -> pd.DataFrame:
+        """
+        Executa a consulta e retorna até `max_rows` linhas.
+
+        Args:
+            query: SELECT sobre as tabelas registradas.
+            params: Parâmetros ligados à consulta (dict para $nome, lista para ?).
+            max_rows: Limite de linhas lidas do resultado (None = sem limite).
+
+        Raises:
+            ValueError: Consulta inválida, proibida ou com erro de execução.
+        """
+        batch_size = min(max_rows, DEFAULT_BATCH_SIZE) if max_rows else DEFAULT_BATCH_SIZE
+        cursor, reader = self._reader(query, params, batch_size)
+        try:
+            batches, rows = [], 0
+            for batch in reader:
+                batches.append(batch)
+                rows += batch.num_rows
+                if max_rows and rows >= max_rows:
+                    logger.info(f"Resultado SQL truncado em {max_rows} linhas")
+                    break
+            table = pa.Table.from_batches(batches, schema=reader.schema)
+        except (duckdb.Error, pa.ArrowException) as e:
+            raise ValueError(f"Erro na consulta SQL: {e}") from e
+        finally:
+            cursor.close()
+
+        if max_rows:
+            table = table.slice(0, max_rows)
+        return _to_pandas(table)
+
+    def iter_batches(
+        self, query: str, params: QueryParams = None, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Executa a consulta e entrega o resultado em lotes (streaming).
+
+        Só um lote fica em memória por vez; interromper a iteração libera o cursor.
+        """
+        cursor, reader = self._reader(query, params, batch_size)
+        try:
+            for batch in reader:
+                yield _to_pandas(batch)
+        finally:
+            cursor.close()
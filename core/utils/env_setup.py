@@ -1,6 +1,7 @@
 import logging
 from pathlib import Path
 
+import pandas as pd
 from dotenv import load_dotenv
 
 """
@@ -28,6 +29,18 @@ def setup_environment(base_dir=None):
         )
 
 
+def enable_copy_on_write():
+    """
+    Liga o Copy-on-Write do pandas no processo (chamar nos pontos de entrada).
+
+    Com ele, snapshots do DataSourceManager e entradas de cache são servidos
+    como cópias rasas: compartilham os buffers e qualquer escrita de quem os
+    consome gera uma cópia isolada. Sem ele, as bibliotecas devolvem cópias
+    profundas (ver core.utils.cache_registry.shared_copy).
+    """
+    pd.set_option("mode.copy_on_write", True)
+
+
 if __name__ == "__main__":
     print("Rodando como script...")
     setup_environment()
@@ -0,0 +1,165 @@
+"""
+Matriz de vendas produtos × meses pré-calculada.
+
+Construída junto com o carregamento do dataset pelo DataSourceManager: as
+colunas 'VENDA QTD JAN..DEZ' viram um único array NumPy contíguo (uma linha
+por produto, uma coluna por mês), com um índice ITEM -> linhas. Séries de um
+produto são fatias da matriz; séries por GRUPO/FABRICANTE e os totais mensais
+são reduções pré-calculadas no carregamento, então gráficos de tendência e
+KPIs de sazonalidade não varrem o DataFrame a cada chamada.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class SalesMatrix:
+    """
+    Vendas mensais em uma matriz (produtos × meses) com índices de linhas.
+
+    Args:
+        df: DataFrame com os dados linha a linha (a linha i da matriz é a
+            posição i do DataFrame).
+        month_columns: Colunas de vendas mensais, em ordem (ex.: 'VENDA QTD JAN').
+        key_column: Coluna-chave dos produtos (ex.: 'ITEM').
+        dimensions: Colunas com séries agregadas (ex.: ['GRUPO', 'FABRICANTE']).
+        key_index: Índice chave -> posições já construído (evita refazê-lo).
+        normalize_key: Normalização aplicada às chaves na consulta (e na
+            construção do índice quando `key_index` não é informado).
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        month_columns: Sequence[str],
+        key_column: str = "ITEM",
+        dimensions: Sequence[str] = (),
+        key_index: Optional[Dict[str, np.ndarray]] = None,
+        normalize_key: Optional[Callable[[Any], str]] = None,
+    ):
+        numeric = lambda col: col in df.columns and pd.api.types.is_numeric_dtype(df[col])
+        self.month_columns: List[str] = [col for col in month_columns if numeric(col)]
+        self.months: List[str] = [col.split()[-1] for col in self.month_columns]
+        self.key_column = key_column
+        self._normalize_key = normalize_key or (lambda value: str(value).strip())
+
+        # Meses sem valor contam como zero
+        if self.month_columns:
+            values = df[self.month_columns].to_numpy(dtype=np.float64, na_value=0.0)
+        else:
+            values = np.zeros((len(df), 0))
+        self.values: np.ndarray = np.ascontiguousarray(values)
+        self.values.setflags(write=False)
+
+        if key_index is None and key_column in df.columns:
+            keys = df[key_column].map(self._normalize_key).to_numpy()
+            key_index = pd.Series(keys).groupby(keys, sort=False).indices
+        self._rows: Dict[str, np.ndarray] = key_index or {}
+
+        self.totals: np.ndarray = self.values.sum(axis=0)
+        self.product_totals: np.ndarray = self.values.sum(axis=1)
+
+        # Por dimensão: valores distintos e a matriz (valores × meses) somada
+        self._dimension_values: Dict[str, pd.Index] = {}
+        self._dimension_sums: Dict[str, np.ndarray] = {}
+        self._dimension_counts: Dict[str, np.ndarray] = {}
+        for col in dimensions:
+            if col not in df.columns:
+                continue
+            codes, uniques = pd.factorize(df[col], sort=False)
+            valid = codes >= 0
+            sums = np.zeros((len(uniques), self.values.shape[1]))
+            np.add.at(sums, codes[valid], self.values[valid])
+            self._dimension_values[col] = pd.Index(uniques)
+            self._dimension_sums[col] = sums
+            self._dimension_counts[col] = np.bincount(codes[valid], minlength=len(uniques))
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        size = self.values.nbytes + self.totals.nbytes + self.product_totals.nbytes
+        size += sum(rows.nbytes for rows in self._rows.values())
+        size += sum(sums.nbytes for sums in self._dimension_sums.values())
+        return size
+
+    @property
+    def dimensions(self) -> List[str]:
+        return list(self._dimension_values)
+
+    def rows(self, key: Any) -> Optional[np.ndarray]:
+        """Linhas (posições no dataset) da chave, ou None se não existir."""
+        return self._rows.get(self._normalize_key(key))
+
+    def product(self, key: Any) -> Optional[pd.Series]:
+        """Vendas mensais do produto (soma das linhas da chave), ou None."""
+        rows = self.rows(key)
+        if rows is None:
+            return None
+        values = self.values[rows[0]] if len(rows) == 1 else self.values[rows].sum(axis=0)
+        return pd.Series(values, index=self.months)
+
+    def products(self, keys: Sequence[Any]) -> pd.DataFrame:
+        """Vendas mensais de várias chaves (linhas na ordem pedida; ausentes omitidas)."""
+        found = [(key, rows) for key in keys if (rows := self.rows(key)) is not None]
+        if not found:
+            return pd.DataFrame(columns=self.months)
+        values = np.vstack([self.values[rows].sum(axis=0) for _, rows in found])
+        return pd.DataFrame(values, index=[str(key) for key, _ in found], columns=self.months)
+
+    def _dimension_index(self, dimension: str) -> pd.Index:
+        if dimension not in self._dimension_values:
+            raise KeyError(f"Dimensão '{dimension}' não existe na matriz de vendas")
+        return self._dimension_values[dimension]
+
+    def by(self, dimension: str, agregacao: str = "soma") -> pd.DataFrame:
+        """
+        Vendas mensais por valor da dimensão (linhas = valores, colunas = meses).
+
+        Args:
+            agregacao: 'soma' (padrão) ou 'media' (por produto).
+        """
+        index = self._dimension_index(dimension)
+        sums = self._dimension_sums[dimension]
+        if agregacao == "media":
+            counts = self._dimension_counts[dimension][:, None]
+            sums = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        return pd.DataFrame(sums, index=index, columns=self.months)
+
+    def series(self, dimension: str, values: Any, agregacao: str = "soma") -> pd.Series:
+        """
+        Série mensal de um ou mais valores da dimensão (ex.: GRUPO='ESMALTES').
+
+        Args:
+            agregacao: 'soma' (padrão) ou 'media' (por produto).
+        """
+        index = self._dimension_index(dimension)
+        values = list(values) if isinstance(values, (list, tuple, set)) else [values]
+        positions = index.get_indexer(values)
+        positions = positions[positions >= 0]
+        sums = self._dimension_sums[dimension][positions].sum(axis=0)
+        if agregacao == "media":
+            count = self._dimension_counts[dimension][positions].sum()
+            sums = sums / count if count else sums * 0
+        return pd.Series(sums, index=self.months)
+
+    def monthly(self) -> pd.Series:
+        """Totais de vendas por mês de todos os produtos."""
+        return pd.Series(self.totals, index=self.months)
+
+    def seasonality_index(self) -> float:
+        """Coeficiente de variação das vendas mensais totais (%), 0 sem vendas."""
+        mean = self.totals.mean() if self.totals.size else 0.0
+        if not mean:
+            return 0.0
+        return float(self.totals.std(ddof=1) / mean * 100)
+
+    def top_products(self, n: int = 10) -> pd.Series:
+        """Posições das n linhas com maior venda anual (posição -> total)."""
+        n = min(n, len(self))
+        top = np.argpartition(-self.product_totals, n - 1)[:n] if n else np.array([], dtype=int)
+        top = top[np.argsort(-self.product_totals[top], kind="stable")]
+        return pd.Series(self.product_totals[top], index=top)
@@ -0,0 +1,250 @@
+"""
+Índice de similaridade dos trechos de contexto do agente (colunas e ferramentas).
+
+O prompt do agente é montado por consulta: um núcleo fixo e curto mais os
+trechos (descrição de coluna, regra de uso de ferramenta) mais parecidos com
+a pergunta. Os trechos ficam em core/prompts/agent_snippets.json; cada um
+vira um vetor (hash de palavras e trigramas sem acentos, normalizado), e a
+busca é força bruta em NumPy (produto escalar + argpartition) sobre a matriz
+de vetores, gravada em .npy e aberta com memory-map.
+
+O índice em disco é refeito sozinho quando o catálogo de trechos muda (o
+digest do catálogo fica no arquivo de metadados).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from core.utils.text_index import _trigrams, fold_text
+
+logger = logging.getLogger(__name__)
+
+_ROOT = Path(__file__).resolve().parents[2]
+SNIPPETS_PATH = _ROOT / "core" / "prompts" / "agent_snippets.json"
+SCHEMA_INDEX_DIR = Path(os.getenv("SCHEMA_INDEX_DIR") or _ROOT / "data" / "schema_index")
+
+EMBEDDING_DIM = 1024
+# Muda quando a forma de calcular os vetores muda (invalida índices gravados)
+EMBEDDING_VERSION = 1
+TRIGRAM_WEIGHT = 0.5
+
+_STOPWORDS = frozenset(
+    "a o as os ao aos de da do das dos e em no na nos nas um uma uns umas para "
+    "pra por com que qual quais quanto quantos me se eh sobre meu minha".split()
+)
+
+
+def _features(text: str) -> Counter:
+    """Palavras (sem acentos e stopwords) e seus trigramas, com pesos."""
+    features: Counter = Counter()
+    for word in re.findall(r"[a-z0-9%$]+", fold_text(text)):
+        if word in _STOPWORDS or word.isdigit():
+            continue
+        features["w:" + word] += 1.0
+        for gram in _trigrams(f" {word} "):
+            features["t:" + gram] += TRIGRAM_WEIGHT
+    return features
+
+
+def _hash_features(texts: Sequence[str], dim: int) -> np.ndarray:
+    """
+    Contagens de atributos por hashing (len(texts) × dim, float32).
+
+    Cada palavra/trigrama cai em uma posição (crc32 % dim) com sinal dado por
+    outro bit do hash, o que reduz o viés das colisões.
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature, weight in _features(text).items():
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = -1.0 if digest & 0x80000000 else 1.0
+            vectors[row, digest % dim] += sign * np.sqrt(weight)
+    return vectors
+
+
+def inverse_frequencies(vectors: np.ndarray) -> np.ndarray:
+    """IDF suavizado de cada posição: atributos presentes em muitos trechos pesam menos."""
+    document_frequency = np.count_nonzero(vectors, axis=0)
+    return (np.log((1 + len(vectors)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+
+def embed_texts(
+    texts: Sequence[str], dim: int = EMBEDDING_DIM, weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Vetores (len(texts) × dim, float32, norma 1) dos textos.
+
+    Args:
+        weights: Peso de cada posição (ex.: o IDF do catálogo de trechos).
+            Textos sem atributos ficam com o vetor nulo.
+    """
+    vectors = _hash_features(texts, dim)
+    if weights is not None:
+        vectors *= weights
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def load_snippets(path: Union[str, Path] = SNIPPETS_PATH) -> List[Dict[str, Any]]:
+    """Catálogo de trechos: dicionários com 'id', 'tipo', 'texto' e 'termos'."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def snippets_digest(snippets: Sequence[Dict[str, Any]], dim: int = EMBEDDING_DIM) -> str:
+    raw = json.dumps([EMBEDDING_VERSION, dim, list(snippets)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SnippetIndex:
+    """
+    Busca por similaridade (cosseno) sobre os trechos de contexto.
+
+    Args:
+        snippets: Trechos, na ordem das linhas de `vectors`.
+        vectors: Matriz (trechos × dim) normalizada; pode ser um np.memmap.
+        weights: Peso de cada posição aplicado também às consultas (IDF).
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    WEIGHTS_FILE = "weights.npy"
+    METADATA_FILE = "snippets.json"
+
+    def __init__(
+        self,
+        snippets: Sequence[Dict[str, Any]],
+        vectors: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+    ):
+        if len(snippets) != vectors.shape[0]:
+            raise ValueError("Número de trechos difere do número de vetores")
+        self.snippets: List[Dict[str, Any]] = list(snippets)
+        self.vectors = vectors
+        self.weights = weights
+        self._tipos = np.array([snippet.get("tipo", "") for snippet in self.snippets])
+
+    @classmethod
+    def build(cls, snippets: Sequence[Dict[str, Any]], dim: int = EMBEDDING_DIM) -> "SnippetIndex":
+        """Calcula os vetores do texto + termos de cada trecho, ponderados pelo IDF."""
+        texts = [f"{s.get('texto', '')} {s.get('termos', '')}" for s in snippets]
+        weights = inverse_frequencies(_hash_features(texts, dim))
+        return cls(snippets, embed_texts(texts, dim, weights), weights)
+
+    def __len__(self) -> int:
+        return len(self.snippets)
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def save(self, directory: Union[str, Path]) -> None:
+        """Grava vetores e pesos (.npy) e metadados (trechos + digest) no diretório."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        weights = self.weights if self.weights is not None else np.ones(self.dim, dtype=np.float32)
+        for name, array in ((self.VECTORS_FILE, self.vectors), (self.WEIGHTS_FILE, weights)):
+            tmp_path = directory / f"{name}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(array, dtype=np.float32))
+            os.replace(tmp_path, directory / name)
+
+        metadata = {"digest": snippets_digest(self.snippets, self.dim), "snippets": self.snippets}
+        tmp_metadata = directory / f"{self.METADATA_FILE}.{os.getpid()}.tmp"
+        tmp_metadata.write_text(json.dumps(metadata, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_metadata, directory / self.METADATA_FILE)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], digest: Optional[str] = None) -> Optional["SnippetIndex"]:
+        """
+        Abre o índice gravado (vetores em memory-map).
+
+        Retorna None se não existir, estiver corrompido ou, com `digest`
+        informado, tiver sido gerado de outro catálogo.
+        """
+        directory = Path(directory)
+        try:
+            metadata = json.loads((directory / cls.METADATA_FILE).read_text(encoding="utf-8"))
+            if digest is not None and metadata.get("digest") != digest:
+                return None
+            vectors = np.load(directory / cls.VECTORS_FILE, mmap_mode="r")
+            weights = np.load(directory / cls.WEIGHTS_FILE)
+            return cls(metadata["snippets"], vectors, weights)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Índice de contexto inválido em {directory}: {e}")
+            return None
+
+    def search(
+        self, query: str, k: int = 5, tipo: Optional[str] = None, min_score: float = 0.0
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Os k trechos mais parecidos com a consulta (maior similaridade primeiro).
+
+        Args:
+            tipo: Restringe a um tipo de trecho (ex.: 'coluna', 'ferramenta').
+            min_score: Descarta trechos com similaridade menor ou igual a este valor.
+        """
+        query_vector = embed_texts([query], self.dim, self.weights)[0]
+        scores = np.asarray(self.vectors @ query_vector, dtype=np.float64)
+        if tipo is not None:
+            scores = np.where(self._tipos == tipo, scores, -np.inf)
+
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), self.snippets[i]) for i in top if scores[i] > min_score]
+
+
+def build_schema_index(
+    snippets_path: Union[str, Path] = SNIPPETS_PATH,
+    directory: Union[str, Path, None] = SCHEMA_INDEX_DIR,
+) -> SnippetIndex:
+    """
+    Índice do catálogo de trechos: o gravado em `directory`, se estiver em dia;
+    senão é recalculado e gravado (se o diretório não for gravável, fica só
+    em memória).
+    """
+    snippets = load_snippets(snippets_path)
+    digest = snippets_digest(snippets)
+    if directory is not None:
+        index = SnippetIndex.load(directory, digest)
+        if index is not None:
+            return index
+
+    index = SnippetIndex.build(snippets)
+    if directory is not None:
+        try:
+            index.save(directory)
+            logger.info(f"🔄 Índice de contexto do agente gravado em {directory} ({len(index)} trechos)")
+            return SnippetIndex.load(directory, digest) or index
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o índice de contexto: {e}")
+    return index
+
+
+_schema_index: Optional[SnippetIndex] = None
+_schema_index_lock = threading.Lock()
+
+
+def get_schema_index() -> SnippetIndex:
+    """Índice global dos trechos de contexto (carregado na primeira chamada)."""
+    global _schema_index
+    if _schema_index is None:
+        with _schema_index_lock:
+            if _schema_index is None:
+                _schema_index = build_schema_index()
+    return _schema_index
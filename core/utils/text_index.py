@@ -0,0 +1,131 @@
+"""
+Índice invertido de trigramas para busca textual sem acentos.
+
+Usado pelo DataSourceManager nas colunas de texto livre (DESCRIÇÃO,
+FABRICANTE): a consulta é normalizada (minúsculas, sem acentos), os
+candidatos saem da interseção das listas de trigramas de cada termo e só
+eles são verificados por substring e ranqueados.
+"""
+
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def fold_text(value) -> str:
+    """Normaliza texto para comparação: minúsculas, sem acentos e espaços colapsados."""
+    if value is None:
+        return ""
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+def _trigrams(text: str) -> set:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Índice de trigramas sobre uma sequência de textos (uma entrada por linha).
+
+    As posições retornadas são as posições das linhas na sequência original.
+    """
+
+    def __init__(self, values: Iterable):
+        self._docs: List[str] = [
+            "" if pd.isna(value) else fold_text(value) for value in values
+        ]
+
+        postings: Dict[str, List[int]] = {}
+        for position, doc in enumerate(self._docs):
+            for gram in _trigrams(doc):
+                postings.setdefault(gram, []).append(position)
+
+        self._postings: Dict[str, np.ndarray] = {
+            gram: np.asarray(rows, dtype=np.int32) for gram, rows in postings.items()
+        }
+        self._all_rows = np.arange(len(self._docs), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._postings)
+
+    def _candidates(self, token: str) -> np.ndarray:
+        """Linhas que contêm todos os trigramas do termo (superconjunto dos matches)."""
+        grams = _trigrams(token)
+        if not grams:
+            # Termos com menos de 3 caracteres não têm trigramas: verifica tudo
+            return self._all_rows
+
+        lists = []
+        for gram in grams:
+            rows = self._postings.get(gram)
+            if rows is None:
+                return self._all_rows[:0]
+            lists.append(rows)
+
+        lists.sort(key=len)
+        candidates = lists[0]
+        for rows in lists[1:]:
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+            if candidates.size == 0:
+                break
+        return candidates
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Busca linhas que contêm todos os termos da consulta (em qualquer ordem).
+
+        Args:
+            query: Texto da busca (maiúsculas/acentos são ignorados).
+            limit: Número máximo de resultados.
+
+        Returns:
+            Lista de (posição, score) ordenada do mais para o menos relevante.
+        """
+        folded_query = fold_text(query)
+        tokens = folded_query.split()
+        if not tokens:
+            return []
+
+        # Interseção dos candidatos, começando pelo termo mais seletivo
+        candidates = None
+        for token in sorted(tokens, key=len, reverse=True):
+            rows = self._candidates(token)
+            candidates = rows if candidates is None else np.intersect1d(
+                candidates, rows, assume_unique=True
+            )
+            if candidates.size == 0:
+                return []
+
+        results = []
+        for position in candidates.tolist():
+            doc = self._docs[position]
+            if all(token in doc for token in tokens):
+                results.append((position, self._score(doc, folded_query, tokens)))
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit] if limit else results
+
+    @staticmethod
+    def _score(doc: str, folded_query: str, tokens: List[str]) -> float:
+        """Relevância: frase completa, termos no início de palavras, match cedo e texto curto."""
+        score = 0.0
+        if folded_query in doc:
+            score += 2.0
+            if doc.startswith(folded_query):
+                score += 1.0
+        for token in tokens:
+            if doc.startswith(token) or f" {token}" in doc:
+                score += 1.0
+        first_match = min(doc.find(token) for token in tokens)
+        score += 1.0 / (1 + first_match)
+        score += 1.0 / (1 + len(doc))
+        return score
+
@@ -299,7 +299,7 @@ class AdvancedChartGenerator:
         """
         try:
             # Agregar por segmento
-            df_segment = df.groupby(segment_column)[value_column].sum().reset_index()
+            df_segment = df.groupby(segment_column, observed=True)[value_column].sum().reset_index()
             df_segment = df_segment.sort_values(value_column, ascending=False)
 
             if chart_type == "donut":
@@ -29,7 +29,8 @@ import logging
 
 from core import auth
 from core.session_state import SESSION_STATE_KEYS
-from core.data_source_manager import get_data_manager
+from core.data_source_manager import get_data_manager, pinned_snapshot
+from core.utils.env_setup import enable_copy_on_write
 from ui.filtros_interativos import (
     criar_filtros_sidebar,
     aplicar_filtros,
@@ -48,6 +49,10 @@ st.set_page_config(
 # Logging
 logger = logging.getLogger(__name__)
 
+# A página pode ser aberta direto (sem passar por streamlit_app.py): o snapshot
+# do dataset só é servido sem cópia com Copy-on-Write ativo
+enable_copy_on_write()
+
 # === AUTENTICAÇÃO ===
 if not st.session_state.get(SESSION_STATE_KEYS["AUTHENTICATED"]):
     auth.login()
@@ -59,29 +64,60 @@ st.markdown("Acompanhe os principais indicadores do seu negócio em tempo real")
 st.divider()
 
 # === CARREGAR DADOS ===
-@st.cache_data(ttl=3600)
 def load_data_limpo():
-    """Carrega dados limpos (preferencial) ou originais"""
+    """
+    Snapshot do dataset do DataSourceManager (arquivo limpo, se existir) e a
+    sua versão, lidos da mesma versão. Sem cópia: o snapshot compartilha a
+    memória com o estado carregado (Copy-on-Write).
+    """
     manager = get_data_manager()
-
-    # Tentar carregar arquivo limpo primeiro
-    arquivo_limpo = project_root / 'data' / 'parquet' / 'Filial_Madureira_LIMPO.parquet'
-
-    if arquivo_limpo.exists():
-        try:
-            df = pd.read_parquet(arquivo_limpo)
-            st.sidebar.success("✓ Dados limpos carregados")
-            return df
-        except Exception as e:
-            logger.warning(f"Erro ao carregar dados limpos: {e}")
-
-    # Fallback para dados originais
-    df = manager.get_data()
-    st.sidebar.info("ℹ️ Usando dados originais")
-    return df
+    with pinned_snapshot():
+        df = manager.get_snapshot()
+        versao = manager.get_dataset_version()
+    st.sidebar.success("✓ Dados carregados")
+    return df, versao
+
+
+def agregado_da_versao(versao, leitura):
+    """
+    Cubo/matriz pré-calculados pelo DataSourceManager, só se forem da mesma
+    versão do snapshot da página (None se houve reload entre as leituras).
+    """
+    manager = get_data_manager()
+    with pinned_snapshot():
+        if manager.get_dataset_version() != versao:
+            return None
+        return leitura(manager)
+
+
+def agregar_por_dimensao(df, df_completo, dimensao, agregacoes):
+    """
+    Agrega por GRUPO/FABRICANTE usando o cubo pré-calculado do DataSourceManager.
+
+    O cubo só vale para o dataset completo: com filtros ativos (ou se o cubo
+    não tiver as medidas pedidas) faz o groupby nas linhas filtradas.
+
+    Args:
+        agregacoes: {coluna: 'sum' | 'mean' | 'count'}, na ordem das colunas do resultado.
+    """
+    # Sem filtro ativo (sidebar no padrão), aplicar_filtros devolve o próprio snapshot
+    cubo = agregado_da_versao(versao_dados, lambda m: m.get_cube()) if df is df_completo else None
+    medidas = [col for col, func in agregacoes.items() if func != 'count']
+    if (
+        cubo is not None
+        and dimensao in cubo.dimensions
+        and all(col in cubo.measures for col in medidas)
+    ):
+        sufixos = {'sum': '_soma', 'mean': '_media'}
+        resumo = cubo.rollup(dimensao)
+        return pd.DataFrame({
+            col: resumo['PRODUTOS'] if func == 'count' else resumo[col + sufixos[func]]
+            for col, func in agregacoes.items()
+        })
+    return df.groupby(dimensao, observed=True).agg(agregacoes)
 
 try:
-    df_completo = load_data_limpo()
+    df_completo, versao_dados = load_data_limpo()
 except Exception as e:
     st.error(f"❌ Erro ao carregar dados: {e}")
     st.stop()
@@ -198,7 +234,7 @@ with tab1:
     st.markdown("#### Top 10 Categorias por Valor de Estoque")
 
     if 'GRUPO' in df.columns and 'VLR ESTOQUE VENDA' in df.columns:
-        top_categorias = df.groupby('GRUPO').agg({
+        top_categorias = agregar_por_dimensao(df, df_completo, 'GRUPO', {
             'VLR ESTOQUE VENDA': 'sum',
             'ITEM': 'count',
             'LUCRO TOTAL %': 'mean'
@@ -369,8 +405,20 @@ with tab3:
     meses = ['JAN', 'FEV', 'MAR', 'ABR', 'MAI', 'JUN', 'JUL', 'AGO', 'SET', 'OUT', 'NOV', 'DEZ']
     colunas_vendas = [f'VENDA QTD {mes}' for mes in meses]
 
-    if all(col in df.columns for col in colunas_vendas):
+    # Dataset completo: totais da matriz produtos x meses pré-calculada no carregamento
+    matriz = (
+        agregado_da_versao(versao_dados, lambda m: m.get_sales_matrix())
+        if df is df_completo
+        else None
+    )
+    if matriz is not None and matriz.months == meses:
+        vendas_mensais = matriz.monthly()
+    elif all(col in df.columns for col in colunas_vendas):
         vendas_mensais = df[colunas_vendas].sum()
+    else:
+        vendas_mensais = None
+
+    if vendas_mensais is not None:
 
         # Gráfico de linha com área
         fig = go.Figure()
@@ -448,7 +496,7 @@ with tab4:
     st.markdown("#### Top Fabricantes por Valor de Estoque")
 
     if 'FABRICANTE' in df.columns and 'VLR ESTOQUE VENDA' in df.columns:
-        top_fabricantes = df.groupby('FABRICANTE').agg({
+        top_fabricantes = agregar_por_dimensao(df, df_completo, 'FABRICANTE', {
             'VLR ESTOQUE VENDA': 'sum',
             'ITEM': 'count',
             'LUCRO TOTAL %': 'mean',
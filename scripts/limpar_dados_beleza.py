@@ -11,6 +11,7 @@ Corrige problemas identificados no arquivo Filial_Madureira.parquet:
 
 Uso:
     python scripts/limpar_dados_beleza.py
+    python scripts/limpar_dados_beleza.py --lotes 50000   # memória limitada ao lote
 
 Saída:
     data/parquet/Filial_Madureira_LIMPO.parquet
@@ -26,6 +27,8 @@ sys.path.append(str(project_root))
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime
 import logging
 
@@ -52,6 +55,8 @@ class LimpadorDadosBeleza:
         self.arquivo_entrada = Path(arquivo_entrada)
         self.df = None
         self.df_original = None
+        # ITEMs já gravados (deduplicação entre lotes; None fora do modo em lotes)
+        self._itens_vistos = None
         self.relatorio = {
             'total_linhas_original': 0,
             'total_colunas': 0,
@@ -249,7 +254,11 @@ class LimpadorDadosBeleza:
                 continue
 
             try:
-                self.df[col] = pd.to_datetime(self.df[col], errors='coerce')
+                # Coluna mistura 'dd/mm/aaaa' e ISO: formato por valor (não inferido
+                # do primeiro valor), para o resultado não depender do lote
+                self.df[col] = pd.to_datetime(
+                    self.df[col], errors='coerce', format='mixed', dayfirst=True
+                )
                 invalidos = self.df[col].isna().sum()
                 validos = len(self.df) - invalidos
 
@@ -273,6 +282,10 @@ class LimpadorDadosBeleza:
 
         antes = len(self.df)
         self.df = self.df.drop_duplicates(subset=['ITEM'], keep='first')
+        if self._itens_vistos is not None:
+            # Em lotes: descartar ITEMs que já apareceram em lotes anteriores
+            self.df = self.df[~self.df['ITEM'].isin(self._itens_vistos)]
+            self._itens_vistos.update(self.df['ITEM'].tolist())
         depois = len(self.df)
         removidas = antes - depois
 
@@ -441,6 +454,13 @@ class LimpadorDadosBeleza:
             logger.info(f"  ✓ Dados salvos em: {arquivo_saida}")
             logger.info(f"  ✓ Linhas: {len(self.df)}, Colunas: {len(self.df.columns)}")
 
+            # Regenerar o cache Arrow (memory-map) lido pelos workers do app
+            try:
+                from core.data_source_manager import build_arrow_cache
+                build_arrow_cache(arquivo_saida)
+            except Exception as e:
+                logger.warning(f"  ⚠ Cache Arrow não gerado (será criado no próximo load): {e}")
+
             return True
 
         except Exception as e:
@@ -464,6 +484,107 @@ class LimpadorDadosBeleza:
             logger.info(f"  • {problema}")
         logger.info("="*80 + "\n")
 
+    def _limpar_df(self):
+        """
+        Aplica as etapas de limpeza em self.df
+        """
+        self.corrigir_encoding()
+        self.normalizar_fabricantes()
+        self.normalizar_grupos()
+        self.converter_margem_para_numerico()
+        self.converter_colunas_numericas()
+        self.converter_colunas_data()
+        self.remover_duplicatas()
+        self.preencher_valores_faltantes()
+        self.adicionar_metricas_calculadas()
+        self.validar_dados()
+
+    def executar_limpeza_em_lotes(self, arquivo_saida: str = None, batch_size: int = 50_000) -> bool:
+        """
+        Executa o pipeline de limpeza lendo e gravando o Parquet em lotes
+
+        Só um lote fica em memória por vez (leitura pelo scanner do pyarrow via
+        iter_dataset_batches e escrita incremental com ParquetWriter). A saída é
+        gravada em arquivo temporário e trocada atomicamente ao final.
+
+        Args:
+            arquivo_saida: Caminho para salvar dados limpos
+            batch_size: Número máximo de linhas por lote
+
+        Returns:
+            bool: True se sucesso
+        """
+        from core.data_source_manager import build_arrow_cache, iter_dataset_batches
+
+        logger.info("="*80)
+        logger.info(f"INICIANDO LIMPEZA DE DADOS EM LOTES ({batch_size} linhas por lote)")
+        logger.info("="*80 + "\n")
+
+        if not self.arquivo_entrada.exists():
+            logger.error(f"Arquivo não encontrado: {self.arquivo_entrada}")
+            return False
+
+        arquivo_saida = Path(arquivo_saida) if arquivo_saida else (
+            self.arquivo_entrada.parent / 'Filial_Madureira_LIMPO.parquet'
+        )
+        arquivo_saida.parent.mkdir(parents=True, exist_ok=True)
+        temporario = arquivo_saida.with_name(f"{arquivo_saida.name}.{os.getpid()}.tmp")
+
+        self._itens_vistos = set()
+        writer = None
+        linhas_gravadas = 0
+        try:
+            lotes = iter_dataset_batches(self.arquivo_entrada, batch_size=batch_size, normalize=False)
+            for numero, lote in enumerate(lotes, start=1):
+                logger.info(f"🔄 Lote {numero}: {len(lote)} linhas")
+                self.df = lote
+                self.relatorio['total_linhas_original'] += len(lote)
+                self.relatorio['total_colunas'] = len(lote.columns)
+
+                inicio_relatorio = len(self.relatorio['problemas_corrigidos'])
+                self._limpar_df()
+                self.relatorio['problemas_corrigidos'][inicio_relatorio:] = [
+                    f"Lote {numero}: {problema}"
+                    for problema in self.relatorio['problemas_corrigidos'][inicio_relatorio:]
+                ]
+
+                tabela = pa.Table.from_pandas(self.df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(temporario, tabela.schema)
+                else:
+                    tabela = tabela.cast(writer.schema)
+                writer.write_table(tabela)
+                linhas_gravadas += len(self.df)
+
+            if writer is None:
+                logger.error("  ✗ Nenhuma linha lida do arquivo de entrada")
+                return False
+            writer.close()
+            writer = None
+            os.replace(temporario, arquivo_saida)
+            logger.info(f"  ✓ Dados salvos em: {arquivo_saida} ({linhas_gravadas} linhas)")
+
+        except Exception as e:
+            logger.error(f"  ✗ Erro na limpeza em lotes: {e}")
+            return False
+        finally:
+            if writer is not None:
+                writer.close()
+            if temporario.exists():
+                temporario.unlink()
+            self._itens_vistos = None
+            self.df = None
+
+        # Regenerar o cache Arrow (memory-map) lido pelos workers do app
+        try:
+            build_arrow_cache(arquivo_saida)
+        except Exception as e:
+            logger.warning(f"  ⚠ Cache Arrow não gerado (será criado no próximo load): {e}")
+
+        self.gerar_relatorio()
+        logger.info("✓ Limpeza em lotes concluída com sucesso!")
+        return True
+
     def executar_limpeza_completa(self, arquivo_saida: str = None) -> bool:
         """
         Executa pipeline completo de limpeza
@@ -483,16 +604,7 @@ class LimpadorDadosBeleza:
             return False
 
         # 2. Limpeza
-        self.corrigir_encoding()
-        self.normalizar_fabricantes()
-        self.normalizar_grupos()
-        self.converter_margem_para_numerico()
-        self.converter_colunas_numericas()
-        self.converter_colunas_data()
-        self.remover_duplicatas()
-        self.preencher_valores_faltantes()
-        self.adicionar_metricas_calculadas()
-        self.validar_dados()
+        self._limpar_df()
 
         # 3. Salvar
         if not self.salvar_dados_limpos(arquivo_saida):
@@ -513,9 +625,14 @@ def main():
     arquivo_entrada = project_root / 'data' / 'parquet' / 'Filial_Madureira.parquet'
     arquivo_saida = project_root / 'data' / 'parquet' / 'Filial_Madureira_LIMPO.parquet'
 
-    # Executar limpeza
+    # Executar limpeza (--lotes N: lê e grava em lotes de N linhas)
     limpador = LimpadorDadosBeleza(arquivo_entrada)
-    sucesso = limpador.executar_limpeza_completa(arquivo_saida)
+    if '--lotes' in sys.argv:
+        indice = sys.argv.index('--lotes')
+        batch_size = int(sys.argv[indice + 1]) if len(sys.argv) > indice + 1 else 50_000
+        sucesso = limpador.executar_limpeza_em_lotes(arquivo_saida, batch_size=batch_size)
+    else:
+        sucesso = limpador.executar_limpeza_completa(arquivo_saida)
 
     if sucesso:
         print("\n" + "="*80)
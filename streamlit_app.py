@@ -22,8 +22,12 @@ from core.query_processor import QueryProcessor
 from core.session_state import SESSION_STATE_KEYS
 from core.config.logging_config import setup_logging
 from core.utils.context import correlation_id_var
+from core.utils.env_setup import enable_copy_on_write
 from ui.ui_components import get_image_download_link
 
+# Snapshots do dataset e entradas de cache servidos como cópias rasas
+enable_copy_on_write()
+
 audit_logger = logging.getLogger("audit")
 
 # --- Constantes ---
@@ -215,14 +219,26 @@ def show_bi_assistant():
                 """
                 )
 
+            # Texto do LLM exibido à medida que é gerado (streaming)
+            stream_placeholder = st.empty()
+            streamed = {"text": ""}
+
+            def on_token(token: str):
+                if not streamed["text"]:
+                    loading_placeholder.empty()
+                streamed["text"] += token
+                stream_placeholder.markdown(streamed["text"] + "▌")
+
             with st.spinner("Aguarde..."):
                 try:
-                    response = query_processor.process_query(prompt)
+                    response = query_processor.process_query(prompt, on_token=on_token)
 
-                    # Limpar mensagem de carregamento
+                    # Limpar mensagem de carregamento e o texto parcial
                     loading_placeholder.empty()
+                    stream_placeholder.empty()
                 except Exception as e:
                     loading_placeholder.empty()
+                    stream_placeholder.empty()
                     st.error(f"Erro ao processar: {str(e)}")
                     st.session_state[SESSION_STATE_KEYS["MESSAGES"]].append(
                         {"role": ROLES["ASSISTANT"], "output": f"Erro: {str(e)}"}
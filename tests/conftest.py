@@ -1,6 +1,10 @@
 import pytest
 
 from core.api import create_app
+from core.utils.env_setup import enable_copy_on_write
+
+# Como nos pontos de entrada da aplicação: snapshots e caches sob Copy-on-Write
+enable_copy_on_write()
 
 
 @pytest.fixture(scope="session")
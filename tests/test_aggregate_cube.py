@@ -0,0 +1,71 @@
+"""
+Testes do cubo de agregados (roll-ups exatos a partir do cuboide base).
+"""
+
+import pandas as pd
+import pytest
+
+from core.utils.aggregate_cube import AggregateCube
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "GRUPO": pd.Categorical(["ESMALTES", "ESMALTES", "CABELOS", "ESMALTES", None]),
+            "FABRICANTE": ["RISQUÉ", "COLORAMA", "SOFTHAIR", "RISQUÉ", "OUTRO"],
+            "VENDA R$": [10.0, 20.0, 30.0, 40.0, 5.0],
+            "LUCRO R$": [2.0, 5.0, 6.0, 10.0, 1.0],
+            "VENDA UNIT R$": [5.0, None, 15.0, 8.0, 1.0],
+            "VENDA QTD JAN": [1, 0, 2, 3, 1],
+            "VENDA QTD FEV": [0, 4, 1, 1, 0],
+        }
+    )
+
+
+@pytest.fixture
+def cube(df):
+    return AggregateCube(
+        df,
+        ["GRUPO", "FABRICANTE"],
+        ["VENDA R$", "LUCRO R$", "VENDA UNIT R$"],
+        ["VENDA QTD JAN", "VENDA QTD FEV"],
+        margin=("LUCRO R$", "VENDA R$"),
+    )
+
+
+def test_base_has_one_row_per_dimension_combination(cube):
+    assert len(cube) == 4
+
+
+def test_rollup_matches_groupby(cube, df):
+    result = cube.rollup("GRUPO")
+    expected = df.groupby("GRUPO", observed=True).agg(
+        soma=("LUCRO R$", "sum"), media=("VENDA UNIT R$", "mean"), maximo=("VENDA UNIT R$", "max")
+    )
+
+    esmaltes = result.loc["ESMALTES"]
+    assert esmaltes["PRODUTOS"] == 3
+    assert esmaltes["LUCRO R$_soma"] == expected.loc["ESMALTES", "soma"]
+    # Média exata a partir de soma/contagem (ignora nulos, não é média de médias)
+    assert esmaltes["VENDA UNIT R$_media"] == pytest.approx(expected.loc["ESMALTES", "media"])
+    assert esmaltes["VENDA UNIT R$_max"] == expected.loc["ESMALTES", "maximo"]
+    assert esmaltes["MARGEM_%"] == pytest.approx(17 / 70 * 100)
+    assert esmaltes["VENDAS_TOTAIS"] == 9
+
+
+def test_totals_and_monthly_series(cube):
+    totals = cube.totals()
+    assert totals["PRODUTOS"] == 5
+    assert totals["VENDA R$_soma"] == 105.0
+
+    assert cube.monthly().to_dict() == {"JAN": 7.0, "FEV": 6.0}
+    media = cube.monthly({"GRUPO": "ESMALTES"}, agregacao="media")
+    assert media.to_dict() == {"JAN": pytest.approx(4 / 3), "FEV": pytest.approx(5 / 3)}
+
+
+def test_dimension_lookup_and_unknown_dimension(cube):
+    assert sorted(cube.dimension_values("GRUPO")) == ["CABELOS", "ESMALTES"]
+    assert cube.match_dimension("GRUPO", "esmal") == ["ESMALTES"]
+    with pytest.raises(KeyError):
+        cube.rollup("DESCRIÇÃO")
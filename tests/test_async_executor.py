@@ -0,0 +1,74 @@
+"""
+Testes do executor limitado usado pela API assíncrona da camada de dados.
+"""
+
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+
+import pytest
+
+from core.utils.async_executor import BoundedExecutor, ExecutorBusyError
+
+
+def test_run_executes_off_the_event_loop_and_keeps_context():
+    executor = BoundedExecutor(max_workers=2, max_pending=2)
+    scope = ContextVar("scope", default=None)
+
+    async def main():
+        scope.set("centro")
+        return await executor.run(lambda: (threading.current_thread().name, scope.get()))
+
+    try:
+        thread_name, value = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert thread_name.startswith("data-async")
+    assert value == "centro"
+
+
+def test_backpressure_rejects_calls_beyond_pending_limit():
+    executor = BoundedExecutor(max_workers=1, max_pending=1, acquire_timeout=0.05)
+    release = threading.Event()
+
+    async def main():
+        first = asyncio.create_task(executor.run(release.wait, 2))
+        await asyncio.sleep(0.01)
+        assert executor.pending() == 1
+        with pytest.raises(ExecutorBusyError):
+            await executor.run(lambda: "nunca")
+        release.set()
+        assert await first is True
+        # A vaga volta depois que a chamada termina
+        assert await executor.run(lambda: "ok") == "ok"
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+
+
+def test_cancel_drops_queued_work_and_timeout_raises():
+    executor = BoundedExecutor(max_workers=1, max_pending=4, acquire_timeout=1)
+    release = threading.Event()
+    ran = []
+
+    async def main():
+        blocker = asyncio.create_task(executor.run(release.wait, 2))
+        queued = asyncio.create_task(executor.run(ran.append, "fila"))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(time.sleep, 0.5, timeout=0.01)
+        release.set()
+        await blocker
+
+    try:
+        asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert ran == []
@@ -0,0 +1,116 @@
+"""
+Testes do registro de cache central (orçamento de bytes, LRU e invalidação).
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.utils.cache_registry import DATA_TAG, CacheRegistry, estimate_size
+
+
+def test_lru_eviction_respects_byte_budget():
+    registry = CacheRegistry(max_bytes=300)
+    registry.put("a", 1, "x", size=100)
+    registry.put("a", 2, "y", size=100)
+    registry.put("b", 1, "z", size=100)
+
+    # Uso recente protege a entrada 'a'/1 do despejo
+    assert registry.get("a", 1) == "x"
+    registry.put("b", 2, "w", size=100)
+
+    assert registry.get("a", 2) is None
+    assert registry.get("a", 1) == "x"
+    assert registry.total_bytes == 300
+
+    stats = registry.stats()["namespaces"]
+    assert stats["a"]["evictions"] == 1
+    assert stats["a"]["hits"] == 2
+    assert stats["a"]["misses"] == 1
+    assert stats["b"]["bytes"] == 200
+
+
+def test_oversized_entry_is_rejected():
+    registry = CacheRegistry(max_bytes=100)
+    assert registry.put("a", 1, "x", size=101) is False
+    assert registry.get("a", 1) is None
+    assert registry.stats()["namespaces"]["a"]["rejected"] == 1
+
+
+def test_namespace_budget_evicts_only_its_own_entries():
+    registry = CacheRegistry(max_bytes=1000)
+    graficos = registry.namespace("graficos", max_bytes=150)
+    registry.put("dados", 1, "d", size=100)
+    graficos.put(1, "g1", size=100)
+    graficos.put(2, "g2", size=100)
+
+    assert graficos.get(1) is None
+    assert graficos.get(2) == "g2"
+    assert registry.get("dados", 1) == "d"
+    assert graficos.put(3, "grande", size=151) is False
+    assert graficos.stats()["max_bytes"] == 150
+
+
+def test_ttl_expires_entries():
+    registry = CacheRegistry(max_bytes=1000)
+    registry.put("a", 1, "x", size=10, ttl=0.01)
+    time.sleep(0.02)
+
+    assert registry.get("a", 1) is None
+    assert registry.stats()["namespaces"]["a"]["expirations"] == 1
+    assert registry.total_bytes == 0
+
+
+def test_invalidate_by_key_namespace_and_tag():
+    registry = CacheRegistry(max_bytes=1000)
+    dados = registry.namespace("respostas", tags=(DATA_TAG,))
+    outros = registry.namespace("outros")
+    dados.put(1, "a", size=10)
+    dados.put(2, "b", size=10)
+    outros.put(1, "c", size=10)
+
+    assert dados.invalidate(1) == 1
+    assert registry.invalidate(tag=DATA_TAG) == 1
+    assert outros.get(1) == "c"
+    assert registry.invalidate() == 1
+    assert registry.total_bytes == 0
+
+
+def test_get_or_load_calls_loader_once():
+    registry = CacheRegistry(max_bytes=10_000)
+    calls = []
+    loader = lambda: calls.append(1) or "valor"
+
+    assert registry.get_or_load("a", "k", loader) == "valor"
+    assert registry.get_or_load("a", "k", loader) == "valor"
+    assert len(calls) == 1
+
+
+def test_estimate_size_uses_deep_memory_usage():
+    df = pd.DataFrame({"a": np.arange(1000, dtype=np.int64), "b": ["texto"] * 1000})
+    assert estimate_size(df) == df.memory_usage(index=True, deep=True).sum()
+    assert estimate_size(np.zeros(10)) == 80
+    assert estimate_size({"x": np.zeros(10)}) > 80
+
+
+def test_reserved_bytes_count_against_budget_but_are_never_evicted():
+    registry = CacheRegistry(max_bytes=1000)
+    registry.put("a", "x", "valor", size=300)
+    registry.put("a", "y", "valor", size=300)
+
+    registry.reserve("dataset", "arquivo", 600)
+    assert registry.total_bytes == 900
+    assert registry.get("a", "x") is None  # entrada comum cedeu espaço
+    assert registry.stats()["namespaces"]["a"]["evictions"] == 1
+
+    # Reserva maior que o orçamento: fica, e entradas comuns são recusadas
+    registry.reserve("dataset", "arquivo", 1500)
+    assert registry.total_bytes == 1500
+    assert registry.put("a", "z", "valor", size=10) is False
+    assert registry.invalidate("dataset") == 0
+    assert registry.stats()["reserved_bytes"] == 1500
+
+    registry.reserve("dataset", "arquivo", 0)
+    assert registry.total_bytes == 0
+    assert registry.put("a", "z", "valor", size=10) is True
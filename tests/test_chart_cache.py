@@ -0,0 +1,78 @@
+"""
+Testes da memoização dos resultados das ferramentas de gráfico.
+"""
+
+import uuid
+
+from core.utils.chart_cache import ChartCache, memoize_chart
+
+
+def _cache(**kwargs) -> ChartCache:
+    # Namespace próprio por teste (o registro de cache é global)
+    return ChartCache(namespace=f"graficos-teste-{uuid.uuid4().hex}", **kwargs)
+
+
+def _ferramenta(cache, versao, chamadas, bypass=lambda: False):
+    @memoize_chart(version=lambda: versao[0], bypass=bypass, cache=cache)
+    def grafico(grupo: str, limite: int = 10):
+        chamadas.append((grupo, limite))
+        if grupo == "erro":
+            return {"status": "error", "message": "falhou"}
+        return {"status": "success", "chart_data": "{}", "summary": {"grupo": grupo, "itens": [1]}}
+
+    return grafico
+
+
+def test_hits_use_normalized_args_and_data_version():
+    cache, versao, chamadas = _cache(directory=None), ["v1"], []
+    grafico = _ferramenta(cache, versao, chamadas)
+
+    primeiro = grafico("ESMALTES")
+    assert grafico(grupo="ESMALTES", limite=10) == primeiro
+    assert len(chamadas) == 1
+
+    # Resultado devolvido é cópia: alterar não contamina o cache
+    primeiro["summary"]["itens"].append(2)
+    assert grafico("ESMALTES")["summary"]["itens"] == [1]
+
+    versao[0] = "v2"
+    grafico("ESMALTES")
+    assert len(chamadas) == 2
+
+
+def test_errors_unknown_version_and_bypass_are_not_cached():
+    cache, versao, chamadas = _cache(directory=None), ["v1"], []
+    grafico = _ferramenta(cache, versao, chamadas)
+    grafico("erro")
+    grafico("erro")
+    assert len(chamadas) == 2
+
+    versao[0] = None
+    grafico("CABELOS")
+    grafico("CABELOS")
+    assert len(chamadas) == 4
+
+    sem_cache = _ferramenta(cache, ["v1"], chamadas, bypass=lambda: True)
+    sem_cache("CABELOS")
+    sem_cache("CABELOS")
+    assert len(chamadas) == 6
+
+
+def test_results_persist_on_disk_across_instances(tmp_path):
+    chamadas = []
+    grafico = _ferramenta(_cache(directory=tmp_path), ["v1"], chamadas)
+    grafico("ESMALTES")
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    # Novo processo (cache em memória vazio) lê o resultado do disco
+    reiniciado = _ferramenta(_cache(directory=tmp_path), ["v1"], chamadas)
+    assert reiniciado("ESMALTES")["summary"]["grupo"] == "ESMALTES"
+    assert len(chamadas) == 1
+
+
+def test_disk_store_respects_byte_budget(tmp_path):
+    cache = _cache(directory=tmp_path, max_bytes=300)
+    for i in range(5):
+        cache.put(f"chave{i}", {"status": "success", "chart_data": "x" * 100})
+    total = sum(path.stat().st_size for path in tmp_path.glob("*.json"))
+    assert 0 < total <= 300
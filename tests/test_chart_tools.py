@@ -304,5 +304,164 @@ def test_gerar_grafico_vendas_mensais_produto(mock_manager):
     assert "dados_mensais" in resultado["summary"]
 
 
+@patch("core.tools.chart_tools.get_data_manager")
+def test_paineis_isolam_falhas_e_mantem_a_ordem(mock_manager):
+    """A falha de um painel do dashboard não derruba os outros."""
+    from core.tools.chart_tools import _executar_paineis
+
+    def falha():
+        raise ValueError("painel quebrado")
+
+    resultados = _executar_paineis([lambda: "a", falha, lambda: "b"])
+
+    assert resultados[0] == "a" and resultados[2] == "b"
+    assert isinstance(resultados[1], ValueError)
+
+
+def test_dashboard_executivo_nao_copia_o_snapshot(tmp_path, monkeypatch):
+    """O dashboard executivo lê o snapshot e os agregados sem copiar as linhas."""
+    import numpy as np
+
+    from core.data_source_manager import FilialMadureiraDataSource
+    from core.tools import chart_tools as modulo
+
+    arquivo = tmp_path / "Filial_Teste.parquet"
+    pd.DataFrame(
+        {
+            "ITEM": ["1", "2", "3"],
+            "DESCRIÇÃO": ["BATOM", "ESMALTE", "SHAMPOO"],
+            "GRUPO": ["MAQUIAGEM", "ESMALTES", "CABELOS"],
+            "QTD": [3, 5, 2],
+            "VENDA UNIT R$": [10.0, 5.0, 20.0],
+            "LUCRO R$": [1.0, 2.0, 3.0],
+            "VENDA QTD JAN": [1, 9, 4],
+        }
+    ).to_parquet(arquivo, index=False)
+    fonte = FilialMadureiraDataSource(file_path=arquivo)
+    assert fonte.connect()
+
+    snapshots = []
+
+    class Gerenciador:
+        def get_dataset_version(self):
+            return fonte.get_version()
+
+        def get_snapshot(self):
+            snapshots.append(fonte.get_snapshot())
+            return snapshots[-1]
+
+        def get_cube(self):
+            return fonte.get_cube()
+
+        def get_sales_matrix(self):
+            return fonte.get_sales_matrix()
+
+    monkeypatch.setattr(modulo, "get_data_manager", Gerenciador)
+
+    resultado = modulo.gerar_dashboard_executivo.invoke({})
+
+    assert resultado["status"] == "success"
+    assert resultado["summary"]["total_produtos"] == 3
+    assert resultado["summary"]["valor_estoque"] == 95.0
+    # Nenhuma coluna acrescentada ao snapshot e nenhuma cópia dos dados
+    assert list(snapshots[0].columns) == list(fonte.get_snapshot().columns)
+    assert np.shares_memory(snapshots[0]["QTD"].to_numpy(), fonte.get_snapshot()["QTD"].to_numpy())
+
+
+def test_painel_recebe_figura_sem_json():
+    """Dentro de um painel a ferramenta devolve a go.Figure; fora dele, o JSON."""
+    import plotly.graph_objects as go
+    from langchain_core.tools import tool
+
+    from core.tools.chart_tools import _export_chart_to_json, _gerar_painel
+
+    @tool
+    def grafico_teste() -> dict:
+        """Gráfico de teste."""
+        return {"status": "success", "chart_data": _export_chart_to_json(go.Figure(go.Bar(y=[1])))}
+
+    assert isinstance(_gerar_painel(grafico_teste)["chart_data"], go.Figure)
+    assert isinstance(grafico_teste.invoke({})["chart_data"], str)
+
+
+def test_ranking_le_matriz_e_snapshot_da_mesma_versao(tmp_path, monkeypatch):
+    """Um reload entre a leitura da matriz e a do snapshot não mistura versões no ranking."""
+    from core.data_source_manager import FilialMadureiraDataSource
+    from core.tools import chart_tools as modulo
+
+    antigo = pd.DataFrame(
+        {
+            "ITEM": ["1", "2", "3"],
+            "DESCRIÇÃO": ["BATOM", "ESMALTE", "SHAMPOO"],
+            "VENDA QTD JAN": [1, 9, 4],
+        }
+    )
+    arquivo = tmp_path / "Filial_Teste.parquet"
+    antigo.to_parquet(arquivo, index=False)
+    fonte = FilialMadureiraDataSource(file_path=arquivo)
+    assert fonte.connect()
+
+    class Gerenciador:
+        def get_dataset_version(self):
+            return fonte.get_version()
+
+        def get_sales_matrix(self):
+            matriz = fonte.get_sales_matrix()
+            # Nova versão publicada logo depois de a matriz ser lida
+            antigo.iloc[::-1].to_parquet(arquivo, index=False)
+            assert fonte.check_for_updates(wait=True) is True
+            return matriz
+
+        def get_snapshot(self):
+            return fonte.get_snapshot()
+
+    monkeypatch.setattr(modulo, "get_data_manager", Gerenciador)
+
+    resultado = modulo.gerar_ranking_produtos_mais_vendidos.invoke({"top_n": 2})
+
+    assert resultado["status"] == "success"
+    assert resultado["summary"]["produtos"] == [
+        {"DESCRIÇÃO": "SHAMPOO", "VENDAS_TOTAIS": 4},
+        {"DESCRIÇÃO": "ESMALTE", "VENDAS_TOTAIS": 9},
+    ]
+
+
+def test_vendas_mensais_sem_serie_na_matriz_le_as_colunas_mensais(tmp_path, monkeypatch):
+    """Sem série na matriz para o ITEM, o gráfico usa as colunas mensais do produto."""
+    from core.data_source_manager import FilialMadureiraDataSource
+    from core.tools import chart_tools as modulo
+
+    arquivo = tmp_path / "Filial_Teste.parquet"
+    pd.DataFrame(
+        {
+            "ITEM": ["9"],
+            "DESCRIÇÃO": ["ESMALTE"],
+            "FABRICANTE": ["RISQUÉ"],
+            "GRUPO": ["ESMALTES"],
+            "VENDA QTD JAN": [3],
+            "VENDA QTD FEV": [5],
+        }
+    ).to_parquet(arquivo, index=False)
+    fonte = FilialMadureiraDataSource(file_path=arquivo)
+    assert fonte.connect()
+
+    class Gerenciador:
+        def get_dataset_version(self):
+            return fonte.get_version()
+
+        def get_product_sales(self, key, column="ITEM"):
+            return None  # ex.: várias filiais em escopo
+
+        def lookup(self, column, key, columns=None):
+            return fonte.lookup(column, key, columns=columns)
+
+    monkeypatch.setattr(modulo, "get_data_manager", Gerenciador)
+
+    resultado = modulo.gerar_grafico_vendas_mensais_produto.invoke({"codigo_produto": 9})
+
+    assert resultado["status"] == "success"
+    assert resultado["summary"]["total_vendas"] == 8
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
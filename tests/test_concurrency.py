@@ -0,0 +1,71 @@
+"""
+Testes das primitivas de concorrência (single-flight e lock leitores-escritor).
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.utils.concurrency import ReadWriteLock, SingleFlight
+
+
+def test_single_flight_runs_loader_once_for_concurrent_callers():
+    flight = SingleFlight()
+    calls = []
+    start = threading.Barrier(8)
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return "dados"
+
+    def worker():
+        start.wait()
+        return flight.do("chave", loader)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: worker(), range(8)))
+
+    assert results == ["dados"] * 8
+    assert len(calls) == 1
+    assert not flight.in_flight("chave")
+
+
+def test_single_flight_shares_errors_and_allows_retry():
+    flight = SingleFlight()
+
+    def failing():
+        raise OSError("falha de leitura")
+
+    with pytest.raises(OSError):
+        flight.do("chave", failing)
+    assert flight.do("chave", lambda: 42) == 42
+
+
+def test_read_write_lock_readers_share_writer_excludes():
+    lock = ReadWriteLock()
+    readers_inside = threading.Barrier(2, timeout=2)
+    events = []
+
+    def reader():
+        with lock.read_lock():
+            # Os dois leitores precisam estar dentro ao mesmo tempo
+            readers_inside.wait()
+            events.append("leitura")
+
+    def writer():
+        with lock.write_lock():
+            events.append("escrita")
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=2)
+    writer_thread = threading.Thread(target=writer)
+    writer_thread.start()
+    writer_thread.join(timeout=2)
+
+    assert events == ["leitura", "leitura", "escrita"]
@@ -0,0 +1,99 @@
+"""
+Testes da página de KPIs do setor de beleza (filtros da sidebar e uso do cubo).
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import core.data_source_manager as data_source_manager
+from core.data_source_manager import FilialMadureiraDataSource
+from core.session_state import SESSION_STATE_KEYS
+from ui.filtros_interativos import aplicar_filtros
+
+PAGINA = Path(__file__).resolve().parents[1] / "pages" / "7_Dashboard_KPIs_Beleza.py"
+MESES = ["JAN", "FEV", "MAR", "ABR", "MAI", "JUN", "JUL", "AGO", "SET", "OUT", "NOV", "DEZ"]
+
+# Filtros como criar_filtros_sidebar devolve sem o usuário mexer em nada
+FILTROS_PADRAO = {
+    "grupos": [],
+    "fabricantes": [],
+    "margem_minima": 25.0,
+    "estoque_min": 0,
+    "estoque_max": 6,
+    "apenas_em_estoque": False,
+}
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame(
+        {
+            "ITEM": ["1", "2", "3", "4"],
+            "DESCRIÇÃO": ["VASELINA", "ESMALTE RISQUÉ", "COND D-PANTENOL", "ESMALTE COLORAMA"],
+            "GRUPO": ["CUIDADOS", "ESMALTES", "CABELOS", "ESMALTES"],
+            "FABRICANTE": ["RIOQUIMICA", "RISQUÉ", "SOFTHAIR", "COLORAMA"],
+            "QTD": [1, 5, 2, 7],
+            "SALDO": [-8, 0, 6, 3],
+            "VENDA UNIT R$": [7.9, 39.99, 14.99, 8.5],
+            "LUCRO R$": [4.85, 11.67, 5.19, 3.2],
+            "LUCRO TOTAL %": [40.0, 25.0, None, 30.0],
+            "VLR ESTOQUE VENDA": [0.0, 0.0, 89.94, 25.5],
+            **{f"VENDA QTD {mes}": [i, 2, 0, 1] for i, mes in enumerate(MESES)},
+        }
+    )
+
+
+def test_default_filters_return_the_input_without_copy(sample_df):
+    assert aplicar_filtros(sample_df, FILTROS_PADRAO) is sample_df
+
+    em_estoque = aplicar_filtros(sample_df, {**FILTROS_PADRAO, "apenas_em_estoque": True})
+    assert em_estoque["ITEM"].tolist() == ["3", "4"]
+
+    faixa = aplicar_filtros(sample_df, {**FILTROS_PADRAO, "estoque_min": 1})
+    assert faixa["ITEM"].tolist() == ["3", "4"]
+
+    margem = aplicar_filtros(sample_df, {**FILTROS_PADRAO, "margem_minima": 30.0})
+    assert margem["ITEM"].tolist() == ["1", "4"]
+
+
+def test_page_with_default_filters_uses_the_cube_and_sales_matrix(tmp_path, sample_df, monkeypatch):
+    arquivo = tmp_path / "Filial_Teste.parquet"
+    sample_df.to_parquet(arquivo, index=False)
+    fonte = FilialMadureiraDataSource(file_path=arquivo)
+    assert fonte.connect()
+
+    leituras = []
+
+    class Gerenciador:
+        def get_snapshot(self):
+            return fonte.get_snapshot()
+
+        def get_dataset_version(self):
+            return fonte.get_version()
+
+        def get_cube(self):
+            leituras.append("cubo")
+            return fonte.get_cube()
+
+        def get_sales_matrix(self):
+            leituras.append("matriz")
+            return fonte.get_sales_matrix()
+
+    monkeypatch.setattr(data_source_manager, "get_data_manager", Gerenciador)
+
+    app = AppTest.from_file(str(PAGINA), default_timeout=30)
+    app.session_state[SESSION_STATE_KEYS["AUTHENTICATED"]] = True
+    app.run()
+
+    assert not app.exception
+    # Categorias e fabricantes pelo cubo, sazonalidade pela matriz
+    assert sorted(leituras) == ["cubo", "cubo", "matriz"]
+
+    # Com um filtro ativo, os agregados saem das linhas filtradas
+    leituras.clear()
+    next(c for c in app.sidebar.checkbox if c.label.startswith("Apenas em estoque")).check().run()
+    assert not app.exception
+    assert leituras == []
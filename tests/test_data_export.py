@@ -0,0 +1,37 @@
+"""
+Testes da exportação em lotes (CSV/Excel).
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+from core.utils.data_export import iter_csv_chunks, write_csv, write_excel
+
+
+@pytest.fixture
+def batches():
+    return [
+        pd.DataFrame({"ITEM": ["1", "2"], "VENDA R$": [7.9, None]}),
+        pd.DataFrame({"ITEM": ["3"], "VENDA R$": [14.99]}),
+    ]
+
+
+def test_csv_header_written_once(batches):
+    buffer = io.StringIO()
+    assert write_csv(batches, buffer) == 3
+    assert buffer.getvalue().splitlines() == ["ITEM,VENDA R$", "1,7.9", "2,", "3,14.99"]
+
+    chunks = list(iter_csv_chunks(batches, sep=";", decimal=","))
+    assert chunks[0].startswith("ITEM;VENDA R$") and "14,99" in chunks[1]
+
+
+def test_excel_write_only(tmp_path, batches):
+    pytest.importorskip("openpyxl")
+    path = tmp_path / "produtos.xlsx"
+
+    assert write_excel(batches, path) == 3
+    df = pd.read_excel(path, dtype={"ITEM": str})
+    assert df["ITEM"].tolist() == ["1", "2", "3"]
+    assert pd.isna(df.loc[1, "VENDA R$"])
@@ -0,0 +1,519 @@
+"""
+Testes do DataSourceManager / FilialMadureiraDataSource com um Parquet sintético.
+"""
+
+import time
+
+import pandas as pd
+import pytest
+
+from core.data_source_manager import FilialMadureiraDataSource
+
+
+@pytest.fixture
+def sample_df():
+    """Amostra pequena com a estrutura da Filial Madureira."""
+    return pd.DataFrame(
+        {
+            "ITEM": ["1", "2", "3", "4"],
+            "CÓDIGO": ["7896205901654", "7898244189697", "7896115142581", "7891000100103"],
+            "DESCRIÇÃO": [
+                "VASELINA LIQUIDA 100ML",
+                "ESMALTÉ RISQUÉ VERMELHO",
+                "COND 300ML D-PANTENOL",
+                "esmalte colorama rosa",
+            ],
+            "FABRICANTE": ["RIOQUIMICA", "RISQUÉ", "SOFTHAIR", "COLORAMA"],
+            "GRUPO": ["CUIDADOS", "ESMALTES", "CABELOS", "ESMALTES"],
+            "QTD": [1, 5, 2, 7],
+            "SALDO": [-8, 0, 6, 3],
+            "VENDA UNIT R$": [7.9, 39.99, 14.99, 8.5],
+            "LUCRO R$": [4.85, 11.67, 5.19, 3.2],
+            "VENDA QTD JAN": [0, 3, 1, 2],
+            "VENDA QTD FEV": [2, 0, 1, 4],
+        }
+    )
+
+
+@pytest.fixture
+def parquet_file(tmp_path, sample_df):
+    path = tmp_path / "Filial_Teste.parquet"
+    sample_df.to_parquet(path, index=False)
+    return path
+
+
+@pytest.fixture
+def source(parquet_file):
+    data_source = FilialMadureiraDataSource(file_path=parquet_file)
+    assert data_source.connect()
+    return data_source
+
+
+def test_snapshot_shares_memory_without_copy(source):
+    """Snapshots consecutivos compartilham os mesmos buffers do cache."""
+    snap_a = source.get_snapshot()
+    snap_b = source.get_snapshot()
+
+    assert snap_a is not snap_b
+    assert snap_a["QTD"].to_numpy().ctypes.data == snap_b["QTD"].to_numpy().ctypes.data
+
+
+def test_snapshot_writes_are_isolated(source):
+    """Escritas em um snapshot não vazam para o cache nem para outros leitores."""
+    snap = source.get_snapshot()
+    snap.loc[0, "QTD"] = 999
+    snap["GRUPO"] = "ALTERADO"
+    snap["NOVA_COLUNA"] = 1
+
+    fresh = source.get_data()
+    assert fresh.loc[0, "QTD"] == 1
+    assert "ALTERADO" not in fresh["GRUPO"].tolist()
+    assert "NOVA_COLUNA" not in source.get_columns()
+
+
+def test_snapshot_without_copy_on_write_is_a_deep_copy(source):
+    """Processo sem Copy-on-Write: o snapshot é cópia profunda e escritas não vazam."""
+    with pd.option_context("mode.copy_on_write", False):
+        snap = source.get_snapshot()
+        snap.loc[0, "QTD"] = 999
+
+    assert source.get_snapshot()["QTD"].tolist() == [1, 5, 2, 7]
+
+
+def test_get_data_limit_and_shape(source):
+    assert len(source.get_data(limit=2)) == 2
+    assert source.get_shape() == (4, 11)
+
+
+def test_projection_returns_only_requested_columns(source):
+    df = source.get_data(columns=["ITEM", "GRUPO", "COLUNA_INEXISTENTE"])
+    assert df.columns.tolist() == ["ITEM", "GRUPO"]
+    assert len(df) == 4
+
+
+def test_structured_filters_are_pushed_down(source):
+    df = source.get_filtered_data(
+        [("GRUPO", "==", "ESMALTES"), ("QTD", ">", "5")], columns=["ITEM", "QTD"]
+    )
+    assert df["ITEM"].tolist() == ["4"]
+
+    df = source.get_filtered_data(
+        [{"column": "ITEM", "operator": "in", "value": [1, 3]}], columns=["ITEM"]
+    )
+    assert sorted(df["ITEM"].tolist()) == ["1", "3"]
+
+
+def test_dict_filters_with_projection_coerce_values(source):
+    df = source.get_filtered_data({"ITEM": 2}, columns=["ITEM", "LUCRO R$"])
+    assert df.to_dict("records") == [{"ITEM": "2", "LUCRO R$": 11.67}]
+
+
+def test_search_with_projection_is_case_insensitive(source):
+    df = source.search("DESCRIÇÃO", "vaselina", limit=5, columns=["ITEM"])
+    assert df["ITEM"].tolist() == ["1"]
+
+
+def test_filter_on_unknown_column_returns_empty(source):
+    assert source.get_filtered_data([("NAO_EXISTE", "==", 1)]).empty
+
+
+def test_key_index_exact_lookup(source):
+    assert source.lookup("ITEM", 3)["DESCRIÇÃO"].tolist() == ["COND 300ML D-PANTENOL"]
+    assert source.lookup("ITEM", "3.0", columns=["ITEM"]).to_dict("records") == [{"ITEM": "3"}]
+    # Apelido CODIGO -> CÓDIGO e chave normalizada (aspas/espaços)
+    assert source.lookup("CODIGO", ' "7898244189697" ')["ITEM"].tolist() == ["2"]
+    assert source.lookup("ITEM", 99).empty
+
+
+def test_search_on_key_column_prefers_exact_match(source, parquet_file, sample_df):
+    extra = sample_df.iloc[[0]].assign(ITEM="13", DESCRIÇÃO="OUTRO PRODUTO")
+    pd.concat([sample_df, extra]).to_parquet(parquet_file, index=False)
+    source.get_snapshot(force_reload=True)
+
+    assert source.search("ITEM", "3")["ITEM"].tolist() == ["3"]
+    assert source.get_filtered_data({"ITEM": "13"})["DESCRIÇÃO"].tolist() == ["OUTRO PRODUTO"]
+
+
+def test_key_index_is_rebuilt_on_reload(source, parquet_file, sample_df):
+    assert source.lookup("ITEM", 5).empty
+    sample_df.assign(ITEM=["5", "6", "7", "8"]).to_parquet(parquet_file, index=False)
+    source.get_snapshot(force_reload=True)
+
+    assert source.lookup("ITEM", 5)["DESCRIÇÃO"].tolist() == ["VASELINA LIQUIDA 100ML"]
+    assert source.lookup("ITEM", 1).empty
+
+
+def test_text_search_on_description_ignores_accents(source):
+    df = source.search("DESCRIÇÃO", "esmalte", limit=10)
+    assert sorted(df["ITEM"].tolist()) == ["2", "4"]
+
+    df = source.search("FABRICANTE", "risque", limit=10, columns=["ITEM", "FABRICANTE"])
+    assert df.to_dict("records") == [{"ITEM": "2", "FABRICANTE": "RISQUÉ"}]
+
+
+def test_arrow_cache_is_created_and_memory_mapped(source, parquet_file):
+    from core.data_source_manager import arrow_cache_path, open_arrow_cache
+
+    source.get_data()
+    assert arrow_cache_path(parquet_file).exists()
+
+    table = open_arrow_cache(parquet_file)
+    assert table is not None
+    assert table.num_rows == 4
+
+    # Segundo leitor (outro worker) carrega do mesmo cache
+    other = FilialMadureiraDataSource(file_path=parquet_file)
+    assert other.get_data()["ITEM"].tolist() == ["1", "2", "3", "4"]
+
+
+def test_arrow_cache_is_invalidated_when_parquet_changes(source, parquet_file, sample_df):
+    from core.data_source_manager import open_arrow_cache
+
+    source.get_data()
+    sample_df.iloc[:2].to_parquet(parquet_file, index=False)
+
+    assert open_arrow_cache(parquet_file) is None
+    assert len(source.get_snapshot(force_reload=True)) == 2
+    assert open_arrow_cache(parquet_file).num_rows == 2
+
+
+def test_hot_reload_swaps_snapshot_atomically(parquet_file, sample_df):
+    source = FilialMadureiraDataSource(file_path=parquet_file, reload_check_interval=0)
+    old_snapshot = source.get_snapshot()
+    old_version = source.get_version()
+
+    sample_df.assign(ITEM=["5", "6", "7", "8"]).to_parquet(parquet_file, index=False)
+
+    # Leitura dispara o reload em segundo plano e ainda devolve a versão atual
+    source.get_data()
+    source._reload_thread.join(timeout=10)
+
+    assert source.get_version() != old_version
+    assert source.lookup("ITEM", 5)["DESCRIÇÃO"].tolist() == ["VASELINA LIQUIDA 100ML"]
+    # Quem já tinha o snapshot antigo continua com ele
+    assert old_snapshot["ITEM"].tolist() == ["1", "2", "3", "4"]
+
+
+def test_reads_during_slow_reload_do_not_block(parquet_file, sample_df, monkeypatch):
+    import threading
+
+    source = FilialMadureiraDataSource(file_path=parquet_file, reload_check_interval=0)
+    source.get_data()
+
+    started, release = threading.Event(), threading.Event()
+    original = FilialMadureiraDataSource._load_state
+
+    def slow_load(self):
+        started.set()
+        release.wait(timeout=10)
+        return original(self)
+
+    monkeypatch.setattr(FilialMadureiraDataSource, "_load_state", slow_load)
+    sample_df.assign(ITEM=["5", "6", "7", "8"]).to_parquet(parquet_file, index=False)
+    source.get_data()  # dispara o reload em segundo plano
+    assert started.wait(timeout=5)
+
+    # Leituras com a verificação de versão vencida respondem na hora, com a versão atual
+    begin = time.monotonic()
+    for _ in range(3):
+        assert source.get_data()["ITEM"].tolist() == ["1", "2", "3", "4"]
+    assert time.monotonic() - begin < 1.0
+
+    release.set()
+    source._reload_thread.join(timeout=10)
+    assert source.get_data()["ITEM"].tolist() == ["5", "6", "7", "8"]
+
+
+def test_failed_reload_keeps_current_version(source, parquet_file):
+    source.get_data()
+    version = source.get_version()
+
+    parquet_file.write_bytes(b"arquivo corrompido")
+
+    assert source.check_for_updates(wait=True) is False
+    assert source.get_version() == version
+    assert len(source.get_data()) == 4
+
+
+def test_dtype_plan_is_applied_on_load(source):
+    df = source.get_data()
+
+    assert df["GRUPO"].dtype == "category"
+    assert df["FABRICANTE"].dtype == "category"
+    assert str(df["DESCRIÇÃO"].dtype) == "string"
+    assert df["QTD"].dtype == "int32"
+    assert df["VENDA QTD JAN"].dtype == "int32"
+    # Valores monetários mantêm precisão total
+    assert df["LUCRO R$"].dtype == "float64"
+
+    assert {"memory_mb", "memory_saved_mb", "memory_saved_pct"} <= set(source.get_info())
+
+
+def test_dtype_plan_halves_memory(sample_df):
+    from core.data_source_manager import apply_dtype_plan, memory_usage_bytes
+
+    df = pd.concat([sample_df] * 500, ignore_index=True)
+    assert memory_usage_bytes(apply_dtype_plan(df)) < memory_usage_bytes(df) / 2
+
+
+def test_filters_on_categorical_columns(source):
+    df = source.get_filtered_data([("GRUPO", "in", ["ESMALTES"])], columns=["ITEM", "GRUPO"])
+    assert sorted(df["ITEM"].tolist()) == ["2", "4"]
+    assert df["GRUPO"].dtype == "category"
+
+    assert len(source.get_filtered_data({"GRUPO": "ESMALTES"})) == 2
+
+
+def test_aggregate_cube_is_built_on_load(source):
+    cube = source.get_cube()
+
+    assert cube.rollup("GRUPO").loc["ESMALTES", "PRODUTOS"] == 2
+    assert cube.totals()["LUCRO R$_soma"] == pytest.approx(24.91)
+    assert cube.monthly()["FEV"] == 7
+
+
+def test_execute_query_runs_sql_over_loaded_data(source):
+    df = source.execute_query(
+        'SELECT ITEM, "LUCRO R$" FROM filial_madureira WHERE GRUPO = $grupo ORDER BY ITEM',
+        {"grupo": "ESMALTES"},
+    )
+    assert df["ITEM"].tolist() == ["2", "4"]
+
+
+@pytest.fixture
+def partitioned_dir(tmp_path, sample_df):
+    """Dataset Hive com duas filiais e dois anos por filial."""
+    root = tmp_path / "filiais"
+    for filial, offset in [("madureira", 0), ("centro", 100)]:
+        for ano in (2023, 2024):
+            part = root / f"filial={filial}" / f"ano={ano}"
+            part.mkdir(parents=True)
+            items = [str(int(item) + offset + (ano - 2023) * 10) for item in sample_df["ITEM"]]
+            sample_df.assign(ITEM=items).to_parquet(part / "part-0.parquet", index=False)
+    return root
+
+
+def test_partitioned_scan_prunes_branches(partitioned_dir):
+    from core.data_source_manager import PartitionedDataSource
+
+    source = PartitionedDataSource(partitioned_dir)
+    assert source.list_branches() == ["centro", "madureira"]
+    assert source.count_fragments() == 4
+    assert source.count_fragments(["centro"]) == 2
+    assert source.count_fragments(["centro"], [("ano", "==", 2024)]) == 1
+
+    df = source.scan(["ITEM"], [("GRUPO", "==", "ESMALTES")], filiais=["centro"])
+    assert sorted(df["ITEM"].tolist()) == ["102", "104", "112", "114"]
+    assert set(df["filial"]) == {"centro"}
+
+
+def test_manager_routes_calls_to_scoped_branches(parquet_file, partitioned_dir):
+    from core.data_source_manager import DataSourceManager, filial_scope
+
+    manager = DataSourceManager(file_path=parquet_file, partitioned_dir=partitioned_dir)
+    assert manager.get_available_sources() == ["filial_madureira", "centro", "madureira"]
+
+    # Sem escopo: fonte padrão
+    assert len(manager.get_snapshot()) == 4
+
+    assert manager.get_data(source="centro", columns=["ITEM"])["ITEM"].min() == "101"
+
+    with filial_scope("centro"):
+        assert manager.lookup("ITEM", 112)["DESCRIÇÃO"].tolist() == ["ESMALTÉ RISQUÉ VERMELHO"]
+        assert manager.get_cube().totals()["PRODUTOS"] == 8
+        rows = manager.execute_query("SELECT COUNT(*) AS n FROM filial_madureira")
+        assert rows == [{"n": 8}]
+
+    with filial_scope("centro", "madureira"):
+        df = manager.get_filtered_data(filters={"GRUPO": "CABELOS"}, columns=["ITEM"])
+        assert sorted(df["ITEM"].tolist()) == ["103", "113", "13", "3"]
+        assert set(df["filial"]) == {"centro", "madureira"}
+        assert len(manager.search_data(column="DESCRIÇÃO", value="esmalte", limit=50)) == 8
+        assert manager.get_cube() is None
+
+
+def test_dataset_state_is_reserved_in_cache_registry(source, monkeypatch):
+    from core.utils.cache_registry import get_cache_registry
+
+    source.get_data()
+    registry = get_cache_registry()
+    stats = registry.stats()["namespaces"]["dataset"]
+    assert stats["reserved_bytes"] > 0 and stats["entries"] == 0
+
+    # Outros caches passando do orçamento não despejam o estado: sem reload
+    calls = []
+    original = FilialMadureiraDataSource._load_state
+    monkeypatch.setattr(
+        FilialMadureiraDataSource, "_load_state", lambda self: calls.append(1) or original(self)
+    )
+    monkeypatch.setattr(registry, "max_bytes", registry.total_bytes + 1000)
+    for i in range(20):
+        registry.put("teste_orcamento", i, b"x" * 500)
+    registry.invalidate("dataset")
+
+    assert source.lookup("ITEM", 2)["DESCRIÇÃO"].tolist() == ["ESMALTÉ RISQUÉ VERMELHO"]
+    assert calls == []
+    assert registry.stats()["namespaces"]["teste_orcamento"]["evictions"] > 0
+    registry.invalidate("teste_orcamento")
+
+
+def test_get_many_resolves_keys_in_one_pass(source):
+    df = source.get_many([4, "2", "2.0", 99], columns=["ITEM", "QTD"])
+    assert df["ITEM"].tolist() == ["4", "2"]
+    assert source.missing_keys([4, "2", 99]) == ["99"]
+
+    df = source.get_many(['"7898244189697"'], column="CODIGO", columns=["ITEM"])
+    assert df["ITEM"].tolist() == ["2"]
+    # Coluna sem índice hash: um único isin
+    assert source.get_many(["RISQUÉ"], column="FABRICANTE", columns=["ITEM"])["ITEM"].tolist() == ["2"]
+
+
+def test_iter_batches_streams_projection_and_filters(source):
+    batches = list(
+        source.iter_batches(columns=["ITEM", "GRUPO"], filters={"GRUPO": "ESMALTES"}, batch_size=1)
+    )
+    assert [len(batch) for batch in batches] == [1, 1]
+    assert pd.concat(batches)["ITEM"].tolist() == ["2", "4"]
+    assert batches[0]["GRUPO"].dtype == "category"
+
+    arrow_batches = list(source.iter_batches(batch_size=3, as_arrow=True))
+    assert [batch.num_rows for batch in arrow_batches] == [3, 1]
+
+    assert list(source.iter_batches(filters=[("NAO_EXISTE", "==", 1)])) == []
+
+
+
+def test_result_cache_hits_and_reload_invalidation(source, parquet_file, sample_df):
+    filters = [("GRUPO", "in", ["ESMALTES", "CABELOS"]), ("QTD", ">", 1)]
+    first = source.get_filtered_data(filters, columns=["ITEM"])
+    before = source.get_result_cache_stats()["hits"]
+
+    # Mesmos filtros em outra ordem: mesma chave canônica
+    reordered = [("QTD", ">", 1), ("GRUPO", "in", ["CABELOS", "ESMALTES"])]
+    second = source.get_filtered_data(reordered, columns=["ITEM"])
+    assert source.get_result_cache_stats()["hits"] == before + 1
+    assert second["ITEM"].tolist() == first["ITEM"].tolist()
+
+    # Escrita no resultado não contamina o cache
+    second.loc[second.index[0], "ITEM"] = "ALTERADO"
+    assert "ALTERADO" not in source.get_filtered_data(filters, columns=["ITEM"])["ITEM"].tolist()
+
+    sample_df.assign(QTD=[0, 0, 0, 0]).to_parquet(parquet_file, index=False)
+    assert source.check_for_updates(wait=True)
+    assert source.get_filtered_data(filters, columns=["ITEM"]).empty
+
+
+def test_concurrent_cold_load_reads_file_once(parquet_file, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    original = FilialMadureiraDataSource._load_state
+    calls = []
+
+    def slow_load(self):
+        calls.append(1)
+        time.sleep(0.05)
+        return original(self)
+
+    monkeypatch.setattr(FilialMadureiraDataSource, "_load_state", slow_load)
+    sources = [FilialMadureiraDataSource(file_path=parquet_file) for _ in range(6)]
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        shapes = list(pool.map(lambda src: src.get_shape(), sources))
+
+    assert shapes == [(4, 11)] * 6
+    assert len(calls) == 1
+
+
+def test_async_api_matches_sync_results(parquet_file, partitioned_dir):
+    import asyncio
+
+    from core.data_source_manager import DataSourceManager, filial_scope
+
+    manager = DataSourceManager(file_path=parquet_file, partitioned_dir=partitioned_dir)
+
+    async def main():
+        data, found, filtered = await asyncio.gather(
+            manager.aget_data(columns=["ITEM"], limit=2),
+            manager.asearch_data(column="DESCRIÇÃO", value="esmalte"),
+            manager.aget_filtered_data(filters={"GRUPO": "ESMALTES"}, columns=["ITEM"]),
+        )
+        with filial_scope("centro"):
+            scoped = await manager.aget_data(columns=["ITEM"])
+        return data, found, filtered, scoped
+
+    data, found, filtered, scoped = asyncio.run(main())
+    assert data["ITEM"].tolist() == ["1", "2"]
+    assert len(found) == 2
+    assert filtered["ITEM"].tolist() == ["2", "4"]
+    # O escopo de filial (ContextVar) acompanha a chamada até o executor
+    assert scoped["ITEM"].min() == "101"
+
+
+def test_column_catalog_is_enforced_once_at_load(tmp_path, sample_df):
+    from core.data_source_manager import coerce_filter_value
+
+    raw = sample_df.assign(
+        ITEM=[1.0, 2.0, 3.0, 4.0],
+        QTD=["1", "5", "2", "7"],
+        **{"VENDA UNIT R$": ["7.9", "39.99", "x", "8.5"]},
+    )
+    path = tmp_path / "Filial_Sem_Tipos.parquet"
+    raw.to_parquet(path, index=False)
+    data_source = FilialMadureiraDataSource(file_path=path)
+
+    df = data_source.get_snapshot()
+    assert df["ITEM"].tolist() == ["1", "2", "3", "4"]
+    assert str(df["QTD"].dtype) == "int32"
+    assert df["VENDA UNIT R$"].isna().tolist() == [False, False, True, False]
+
+    # Filtros: só o valor é convertido para o tipo da coluna
+    assert coerce_filter_value("ITEM", 3) == "3"
+    assert coerce_filter_value("QTD", "5") == 5
+    assert coerce_filter_value("QTD", ["1", 2.0]) == [1, 2]
+    assert coerce_filter_value("DT CADASTRO", "2024-01-31") == pd.Timestamp("2024-01-31")
+    with pytest.raises(ValueError):
+        coerce_filter_value("LUCRO R$", "abc")
+
+    assert data_source.get_filtered_data({"ITEM": 2})["DESCRIÇÃO"].tolist() == [
+        "ESMALTÉ RISQUÉ VERMELHO"
+    ]
+    assert data_source.get_filtered_data({"QTD": "7"})["ITEM"].tolist() == ["4"]
+    assert data_source.get_filtered_data([("ITEM", "in", [1, 4.0])])["ITEM"].tolist() == ["1", "4"]
+
+
+def test_sales_matrix_is_built_on_load(source):
+    matrix = source.get_sales_matrix()
+    assert matrix.months == ["JAN", "FEV"]
+    # Chaves normalizadas como no índice de ITEM ('2.0' -> '2')
+    assert matrix.product("2.0").tolist() == [3.0, 0.0]
+    assert matrix.series("GRUPO", "ESMALTES").tolist() == [5.0, 4.0]
+    assert source._get_state().nbytes > matrix.nbytes
+
+
+def test_product_sales_by_item_or_codigo(source):
+    by_codigo = source.get_product_sales('"7898244189697"', column="CODIGO")
+    assert by_codigo.index.tolist() == ["JAN", "FEV"]
+    assert by_codigo.tolist() == [3.0, 0.0]
+    assert source.get_product_sales("4").tolist() == [2.0, 4.0]
+    assert source.get_product_sales("999", column="CÓDIGO") is None
+
+
+def test_pinned_snapshot_keeps_one_version_across_reload(source, parquet_file, sample_df):
+    from concurrent.futures import ThreadPoolExecutor
+    from contextvars import copy_context
+
+    from core.data_source_manager import pinned_snapshot
+
+    with pinned_snapshot():
+        version = source.get_version()
+        sample_df.assign(ITEM=["5", "6", "7", "8"]).to_parquet(parquet_file, index=False)
+        assert source.check_for_updates(wait=True) is True
+
+        # Dentro do bloco (inclusive em outra thread com o contexto copiado) a versão não muda
+        assert source.get_version() == version
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            items = pool.submit(copy_context().run, source.get_data).result()["ITEM"].tolist()
+        assert items == ["1", "2", "3", "4"]
+
+    assert source.get_version() != version
+    assert source.get_data()["ITEM"].tolist() == ["5", "6", "7", "8"]
@@ -0,0 +1,74 @@
+"""
+Testes do motor SQL local (DuckDB) usado por DataSourceManager.execute_query.
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from core.utils.duckdb_engine import DuckDBQueryEngine, validar_consulta
+
+
+@pytest.fixture
+def engine():
+    table = pa.Table.from_pandas(
+        pd.DataFrame(
+            {
+                "ITEM": ["1", "2", "3", "4"],
+                "GRUPO": ["ESMALTES", "CABELOS", "ESMALTES", "CABELOS"],
+                "VENDA QTD SET": [1, 2, 3, 4],
+                "LUCRO R$": [1.5, 2.0, 3.0, 0.5],
+            }
+        ),
+        preserve_index=False,
+    )
+    return DuckDBQueryEngine({"filial_madureira": table})
+
+
+def test_aggregation_with_named_parameters(engine):
+    df = engine.execute(
+        'SELECT GRUPO, SUM("VENDA QTD SET") AS vendas FROM filial_madureira '
+        'WHERE "LUCRO R$" > $minimo GROUP BY GRUPO ORDER BY GRUPO',
+        {"minimo": 1},
+    )
+    assert df.to_dict("records") == [
+        {"GRUPO": "CABELOS", "vendas": 2},
+        {"GRUPO": "ESMALTES", "vendas": 4},
+    ]
+
+
+def test_positional_parameters_and_row_limit(engine):
+    df = engine.execute("SELECT ITEM FROM filial_madureira WHERE GRUPO = ? ORDER BY ITEM", ["CABELOS"])
+    assert df["ITEM"].tolist() == ["2", "4"]
+
+    assert len(engine.execute("SELECT * FROM filial_madureira", max_rows=3)) == 3
+
+
+def test_streaming_batches(engine):
+    batches = list(engine.iter_batches("SELECT * FROM filial_madureira", batch_size=3))
+    assert sum(len(batch) for batch in batches) == 4
+    assert all(len(batch) <= 3 for batch in batches)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "DELETE FROM filial_madureira",
+        "SELECT 1; DROP TABLE filial_madureira",
+        "WITH x AS (SELECT 1) INSERT INTO t SELECT * FROM x",
+        "PRAGMA show_tables",
+        "",
+    ],
+)
+def test_guard_rejects_non_read_queries(engine, query):
+    with pytest.raises(ValueError):
+        engine.execute(query)
+
+
+def test_guard_ignores_keywords_inside_quotes():
+    assert validar_consulta('SELECT "VENDA QTD SET" FROM t WHERE x = \'DELETE\';')
+
+
+def test_external_file_access_is_blocked(engine):
+    with pytest.raises(ValueError):
+        engine.execute("SELECT * FROM read_csv('/etc/passwd')")
@@ -0,0 +1,126 @@
+# tests/test_gemini_adapter.py
+import logging
+import os
+import sys
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# Adicionar o diretório raiz ao sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import core.llm_gemini_adapter as gemini
+from core.llm_gemini_adapter import GeminiLLMAdapter
+
+TOOLS = {
+    "function_declarations": [
+        {"name": "consultar_dados", "description": "Consulta", "parameters": {"type": "object", "properties": {}}}
+    ]
+}
+MESSAGES = [{"role": "user", "content": "oi"}]
+
+
+@pytest.fixture(autouse=True)
+def clean_model_cache():
+    gemini.clear_model_cache()
+    yield
+    gemini.clear_model_cache()
+
+
+def _adapter(timeout=5.0):
+    adapter = object.__new__(GeminiLLMAdapter)
+    adapter.logger = logging.getLogger("test")
+    adapter.model_name = "gemini-test"
+    adapter.max_retries = 3
+    adapter.retry_delay = 0
+    adapter.timeout = timeout
+    return adapter
+
+
+def _response(text=None, function_call=None):
+    part = SimpleNamespace(text=text, function_call=function_call)
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+def test_model_is_reused_per_tool_set_and_receives_deadline():
+    adapter = _adapter(timeout=30)
+    with patch.object(gemini, "genai") as genai:
+        genai.GenerativeModel.side_effect = lambda **kwargs: MagicMock(
+            generate_content=MagicMock(return_value=_response("olá"))
+        )
+        assert adapter.get_completion(MESSAGES, TOOLS) == {"content": "olá"}
+        assert adapter.get_completion(MESSAGES, TOOLS) == {"content": "olá"}
+        # Mesmo conteúdo em outro objeto: mesmo modelo; sem ferramentas: outro modelo
+        adapter.get_completion(MESSAGES, {"function_declarations": list(TOOLS["function_declarations"])})
+        adapter.get_completion(MESSAGES)
+
+    assert genai.GenerativeModel.call_count == 2
+    model = adapter._get_model(TOOLS)
+    timeout = model.generate_content.call_args.kwargs["request_options"]["timeout"]
+    assert 0 < timeout <= 30
+
+
+def test_call_slots_bound_concurrency(monkeypatch):
+    monkeypatch.setattr(gemini, "_call_slots", threading.BoundedSemaphore(1))
+    adapter = _adapter(timeout=0.2)
+    with patch.object(gemini, "genai") as genai:
+        genai.GenerativeModel.return_value.generate_content.return_value = _response("olá")
+        with gemini._call_slot(1):
+            busy = adapter.get_completion(MESSAGES)
+        free = adapter.get_completion(MESSAGES)
+
+    assert "Sem vaga" in busy["error"]
+    assert free == {"content": "olá"}
+
+
+def test_stream_retries_only_before_first_chunk():
+    adapter = _adapter()
+    with patch.object(gemini, "genai") as genai:
+        model = genai.GenerativeModel.return_value
+        model.generate_content.side_effect = [
+            Exception("503 Service Unavailable"),
+            iter([_response("Olá"), _response(" mundo")]),
+        ]
+        pieces = list(adapter.get_completion_stream(MESSAGES))
+    assert pieces == [{"content": "Olá"}, {"content": " mundo"}]
+    assert model.generate_content.call_count == 2
+    assert model.generate_content.call_args.kwargs["stream"] is True
+
+    def broken_stream():
+        yield _response("Olá")
+        raise Exception("503 Service Unavailable")
+
+    gemini.clear_model_cache()
+    with patch.object(gemini, "genai") as genai:
+        model = genai.GenerativeModel.return_value
+        model.generate_content.return_value = broken_stream()
+        pieces = list(adapter.get_completion_stream(MESSAGES))
+    assert pieces[0] == {"content": "Olá"}
+    assert "error" in pieces[1]
+    assert model.generate_content.call_count == 1
+
+
+def test_all_function_calls_of_a_turn_are_returned_and_answered_together():
+    adapter = _adapter()
+    call = lambda grupo: SimpleNamespace(name="margem_grupo", args={"grupo": grupo})
+    response = SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[
+        SimpleNamespace(text=None, function_call=call("A")),
+        SimpleNamespace(text=None, function_call=call("B")),
+    ]))])
+
+    result = adapter._parse_response(response)
+    assert result["content"] == ""
+    assert [tc["id"] for tc in result["tool_calls"]] == ["call_margem_grupo", "call_margem_grupo_1"]
+    assert [tc["function"]["arguments"] for tc in result["tool_calls"]] == ['{"grupo": "A"}', '{"grupo": "B"}']
+
+    converted = adapter._convert_messages([
+        {"role": "user", "content": "compare A e B"},
+        {"role": "model", "content": "", "tool_calls": result["tool_calls"]},
+        {"role": "user", "function_call": {"name": "margem_grupo", "response": {"content": "10%"}}},
+        {"role": "user", "function_call": {"name": "margem_grupo", "response": {"content": "12%"}}},
+    ])
+    assert [m["role"] for m in converted] == ["user", "model", "user"]
+    assert len(converted[1]["parts"]) == 2
+    assert [p["function_response"]["response"]["content"] for p in converted[2]["parts"]] == ["10%", "12%"]
@@ -0,0 +1,173 @@
+# tests/test_llm_streaming.py
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+from langchain_core.messages import HumanMessage
+
+# Adicionar o diretório raiz ao sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.agents.tool_agent import TokenStreamHandler
+from core.llm_base import BaseLLMAdapter
+from core.llm_langchain_adapter import CustomLangChainLLM
+
+
+class FakeStreamingAdapter(BaseLLMAdapter):
+    """Adaptador que devolve trechos pré-definidos em streaming."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.calls = []
+
+    def get_completion(self, messages, tools=None):
+        raise AssertionError("streaming não deveria chamar get_completion")
+
+    def get_completion_stream(self, messages, tools=None):
+        self.calls.append((messages, tools))
+        yield from self.pieces
+
+
+TOOL_CALL = {
+    "id": "call_consultar_dados",
+    "type": "function",
+    "function": {"name": "consultar_dados", "arguments": '{"coluna": "ITEM", "valor": "9"}'},
+}
+TOOL_CALL_LC = {"name": "consultar_dados", "args": {"coluna": "ITEM", "valor": "9"}, "id": "call_consultar_dados"}
+
+
+def test_stream_yields_text_chunks_and_tool_calls():
+    adapter = FakeStreamingAdapter(
+        [{"content": "O lucro "}, {"content": "do item 9"}, {"tool_calls": [TOOL_CALL]}]
+    )
+    llm = CustomLangChainLLM(llm_adapter=adapter)
+
+    chunks = list(llm.stream([HumanMessage(content="lucro do item 9?")]))
+    assert [c.content for c in chunks[:2]] == ["O lucro ", "do item 9"]
+
+    message = chunks[0]
+    for chunk in chunks[1:]:
+        message = message + chunk
+    assert message.content == "O lucro do item 9"
+    assert message.tool_calls == [
+        {"name": "consultar_dados", "args": {"coluna": "ITEM", "valor": "9"}, "id": "call_consultar_dados"}
+    ]
+    assert adapter.calls[0][0] == [{"role": "user", "content": "lucro do item 9?"}]
+
+
+def test_stream_reports_tokens_to_callbacks_and_raises_on_error():
+    tokens = []
+    adapter = FakeStreamingAdapter([{"content": "Olá"}, {"content": ", gerente"}])
+    llm = CustomLangChainLLM(llm_adapter=adapter)
+
+    list(llm.stream("oi", config={"callbacks": [TokenStreamHandler(tokens.append)]}))
+    assert tokens == ["Olá", ", gerente"]
+
+    failing = CustomLangChainLLM(llm_adapter=FakeStreamingAdapter([{"error": "Erro: 500"}]))
+    with pytest.raises(Exception, match="LLM Adapter Error"):
+        list(failing.stream("oi"))
+
+
+def test_astream_and_default_adapter_stream():
+    class BlockingAdapter(BaseLLMAdapter):
+        def get_completion(self, messages, tools=None):
+            return {"content": "resposta completa"}
+
+    async def collect(llm):
+        return [chunk.content async for chunk in llm.astream("oi")]
+
+    assert asyncio.run(collect(CustomLangChainLLM(llm_adapter=BlockingAdapter()))) == [
+        "resposta completa"
+    ]
+    streaming = CustomLangChainLLM(llm_adapter=FakeStreamingAdapter([{"content": "a"}, {"content": "b"}]))
+    assert asyncio.run(collect(streaming)) == ["a", "b"]
+
+
+def test_chat_stream_route_sends_sse_events():
+    from core.api.routes import chat_routes as module
+
+    class FakeProcessor:
+        def process_query(self, query, on_token=None):
+            on_token("O item 9 ")
+            on_token("tem lucro de R$ 18,49")
+            return {"type": "text", "output": "O item 9 tem lucro de R$ 18,49"}
+
+    app = Flask(__name__)
+    app.secret_key = "teste"
+    app.register_blueprint(module.chat_routes)
+
+    with patch.object(module, "QueryProcessor", FakeProcessor):
+        response = app.test_client().post("/api/chat/stream", json={"message": "lucro do item 9"})
+        body = response.get_data(as_text=True)
+
+    assert response.mimetype == "text/event-stream"
+    events = [block.split("\n") for block in body.strip().split("\n\n")]
+    assert [lines[0] for lines in events] == ["event: token", "event: token", "event: done"]
+    assert json.loads(events[0][1][len("data: "):]) == {"content": "O item 9 "}
+    done = json.loads(events[-1][1][len("data: "):])
+    assert done["output"] == "O item 9 tem lucro de R$ 18,49"
+    assert "timestamp" in done
+
+
+def test_chat_routes_scope_the_query_to_the_requested_branches():
+    from core.api.routes import chat_routes as module
+    from core.data_source_manager import get_filial_scope
+
+    class FakeProcessor:
+        def process_query(self, query, on_token=None):
+            return {"type": "text", "output": str(get_filial_scope())}
+
+    app = Flask(__name__)
+    app.secret_key = "teste"
+    app.register_blueprint(module.chat_routes)
+    client = app.test_client()
+
+    with patch.object(module, "QueryProcessor", FakeProcessor):
+        escopo = client.post("/api/chat", json={"message": "vendas", "filial": "centro"}).get_json()
+        padrao = client.post("/api/chat", json={"message": "vendas"}).get_json()
+        stream = client.post(
+            "/api/chat/stream", json={"message": "vendas", "filial": ["centro", "madureira"]}
+        ).get_data(as_text=True)
+        invalida = client.post("/api/chat", json={"message": "vendas", "filial": 3})
+
+    assert escopo["output"] == "('centro',)"
+    assert padrao["output"] == "None"
+    assert "('centro', 'madureira')" in stream
+    assert invalida.status_code == 400
+
+
+def test_tool_declarations_compiled_once_and_messages_converted_incrementally():
+    from langchain_core.messages import AIMessage, ToolMessage
+    from langchain_core.tools import tool
+
+    import core.llm_langchain_adapter as module
+
+    @tool
+    def consultar_dados(coluna: str, valor: str, coluna_retorno: str = "") -> str:
+        """Consulta dados de um produto."""
+        return ""
+
+    calls = []
+
+    class RecordingAdapter(BaseLLMAdapter):
+        def get_completion(self, messages, tools=None):
+            calls.append((messages, tools))
+            return {"content": "ok"}
+
+    with patch.object(module, "_tool_declaration", wraps=module._tool_declaration) as compile_tool:
+        llm = CustomLangChainLLM(llm_adapter=RecordingAdapter()).bind_tools([consultar_dados])
+        history = [HumanMessage(content="lucro do item 9?"), AIMessage(content="", tool_calls=[TOOL_CALL_LC])]
+        llm.invoke(history)
+        llm.invoke(history + [ToolMessage(content="18.49", tool_call_id="call_consultar_dados")])
+
+    assert compile_tool.call_count == 1
+    assert calls[0][1] is calls[1][1]
+    declaration = calls[0][1]["function_declarations"][0]
+    assert declaration["parameters"]["required"] == ["coluna", "valor"]
+    # Mesmas mensagens entre os passos: o mesmo dicionário convertido
+    assert calls[1][0][1] is calls[0][0][1]
+    assert calls[1][0][2]["function_call"]["name"] == "consultar_dados"
@@ -0,0 +1,30 @@
+"""
+Testes do cache de respostas do QueryProcessor (core.cache.Cache).
+"""
+
+from core.cache import Cache
+
+
+def test_instances_do_not_share_entries():
+    sessao_a, sessao_b = Cache(), Cache()
+    sessao_a.set("lucro do item 9", {"type": "text", "output": "R$ 18,49"})
+    sessao_b.set("lucro do item 9", {"type": "text", "output": "outra sessão"})
+
+    assert sessao_a.get("lucro do item 9")["output"] == "R$ 18,49"
+    assert Cache().get("lucro do item 9") is None
+
+    sessao_b.clear()
+    assert sessao_b.get("lucro do item 9") is None
+    assert sessao_a.get("lucro do item 9")["output"] == "R$ 18,49"
+
+
+def test_callers_cannot_change_the_cached_answer():
+    cache = Cache()
+    resposta = {"type": "text", "output": "R$ 18,49"}
+    cache.set("lucro do item 9", resposta)
+
+    # Como ChatService._format_response faz com a resposta devolvida
+    resposta["timestamp"] = "agora"
+    cache.get("lucro do item 9")["session_id"] = "sessao-a"
+
+    assert cache.get("lucro do item 9") == {"type": "text", "output": "R$ 18,49"}
@@ -0,0 +1,63 @@
+"""
+Testes da matriz de vendas produtos × meses (fatias e reduções pré-calculadas).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.utils.sales_matrix import SalesMatrix
+
+MESES = ["VENDA QTD JAN", "VENDA QTD FEV", "VENDA QTD MAR"]
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "ITEM": ["1", "2", "3", "4"],
+            "GRUPO": pd.Categorical(["ESMALTES", "CABELOS", "ESMALTES", None]),
+            "FABRICANTE": ["RISQUÉ", "SOFTHAIR", "COLORAMA", "OUTRO"],
+            "VENDA QTD JAN": [1, 0, 2, 5],
+            "VENDA QTD FEV": [0, 4, 1, 1],
+            "VENDA QTD MAR": [3, 1, np.nan, 0],
+        }
+    )
+
+
+@pytest.fixture
+def matrix(df):
+    return SalesMatrix(df, MESES, key_column="ITEM", dimensions=["GRUPO", "FABRICANTE"])
+
+
+def test_matrix_is_contiguous_and_read_only(matrix):
+    assert matrix.values.shape == (4, 3)
+    assert matrix.values.flags.c_contiguous
+    assert not matrix.values.flags.writeable
+    assert matrix.months == ["JAN", "FEV", "MAR"]
+
+
+def test_product_series_is_a_row_slice(matrix):
+    assert matrix.product(" 3 ").tolist() == [2.0, 1.0, 0.0]
+    assert matrix.product("999") is None
+    assert matrix.products(["2", "999", "1"]).index.tolist() == ["2", "1"]
+
+
+def test_dimension_series_match_groupby(matrix, df):
+    esperado = df[df["GRUPO"] == "ESMALTES"][MESES].fillna(0).sum().tolist()
+    assert matrix.series("GRUPO", "ESMALTES").tolist() == esperado
+    assert matrix.series("GRUPO", ["ESMALTES", "CABELOS"]).sum() == 12
+    media = matrix.series("GRUPO", "ESMALTES", agregacao="media").tolist()
+    assert media == [value / 2 for value in esperado]
+    assert matrix.by("FABRICANTE").loc["SOFTHAIR"].tolist() == [0.0, 4.0, 1.0]
+    with pytest.raises(KeyError):
+        matrix.series("ITEM", "1")
+
+
+def test_totals_seasonality_and_top_products(matrix, df):
+    totais = df[MESES].fillna(0).sum()
+    assert matrix.monthly().tolist() == totais.tolist()
+    assert matrix.seasonality_index() == pytest.approx(totais.std() / totais.mean() * 100)
+    top = matrix.top_products(2)
+    assert top.index.tolist() == [3, 1]
+    assert top.tolist() == [6.0, 5.0]
@@ -0,0 +1,66 @@
+"""
+Testes do índice de contexto do agente (trechos de colunas e ferramentas).
+"""
+
+import json
+
+import numpy as np
+
+from core.utils.schema_index import SnippetIndex, build_schema_index, embed_texts
+
+
+def _ids(results):
+    return [snippet["id"] for _, snippet in results]
+
+
+def test_search_finds_relevant_columns_and_tools():
+    index = build_schema_index(directory=None)
+
+    assert "coluna_lucro" in _ids(index.search("Qual o lucro do produto 9?", 5, tipo="coluna"))
+    assert _ids(index.search("Quantos dias de cobertura tem o item 5?", 1, tipo="coluna")) == [
+        "coluna_dias_cobertura"
+    ]
+    assert _ids(index.search("Gráfico de vendas do grupo de esmaltes", 1, tipo="ferramenta")) == [
+        "ferramenta_grafico_grupo"
+    ]
+    assert _ids(index.search("Compare os itens 9, 12 e 57", 1, tipo="ferramenta")) == [
+        "ferramenta_consultar_produtos"
+    ]
+
+    results = index.search("qual o total de vendas por fabricante", 4)
+    scores = [score for score, _ in results]
+    assert scores == sorted(scores, reverse=True)
+    assert all(snippet["tipo"] in ("coluna", "ferramenta") for _, snippet in results)
+
+
+def test_embeddings_are_normalized_and_accent_insensitive():
+    vectors = embed_texts(["Gráfico de vendas", "grafico DE VENDAS", "de o a"])
+
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1.0)
+    assert np.allclose(vectors[0], vectors[1])
+    assert not vectors[2].any()  # só stopwords: vetor nulo
+
+
+def test_saved_index_is_memory_mapped_and_rebuilt_when_catalog_changes(tmp_path):
+    snippets = [
+        {"id": "lucro", "tipo": "coluna", "texto": "- LUCRO R$ (lucro total)", "termos": "rentabilidade"},
+        {"id": "saldo", "tipo": "coluna", "texto": "- SALDO (saldo em estoque)", "termos": "estoque"},
+    ]
+    catalog = tmp_path / "trechos.json"
+    catalog.write_text(json.dumps(snippets), encoding="utf-8")
+    directory = tmp_path / "indice"
+
+    index = build_schema_index(catalog, directory)
+    assert isinstance(index.vectors, np.memmap)
+    assert _ids(index.search("estoque do item 5", 1)) == ["saldo"]
+
+    reopened = SnippetIndex.load(directory)
+    assert isinstance(reopened.vectors, np.memmap)
+    assert np.array_equal(reopened.vectors, index.vectors)
+
+    # Catálogo alterado: o índice gravado fica obsoleto e é refeito
+    snippets.append({"id": "custo", "tipo": "coluna", "texto": "- CUSTO R$ (custo total)", "termos": ""})
+    catalog.write_text(json.dumps(snippets), encoding="utf-8")
+    rebuilt = build_schema_index(catalog, directory)
+    assert len(rebuilt) == 3
+    assert _ids(rebuilt.search("custo", 1)) == ["custo"]
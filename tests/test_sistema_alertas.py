@@ -0,0 +1,29 @@
+"""
+Testes do SistemaAlertas.
+"""
+
+import pandas as pd
+
+from core.alertas.sistema_alertas import SistemaAlertas
+
+
+def test_alerts_from_batches_match_full_frame():
+    df = pd.DataFrame(
+        {
+            "ITEM": [str(i) for i in range(6)],
+            "SALDO": [-1, 5, 10, 0, 3, 8],
+            "LUCRO TOTAL %": [30.0, -5.0, 40.0, 12.0, 35.0, 50.0],
+            "VLR ESTOQUE VENDA": [100.0, 2000.0, 600.0, 1500.0, 300.0, 900.0],
+            "VENDA QTD OUT": [1, 0, 0, 2, 0, 1],
+            "VENDA QTD NOV": [1, 0, 0, 2, 0, 1],
+            "VENDA QTD DEZ": [1, 0, 0, 2, 0, 1],
+        }
+    )
+    completo = SistemaAlertas(df).executar_todas_verificacoes()
+    lotes = SistemaAlertas.a_partir_de_lotes([df.iloc[:2], df.iloc[2:4], df.iloc[4:]])
+    em_lotes = lotes.executar_todas_verificacoes()
+
+    resumo = lambda alertas: [(a["tipo"], a["quantidade"]) for a in alertas]
+    assert resumo(em_lotes) == resumo(completo)
+    # Só as linhas candidatas ficam em memória
+    assert len(lotes.df) < len(df)
@@ -0,0 +1,40 @@
+"""
+Testes do índice de trigramas (busca textual sem acentos).
+"""
+
+from core.utils.text_index import TrigramIndex, fold_text
+
+
+def test_fold_text_removes_accents_and_case():
+    assert fold_text("  ESMALTÉ   Risqué ") == "esmalte risque"
+    assert fold_text(None) == ""
+
+
+def test_search_is_accent_insensitive_and_substring():
+    index = TrigramIndex(["ESMALTÉ RISQUÉ VERMELHO", "Base Fortalecedora", None, "esmalte colorama"])
+
+    positions = [pos for pos, _ in index.search("esmalte")]
+    assert sorted(positions) == [0, 3]
+    assert [pos for pos, _ in index.search("RISQUE")] == [0]
+    assert [pos for pos, _ in index.search("ortalec")] == [1]
+
+
+def test_multi_token_query_requires_all_tokens_in_any_order():
+    index = TrigramIndex(["ESMALTE VERMELHO 9ML", "ESMALTE AZUL", "BATOM VERMELHO"])
+
+    assert [pos for pos, _ in index.search("vermelho esmalte")] == [0]
+    assert index.search("esmalte inexistente") == []
+
+
+def test_results_are_ranked_and_limited():
+    index = TrigramIndex(["KIT COM ESMALTE", "ESMALTE", "ESMALTE GLITTER"])
+
+    ranked = [pos for pos, _ in index.search("esmalte")]
+    assert ranked[0] == 1
+    assert ranked[-1] == 0
+    assert len(index.search("esmalte", limit=2)) == 2
+
+
+def test_short_tokens_are_verified_without_trigrams():
+    index = TrigramIndex(["CREME 9ML", "SHAMPOO 300ML"])
+    assert [pos for pos, _ in index.search("9m")] == [0]
@@ -47,5 +47,88 @@ def test_tool_agent_process_query(agent):
     assert response["output"] == "Mocked executor output"
 
 
+def test_tool_calls_of_one_turn_run_in_parallel():
+    """
+    Testa se as ferramentas pedidas em um mesmo turno rodam ao mesmo tempo e se
+    os resultados voltam juntos ao modelo no passo seguinte.
+    """
+    import threading
+    from langchain_core.tools import tool
+    from core.agents.tool_agent import ParallelAgentExecutor
+    from core.llm_base import BaseLLMAdapter
+    from core.llm_langchain_adapter import CustomLangChainLLM
+    from langchain.agents import create_tool_calling_agent
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+    barreira = threading.Barrier(2, timeout=5)
+
+    @tool
+    def margem_grupo(grupo: str) -> str:
+        """Margem de um grupo."""
+        barreira.wait()  # só passa se as duas chamadas estiverem rodando juntas
+        return f"margem {grupo}"
+
+    chamadas = []
+
+    class DuasFerramentasAdapter(BaseLLMAdapter):
+        def get_completion(self, messages, tools=None):
+            chamadas.append(messages)
+            if len(chamadas) == 1:
+                return {
+                    "content": "",
+                    "tool_calls": [
+                        {"id": "call_margem_grupo", "type": "function",
+                         "function": {"name": "margem_grupo", "arguments": '{"grupo": "A"}'}},
+                        {"id": "call_margem_grupo_1", "type": "function",
+                         "function": {"name": "margem_grupo", "arguments": '{"grupo": "B"}'}},
+                    ],
+                }
+            return {"content": "Comparação pronta"}
+
+    prompt = ChatPromptTemplate.from_messages(
+        [("human", "{input}"), MessagesPlaceholder(variable_name="agent_scratchpad")]
+    )
+    llm = CustomLangChainLLM(llm_adapter=DuasFerramentasAdapter())
+    executor = ParallelAgentExecutor(
+        agent=create_tool_calling_agent(llm, [margem_grupo], prompt),
+        tools=[margem_grupo],
+        return_intermediate_steps=True,
+    )
+
+    resposta = executor.invoke({"input": "compare A e B"})
+
+    assert resposta["output"] == "Comparação pronta"
+    assert [obs for _, obs in resposta["intermediate_steps"]] == ["margem A", "margem B"]
+    assert len(chamadas) == 2
+    respostas = [m["function_call"] for m in chamadas[1] if "function_call" in m]
+    assert [r["name"] for r in respostas] == ["margem_grupo", "margem_grupo"]
+    assert [r["response"]["content"] for r in respostas] == ["margem A", "margem B"]
+
+
+def test_system_prompt_is_built_per_query_from_relevant_snippets(agent):
+    """
+    Testa se o prompt do sistema traz só o núcleo e os trechos relevantes da
+    pergunta, bem menor que o catálogo completo, e se segue para o executor.
+    """
+    from core.agents.tool_agent import _prompt_nucleo
+    from core.utils.schema_index import load_snippets
+
+    completo = "\n".join([_prompt_nucleo()] + [t["texto"] for t in load_snippets()])
+
+    prompt = agent._montar_prompt_sistema("Qual o lucro do produto 9?")
+    assert prompt.startswith(_prompt_nucleo())
+    assert "LUCRO R$ (lucro total em reais)" in prompt
+    assert "consultar_dados(coluna='ITEM'" in prompt
+    assert "gerar_grafico_vendas_por_grupo" not in prompt
+    assert len(prompt) < 0.5 * len(completo)
+
+    prompt_grafico = agent._montar_prompt_sistema("Gráfico de vendas do grupo de esmaltes")
+    assert "gerar_grafico_vendas_por_grupo(nome_grupo='NOME_DO_GRUPO')" in prompt_grafico
+
+    agent.process_query("Qual o lucro do produto 9?")
+    inputs = agent.agent_executor.invoke.call_args[0][0]
+    assert inputs["prompt_sistema"] == prompt
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -214,61 +214,72 @@ def aplicar_filtros(df: pd.DataFrame, filtros: Dict[str, Any]) -> pd.DataFrame:
     """
     Aplica filtros ao DataFrame
 
+    Filtros no valor padrão da sidebar (margem mínima igual à menor margem,
+    faixa de estoque de 0 ao máximo, listas vazias, opções desmarcadas) não
+    restringem nada. Sem filtro ativo, devolve o próprio `df`, sem cópia, e
+    quem chama pode usar os agregados pré-calculados do dataset completo.
+
     Args:
         df: DataFrame original
         filtros: Dicionário com filtros selecionados
 
     Returns:
-        DataFrame filtrado
+        DataFrame filtrado (o próprio `df` se nenhum filtro estiver ativo)
     """
     if df.empty or not filtros:
         return df
 
-    df_filtrado = df.copy()
-    total_original = len(df_filtrado)
+    total_original = len(df)
+    mascara = pd.Series(True, index=df.index)
+    ativos = 0
+
+    def restringir(condicao, nome):
+        nonlocal mascara, ativos
+        mascara &= condicao
+        ativos += 1
+        logger.info(f"Filtro {nome}: {int(mascara.sum())} produtos")
 
     # Aplicar filtro de categorias
     if filtros.get('grupos'):
-        df_filtrado = df_filtrado[df_filtrado['GRUPO'].isin(filtros['grupos'])]
-        logger.info(f"Filtro categorias: {len(df_filtrado)} produtos")
+        restringir(df['GRUPO'].isin(filtros['grupos']), "categorias")
 
     # Aplicar filtro de fabricantes
     if filtros.get('fabricantes'):
-        df_filtrado = df_filtrado[df_filtrado['FABRICANTE'].isin(filtros['fabricantes'])]
-        logger.info(f"Filtro fabricantes: {len(df_filtrado)} produtos")
-
-    # Aplicar filtro de margem
-    if 'margem_minima' in filtros and 'LUCRO TOTAL %' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['LUCRO TOTAL %'] >= filtros['margem_minima']]
-        logger.info(f"Filtro margem: {len(df_filtrado)} produtos")
-
-    # Aplicar filtro de range de estoque
-    if 'estoque_min' in filtros and 'estoque_max' in filtros and 'SALDO' in df_filtrado.columns:
-        df_filtrado = df_filtrado[
-            (df_filtrado['SALDO'] >= filtros['estoque_min']) &
-            (df_filtrado['SALDO'] <= filtros['estoque_max'])
-        ]
-        logger.info(f"Filtro estoque: {len(df_filtrado)} produtos")
+        restringir(df['FABRICANTE'].isin(filtros['fabricantes']), "fabricantes")
+
+    # Aplicar filtro de margem (o padrão do slider é a menor margem)
+    if 'margem_minima' in filtros and 'LUCRO TOTAL %' in df.columns:
+        if filtros['margem_minima'] > df['LUCRO TOTAL %'].min():
+            restringir(df['LUCRO TOTAL %'] >= filtros['margem_minima'], "margem")
+
+    # Aplicar filtro de range de estoque (o padrão é de 0 ao maior saldo)
+    if 'estoque_min' in filtros and 'estoque_max' in filtros and 'SALDO' in df.columns:
+        if filtros['estoque_min'] > 0 or filtros['estoque_max'] < int(df['SALDO'].max()):
+            restringir(
+                (df['SALDO'] >= filtros['estoque_min']) & (df['SALDO'] <= filtros['estoque_max']),
+                "estoque",
+            )
 
     # Aplicar filtro de apenas em estoque
-    if filtros.get('apenas_em_estoque') and 'SALDO' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['SALDO'] > 0]
-        logger.info(f"Filtro em estoque: {len(df_filtrado)} produtos")
+    if filtros.get('apenas_em_estoque') and 'SALDO' in df.columns:
+        restringir(df['SALDO'] > 0, "em estoque")
 
     # Aplicar filtro de apenas com vendas
-    if filtros.get('apenas_com_vendas') and 'VENDAS_TOTAL_ANO' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['VENDAS_TOTAL_ANO'] > 0]
-        logger.info(f"Filtro com vendas: {len(df_filtrado)} produtos")
+    if filtros.get('apenas_com_vendas') and 'VENDAS_TOTAL_ANO' in df.columns:
+        restringir(df['VENDAS_TOTAL_ANO'] > 0, "com vendas")
 
     # Aplicar filtro de classificação de margem
-    if filtros.get('classificacao_margem') and 'CLASSIFICACAO_MARGEM' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['CLASSIFICACAO_MARGEM'].isin(filtros['classificacao_margem'])]
-        logger.info(f"Filtro classificação margem: {len(df_filtrado)} produtos")
+    if filtros.get('classificacao_margem') and 'CLASSIFICACAO_MARGEM' in df.columns:
+        restringir(df['CLASSIFICACAO_MARGEM'].isin(filtros['classificacao_margem']), "classificação margem")
 
     # Aplicar filtro de status de estoque
-    if filtros.get('status_estoque') and 'STATUS_ESTOQUE' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['STATUS_ESTOQUE'].isin(filtros['status_estoque'])]
-        logger.info(f"Filtro status estoque: {len(df_filtrado)} produtos")
+    if filtros.get('status_estoque') and 'STATUS_ESTOQUE' in df.columns:
+        restringir(df['STATUS_ESTOQUE'].isin(filtros['status_estoque']), "status estoque")
+
+    if not ativos:
+        return df
+
+    df_filtrado = df[mascara]
 
     # Log do resultado final
     produtos_removidos = total_original - len(df_filtrado)